@@ -1,70 +1,151 @@
 import pandas as pd
 import numpy as np
+from banco_dados import conectar, carregar_confrontos, salvar_confrontos
+from instrumentacao import instrumentar
+
+# Colunas guardadas de cada jogo indexado (exibidas no histórico do confronto)
+COLUNAS_JOGOS = ['Date', 'HomeTeam', 'FTHG', 'FTAG', 'AwayTeam']
 
 def carregar_historico():
     """
-    Carrega a base de dados histórica de confrontos a partir de um arquivo CSV.
+    Carrega a base de dados histórica de confrontos a partir do banco local.
+    Na primeira execução, importa o arquivo CSV para o banco.
     """
-    try:
-        return pd.read_csv("historico_confrontos.csv")
-    except FileNotFoundError:
-        return pd.DataFrame(columns=['Time1', 'Time2', 'Vitorias_Time1', 'Vitorias_Time2', 'Empates'])
+    with conectar() as conexao:
+        df_confrontos = carregar_confrontos(conexao)
+        if df_confrontos.empty:
+            try:
+                df_confrontos = pd.read_csv("historico_confrontos.csv")
+            except FileNotFoundError:
+                return pd.DataFrame(columns=['Time1', 'Time2', 'Vitorias_Time1', 'Vitorias_Time2', 'Empates'])
+            salvar_confrontos(conexao, df_confrontos)
+    return df_confrontos
 
-def gerar_confronto_direto(df_total, time_A_selecionado, time_B_selecionado):
+def _par(time_a, time_b):
     """
-    Filtra o histórico de jogos recentes, SOMA com uma base de dados histórica,
-    e calcula as estatísticas totais do confronto.
+    Chave do confronto: o par de times em ordem alfabética (não importa quem é o mandante).
+    """
+    return (time_a, time_b) if time_a <= time_b else (time_b, time_a)
+
+class IndiceConfrontos:
+    """
+    Índice de confrontos diretos, montado uma única vez e atualizado a cada novo lote de jogos.
+    Guarda os jogos indexados em uma tabela (jogos) e, para cada par de times, os números da base histórica,
+    as posições dos seus jogos nessa tabela, os agregados por temporada (vitórias, empates e gols) e os
+    totais do par, de modo que uma consulta não precisa varrer nem somar nada. Cada jogo, identificado por
+    (data, mandante, visitante), é contado uma única vez; se voltar com outro placar (placar corrigido), o
+    registro antigo é descontado e o novo, somado.
     """
-    # Garantir ordem alfabética para consistência
-    time1_alfa, time2_alfa = sorted([time_A_selecionado, time_B_selecionado])
-    df_historico_total = carregar_historico()
-    historico_base = df_historico_total[
-        (df_historico_total['Time1'] == time1_alfa) & (df_historico_total['Time2'] == time2_alfa)
-    ]
-    stats_base = {time1_alfa: {'vitorias': 0}, time2_alfa: {'vitorias': 0}, 'empates': 0}
-    if not historico_base.empty:
-        stats_base[time1_alfa]['vitorias'] = int(historico_base.iloc[0]['Vitorias_Time1'])
-        stats_base[time2_alfa]['vitorias'] = int(historico_base.iloc[0]['Vitorias_Time2'])
-        stats_base['empates'] = int(historico_base.iloc[0]['Empates'])
-    historico_recente = df_total[
-        ((df_total['HomeTeam'] == time_A_selecionado) & (df_total['AwayTeam'] == time_B_selecionado)) |
-        ((df_total['HomeTeam'] == time_B_selecionado) & (df_total['AwayTeam'] == time_A_selecionado))
-    ].copy()
-    stats_recentes = {time_A_selecionado: {'vitorias': 0, 'gols': 0}, time_B_selecionado: {'vitorias': 0, 'gols': 0}, 'empates': 0}
-    if not historico_recente.empty:
-        historico_recente['Resultado'] = np.where(
-            historico_recente['FTHG'] > historico_recente['FTAG'], 'Casa',
-            np.where(historico_recente['FTHG'] < historico_recente['FTAG'], 'Visitante', 'Empate')
-        )
-        # Calcula vitórias, empates e gols recentes
-        stats_recentes[time_A_selecionado]['vitorias'] = len(historico_recente[((historico_recente['HomeTeam'] == time_A_selecionado) & (historico_recente['Resultado'] == 'Casa')) | ((historico_recente['AwayTeam'] == time_A_selecionado) & (historico_recente['Resultado'] == 'Visitante'))])
-        stats_recentes[time_B_selecionado]['vitorias'] = len(historico_recente[((historico_recente['HomeTeam'] == time_B_selecionado) & (historico_recente['Resultado'] == 'Casa')) | ((historico_recente['AwayTeam'] == time_B_selecionado) & (historico_recente['Resultado'] == 'Visitante'))])
-        stats_recentes['empates'] = len(historico_recente[historico_recente['Resultado'] == 'Empate'])
-        stats_recentes[time_A_selecionado]['gols'] = int(historico_recente.loc[historico_recente['HomeTeam'] == time_A_selecionado, 'FTHG'].sum() + historico_recente.loc[historico_recente['AwayTeam'] == time_A_selecionado, 'FTAG'].sum())
-        stats_recentes[time_B_selecionado]['gols'] = int(historico_recente.loc[historico_recente['HomeTeam'] == time_B_selecionado, 'FTHG'].sum() + historico_recente.loc[historico_recente['AwayTeam'] == time_B_selecionado, 'FTAG'].sum())
 
-    # Soma os resultados históricos com os recentes
-    vitorias_total_A = stats_base.get(time_A_selecionado, {}).get('vitorias', 0) + stats_recentes[time_A_selecionado]['vitorias']
-    vitorias_total_B = stats_base.get(time_B_selecionado, {}).get('vitorias', 0) + stats_recentes[time_B_selecionado]['vitorias']
-    empates_total = stats_base['empates'] + stats_recentes['empates']
+    def __init__(self, df_historico_base=None, df_jogos=None):
+        self.base = {}
+        self.temporadas = {}
+        self.totais = {}
+        self.jogos = []
+        self.temporada_jogos = []
+        self.posicoes = {}
+        self.posicoes_par = {}
+        if df_historico_base is not None:
+            for time1, time2, vitorias1, vitorias2, empates in zip(
+                    df_historico_base['Time1'], df_historico_base['Time2'], df_historico_base['Vitorias_Time1'],
+                    df_historico_base['Vitorias_Time2'], df_historico_base['Empates']):
+                self.base[_par(time1, time2)] = {'vitorias': {time1: int(vitorias1), time2: int(vitorias2)}, 'empates': int(empates)}
+        if df_jogos is not None:
+            self.adicionar_jogos(df_jogos)
+
+    @instrumentar('confronto.indexar')
+    def adicionar_jogos(self, df_jogos):
+        """
+        Acrescenta ao índice os jogos já realizados de df_jogos (jogos sem placar são ignorados). Jogos
+        já indexados (ex.: uma rodada lida de novo pelo atualizador) não são contados outra vez; se o placar
+        mudou, o jogo é atualizado.
+        """
+        novos = df_jogos[df_jogos['FTHG'].notna() & df_jogos['FTAG'].notna()]
+        if novos.empty:
+            return
+        datas = pd.to_datetime(novos['Date'])
+        if 'Temporada' in novos.columns:
+            temporadas = novos['Temporada'].astype(str).tolist()
+        else:
+            temporadas = datas.dt.year.astype(str).tolist()
+        chaves = zip(datas.to_numpy(dtype='datetime64[ns]').astype(np.int64).tolist(),
+                     novos['HomeTeam'].tolist(), novos['AwayTeam'].tolist())
+        registros = novos[COLUNAS_JOGOS].itertuples(index=False, name=None)
+
+        for chave, registro, temporada in zip(chaves, registros, temporadas):
+            posicao = self.posicoes.get(chave)
+            if posicao is None:
+                posicao = self.posicoes[chave] = len(self.jogos)
+                self.jogos.append(registro)
+                self.temporada_jogos.append(temporada)
+                self.posicoes_par.setdefault(_par(registro[1], registro[4]), []).append(posicao)
+            else:
+                anterior = self.jogos[posicao]
+                if anterior[2:4] == registro[2:4]:
+                    continue
+                self._somar(anterior, self.temporada_jogos[posicao], -1)
+                self.jogos[posicao] = registro
+                self.temporada_jogos[posicao] = temporada
+            self._somar(registro, temporada, 1)
 
-    resumo_final = {
-        'vitorias': {
-            time_A_selecionado: vitorias_total_A,
-            time_B_selecionado: vitorias_total_B
-        },
-        'empates': empates_total,
-        'gols': {
-            time_A_selecionado: stats_recentes[time_A_selecionado]['gols'],
-            time_B_selecionado: stats_recentes[time_B_selecionado]['gols']
-        },
-        # Adiciona a chave com o total de jogos
-        'total_partidas': vitorias_total_A + vitorias_total_B + empates_total
-    }
+    def _somar(self, registro, temporada, sinal):
+        # Soma (sinal=1) ou desconta (sinal=-1) um jogo do agregado da temporada e dos totais do par
+        _, casa, gols_casa, gols_visitante, visitante = registro
+        time1, time2 = par = _par(casa, visitante)
+        for agregados, chave in ((self.temporadas.setdefault(par, {}), temporada), (self.totais, par)):
+            agregado = agregados.setdefault(chave, {'vitorias': {time1: 0, time2: 0}, 'empates': 0,
+                                                    'gols': {time1: 0, time2: 0}})
+            if gols_casa > gols_visitante:
+                agregado['vitorias'][casa] += sinal
+            elif gols_casa < gols_visitante:
+                agregado['vitorias'][visitante] += sinal
+            else:
+                agregado['empates'] += sinal
+            agregado['gols'][casa] += sinal * int(gols_casa)
+            agregado['gols'][visitante] += sinal * int(gols_visitante)
 
-    # Prepara o DataFrame de exibição (2025)
-    historico_exibicao = historico_recente[['Date', 'HomeTeam', 'FTHG', 'FTAG', 'AwayTeam']].copy()
-    historico_exibicao.rename(columns={'Date': 'Data', 'HomeTeam': 'Mandante', 'FTHG': 'Gols Mandante', 'FTAG': 'Gols Visitante', 'AwayTeam': 'Visitante'}, inplace=True)
-    historico_exibicao = historico_exibicao.sort_values(by='Data', ascending=False)
+    def resumo(self, time_A_selecionado, time_B_selecionado):
+        """
+        Soma a base histórica com os jogos indexados e retorna o resumo do confronto e os jogos do par.
+        """
+        par = _par(time_A_selecionado, time_B_selecionado)
+        base = self.base.get(par, {'vitorias': {}, 'empates': 0})
+        totais = self.totais.get(par, {'vitorias': {}, 'empates': 0, 'gols': {}})
 
-    return resumo_final, historico_exibicao
\ No newline at end of file
+        vitorias_total_A = base['vitorias'].get(time_A_selecionado, 0) + totais['vitorias'].get(time_A_selecionado, 0)
+        vitorias_total_B = base['vitorias'].get(time_B_selecionado, 0) + totais['vitorias'].get(time_B_selecionado, 0)
+        empates_total = base['empates'] + totais['empates']
+
+        resumo_final = {
+            'vitorias': {
+                time_A_selecionado: vitorias_total_A,
+                time_B_selecionado: vitorias_total_B
+            },
+            'empates': empates_total,
+            'gols': {
+                time_A_selecionado: totais['gols'].get(time_A_selecionado, 0),
+                time_B_selecionado: totais['gols'].get(time_B_selecionado, 0)
+            },
+            # Adiciona a chave com o total de jogos
+            'total_partidas': vitorias_total_A + vitorias_total_B + empates_total,
+            'por_temporada': self.temporadas.get(par, {}),
+        }
+
+        # Prepara o DataFrame de exibição (jogos indexados do par)
+        historico_exibicao = pd.DataFrame([self.jogos[posicao] for posicao in self.posicoes_par.get(par, [])],
+                                          columns=COLUNAS_JOGOS)
+        historico_exibicao = historico_exibicao.rename(columns={'Date': 'Data', 'HomeTeam': 'Mandante', 'FTHG': 'Gols Mandante', 'FTAG': 'Gols Visitante', 'AwayTeam': 'Visitante'})
+        historico_exibicao = historico_exibicao.sort_values(by='Data', ascending=False)
+
+        return resumo_final, historico_exibicao
+
+@instrumentar('confronto.resumo', linhas=lambda resultado: len(resultado[1]))
+def gerar_confronto_direto(df_total, time_A_selecionado, time_B_selecionado, indice=None):
+    """
+    Filtra o histórico de jogos recentes, SOMA com uma base de dados histórica,
+    e calcula as estatísticas totais do confronto.
+    Use um IndiceConfrontos já montado para evitar reler a base e varrer df_total a cada consulta.
+    """
+    if indice is None:
+        indice = IndiceConfrontos(carregar_historico(), df_total)
+    return indice.resumo(time_A_selecionado, time_B_selecionado)
@@ -2,11 +2,10 @@ import streamlit as st # Biblioteca principal do Streamlit
 import pandas as pd # Biblioteca para manipulação de dados
 from datetime import datetime
 import time
-from web_scraper import buscar_dados_brasileirao # Importa os dados do web scraper
-from feature_engineering import preparar_dados_para_modelo # Importa a preparação dos dados
-from model_trainer import treinar_modelo # Importa o treinamento do modelo
-from predictor import prever_jogo_especifico, simular_campeonato # Importa as funções de previsão e simulação
-from analysis import gerar_confronto_direto # Importa a análise de confronto direto
+from atualizador import AtualizadorDados # Dados e modelo salvos, renovados em segundo plano a partir do web scraper
+from predictor import CenarioSimulacao, PrevisorLote, prever_jogo_especifico, simular_campeonato # Importa as funções de previsão e simulação
+from analysis import IndiceConfrontos, carregar_historico, gerar_confronto_direto # Importa a análise de confronto direto
+import instrumentacao # Medição de tempo/memória das etapas do pipeline
 
 # Página
 st.set_page_config(
@@ -15,38 +14,74 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data
+# A coleta de tempos é ligada antes de carregar dados e modelo (painel "Desempenho" na barra lateral)
+st.session_state.setdefault('medir_desempenho', instrumentacao.ativo())
+if st.session_state['medir_desempenho']:
+    instrumentacao.ativar()
+else:
+    instrumentacao.desativar()
+
+@st.cache_resource
+def obter_atualizador():
+    """
+    Atualizador compartilhado por todas as sessões (sem cópias dos DataFrames e do modelo). Começa com a
+    temporada e o modelo já salvos em disco; a busca no FBref roda depois, em segundo plano.
+    """
+    atualizador = AtualizadorDados(datetime.now().year)
+    atualizador.carregar_do_disco()
+    return atualizador
+
 def carregar_dados_e_modelo():
     """
-    Função para BAIXAR dados (APENAS DE 2025), preparar features e treinar o modelo.
+    Retorna os últimos dados e modelo válidos da temporada atual imediatamente e dispara a atualização
+    em segundo plano quando eles estão velhos. Só bloqueia a página na primeira execução, quando ainda
+    não há nada salvo no banco local.
     """
-    with st.spinner('Baixando dados da temporada 2025... Isso pode levar um momento.'):
-        ano_atual = datetime.now().year
-        df_total = buscar_dados_brasileirao(str(ano_atual))
-    
-    if df_total is None:
-        st.error("Falha ao buscar os dados de 2025. Tente recarregar a página.")
-        return (None,) * 8
+    atualizador = obter_atualizador()
+    if atualizador.dados is None:
+        with st.spinner('Carregando dados da temporada pela primeira vez... Isso pode levar um momento.'):
+            atualizador.atualizar()
+    else:
+        atualizador.atualizar_em_segundo_plano()
 
-    df_resultados = df_total[df_total['FTHG'].notna()].copy()
-    df_futuro = df_total[df_total['FTHG'].isna()].copy()
+    dados = atualizador.dados
+    if dados is None:
+        st.error("Falha ao buscar os dados da temporada. Tente recarregar a página.")
+        return None, (None,) * 10
+    artefato = dados.artefato
+    if artefato is None:
+        st.warning("Ainda não há dados de treino suficientes na temporada para treinar um modelo.")
+        return dados, (None,) * 10
 
-    with st.spinner('Calculando features e treinando o modelo com dados de 2025...'):
-        df_treino, time_stats = preparar_dados_para_modelo(df_resultados)
-        if df_treino.empty:
-            st.warning("Ainda não há dados de treino suficientes na temporada para treinar um modelo.")
-            return (None,) * 8
-        modelo, encoder, colunas_modelo = treinar_modelo(df_treino)
+    return dados, (dados.df_resultados, dados.df_futuro, artefato['time_stats'], artefato['modelo'], artefato['encoder'],
+                   artefato['colunas_modelo'], dados.lista_times, dados.df_total, artefato['matriz_probabilidades'],
+                   artefato.get('modelo_gols'))
 
-    lista_times = sorted(list(set(df_total['HomeTeam']).union(set(df_total['AwayTeam']))))
-    
-    # st.success("Tudo pronto! Modelo treinado e dados de 2025 carregados.")
-    return df_resultados, df_futuro, time_stats, modelo, encoder, colunas_modelo, lista_times, df_total
+@st.cache_resource(max_entries=2)
+def carregar_indice_confrontos(_df_total, versao_dados):
+    """
+    Monta uma única vez, para cada versão dos dados, o índice de confrontos diretos (base histórica + jogos carregados).
+    """
+    return IndiceConfrontos(carregar_historico(), _df_total)
 
-# Carrega os dados cache
-(df_resultados, df_futuro, time_stats, 
- modelo, encoder, colunas_modelo, 
- lista_times, df_total) = carregar_dados_e_modelo()
+@st.cache_resource(max_entries=2)
+def carregar_previsor(_artefato, _lista_times, versao_dados):
+    """
+    Monta uma única vez, para cada versão dos dados, o previsor dos jogos que não estão na matriz de probabilidades.
+    """
+    return PrevisorLote(_artefato['modelo'], _artefato['encoder'], _artefato['time_stats'], _artefato['colunas_modelo'],
+                        _lista_times)
+
+@st.cache_resource(max_entries=2)
+def carregar_cenario(_dados, versao_dados, rodada_final, n_simulacoes):
+    """
+    Sorteia uma única vez, para cada versão dos dados, rodada e número de simulações, as temporadas da simulação
+    Monte Carlo. O cenário é compartilhado por todas as sessões; cada uma fixa jogos na sua cópia (CenarioSimulacao.copia).
+    """
+    artefato, df_resultados, df_futuro = _dados.artefato, _dados.df_resultados, _dados.df_futuro
+    return CenarioSimulacao.preparar(rodada_final, df_futuro, df_resultados, artefato['modelo'], artefato['encoder'],
+                                     artefato['time_stats'], artefato['colunas_modelo'], n_simulacoes=n_simulacoes,
+                                     matriz=artefato['matriz_probabilidades'], modelo_gols=artefato.get('modelo_gols'))
 
 # Interface do Usuário 
 st.title("AtletiQ: Estatísticas do Brasileirão 2025")
@@ -57,6 +92,15 @@ menu_escolha = st.sidebar.radio(
     ("Prever o resultado de um jogo", "Simular a classificação do campeonato", "Confronto Direto")
 )
 
+# Carrega os últimos dados e modelo válidos (o mesmo conjunto durante toda a execução da página)
+dados, (df_resultados, df_futuro, time_stats,
+        modelo, encoder, colunas_modelo,
+        lista_times, df_total, matriz_probabilidades, modelo_gols) = carregar_dados_e_modelo()
+if dados is not None:
+    atualizador = obter_atualizador()
+    situacao = " · atualizando em segundo plano..." if atualizador.em_andamento() else ""
+    st.sidebar.caption(f"Dados carregados às {datetime.fromtimestamp(dados.carregado_em):%H:%M}{situacao}")
+
 if df_resultados is not None and modelo is not None:
 
     # Previsão de Jogo Específico
@@ -74,8 +118,13 @@ if df_resultados is not None and modelo is not None:
             if time_casa and time_visitante:
                 if time_casa == time_visitante: st.warning("O time da casa e o visitante devem ser diferentes.")
                 else:
-                    with st.spinner('Calculando probabilidades...'):
-                        odds = prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo)
+                    if matriz_probabilidades.contem(time_casa, time_visitante):
+                        odds = matriz_probabilidades.prever(time_casa, time_visitante)
+                    else:
+                        with st.spinner('Calculando probabilidades...'):
+                            previsor = carregar_previsor(dados.artefato, lista_times, dados.versao)
+                            odds = prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo,
+                                                          previsor=previsor)
                     st.subheader(f"Previsão para: {time_casa} vs {time_visitante}")
                     resultado_provavel = max(odds, key=lambda k: odds[k])
                     for resultado, prob in odds.items():
@@ -83,6 +132,9 @@ if df_resultados is not None and modelo is not None:
                         else: texto_odd = ""
                         if resultado == resultado_provavel: st.markdown(f"**🏆 {resultado}: {prob:.1%} {texto_odd}**")
                         else: st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;{resultado}: {prob:.1%} {texto_odd}")
+                    if modelo_gols is not None:
+                        gols_casa, gols_visitante = modelo_gols.gols_esperados(time_casa, time_visitante)
+                        st.caption(f"Gols esperados: {time_casa} {gols_casa:.2f} x {gols_visitante:.2f} {time_visitante}")
             else: st.error("Por favor, selecione os dois times para fazer a previsão.")
 
     # Simulação do Campeonato
@@ -93,12 +145,74 @@ if df_resultados is not None and modelo is not None:
         rodada_atual = 0
         if not df_resultados.empty: rodada_atual = int(pd.to_numeric(df_resultados['Rodada']).max())
         rodada_simulacao = st.slider(f"Simular até qual rodada? (Rodada atual: {rodada_atual})", min_value=rodada_atual if rodada_atual > 0 else 1, max_value=38, value=38)
+        monte_carlo = st.toggle("Simulação Monte Carlo (chances de título, Libertadores e rebaixamento)", value=True)
+        if monte_carlo:
+            # As temporadas sorteadas ficam em memória para os cenários "e se": até 100 mil (cerca de 80 MB, compartilhados)
+            n_simulacoes = st.select_slider("Número de temporadas simuladas:", options=[10_000, 50_000, 100_000], value=100_000)
         
         if st.button("Simular Tabela", use_container_width=True, type="primary"):
-            with st.spinner(f"Simulando todos os jogos até a rodada {rodada_simulacao}..."):
-                tabela_simulada = simular_campeonato(rodada_simulacao, df_futuro, df_resultados, modelo, encoder, time_stats, colunas_modelo)
-            st.success(f"Tabela de classificação simulada até a rodada {rodada_simulacao}:")
-            st.dataframe(tabela_simulada, hide_index=True, use_container_width=True)
+            if monte_carlo:
+                with st.spinner(f"Simulando {n_simulacoes:,} temporadas até a rodada {rodada_simulacao}..."):
+                    cenario = carregar_cenario(dados, dados.versao, rodada_simulacao, n_simulacoes).copia()
+                st.session_state['cenario'] = ((dados.versao, rodada_simulacao, n_simulacoes), cenario)
+            else:
+                with st.spinner(f"Simulando todos os jogos até a rodada {rodada_simulacao}..."):
+                    tabela_simulada = simular_campeonato(rodada_simulacao, df_futuro, df_resultados, modelo, encoder, time_stats, colunas_modelo, matriz_probabilidades, modelo_gols)
+                st.success(f"Tabela de classificação simulada até a rodada {rodada_simulacao}:")
+                st.dataframe(tabela_simulada, hide_index=True, use_container_width=True)
+
+        # A sessão guarda só a sua cópia do cenário compartilhado (os jogos fixados): fixar resultados refaz a
+        # classificação sem simular tudo de novo
+        chave_cenario, cenario = st.session_state.get('cenario', (None, None))
+        if monte_carlo and cenario is not None and chave_cenario == (dados.versao, rodada_simulacao, n_simulacoes):
+            with st.expander("Cenários: e se...? Fixe o resultado ou o placar de jogos restantes"):
+                jogos_cenario = pd.DataFrame({
+                    'Rodada': pd.to_numeric(cenario.jogos_a_simular['Rodada']).to_numpy(),
+                    'Mandante': cenario.jogos_a_simular['HomeTeam'].to_numpy(),
+                    'Visitante': cenario.jogos_a_simular['AwayTeam'].to_numpy(),
+                    'Casa': cenario.probabilidades[:, 0],
+                    'Empate': cenario.probabilidades[:, 1],
+                    'Fora': cenario.probabilidades[:, 2],
+                    'Fixar resultado': None,
+                    'Gols mandante': float('nan'),
+                    'Gols visitante': float('nan'),
+                })
+                jogos_editados = st.data_editor(
+                    jogos_cenario, hide_index=True, use_container_width=True, key="editor_cenario",
+                    disabled=['Rodada', 'Mandante', 'Visitante', 'Casa', 'Empate', 'Fora'],
+                    column_config={
+                        'Casa': st.column_config.NumberColumn(format="percent"),
+                        'Empate': st.column_config.NumberColumn(format="percent"),
+                        'Fora': st.column_config.NumberColumn(format="percent"),
+                        'Fixar resultado': st.column_config.SelectboxColumn(options=['Casa', 'Empate', 'Visitante']),
+                        'Gols mandante': st.column_config.NumberColumn(min_value=0, step=1),
+                        'Gols visitante': st.column_config.NumberColumn(min_value=0, step=1),
+                    }
+                )
+                fixados = []
+                for _, jogo in jogos_editados.iterrows():
+                    tem_placar = pd.notna(jogo['Gols mandante']) and pd.notna(jogo['Gols visitante'])
+                    if tem_placar or pd.notna(jogo['Fixar resultado']):
+                        fixados.append((jogo['Mandante'], jogo['Visitante'], jogo['Fixar resultado'],
+                                        jogo['Gols mandante'] if tem_placar else None, jogo['Gols visitante'] if tem_placar else None))
+                cenario.definir_fixados(fixados)
+                if cenario.fixados:
+                    st.caption(f"{len(cenario.fixados)} jogo(s) fixado(s). A tabela abaixo já considera o cenário.")
+
+            resumo_simulacao, prob_posicoes = cenario.resultados()
+            st.success(f"Classificação esperada após {n_simulacoes:,} simulações até a rodada {rodada_simulacao}:")
+            st.dataframe(
+                resumo_simulacao, hide_index=True, use_container_width=True,
+                column_config={
+                    'P Médio': st.column_config.NumberColumn(format="%.1f"),
+                    'Posição Média': st.column_config.NumberColumn(format="%.1f"),
+                    'Título': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+                    'Libertadores': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+                    'Rebaixamento': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+                }
+            )
+            st.subheader("Probabilidade de cada posição final")
+            st.dataframe(prob_posicoes.style.format("{:.1%}"), use_container_width=True)
     
     # Confronto Direto        
     elif menu_escolha == "Confronto Direto":
@@ -118,7 +232,7 @@ if df_resultados is not None and modelo is not None:
                     st.warning("Por favor, escolha dois times diferentes.")
                 else:
                     with st.spinner("Buscando histórico de confrontos..."):
-                        resumo, historico_df = gerar_confronto_direto(df_total, time1, time2)
+                        resumo, historico_df = gerar_confronto_direto(df_total, time1, time2, carregar_indice_confrontos(df_total, dados.versao))
                     
                     if resumo is None:
                         st.info(f"Não foram encontrados jogos entre {time1} e {time2} nos dados carregados.")
@@ -141,4 +255,26 @@ if df_resultados is not None and modelo is not None:
             else:
                 st.error("Por favor, selecione os dois times para fazer a análise.")
 else:
-    st.error("Não foi possível carregar os dados ou treinar o modelo.")
\ No newline at end of file
+    st.error("Não foi possível carregar os dados ou treinar o modelo.")
+
+# Painel de desempenho
+with st.sidebar.expander("Desempenho"):
+    st.toggle("Medir tempo e memória das etapas", key='medir_desempenho')
+    coletor = instrumentacao.obter_coletor()
+    if coletor is not None:
+        st.dataframe(coletor.resumo(), hide_index=True, use_container_width=True,
+                     column_config={'Total (s)': st.column_config.NumberColumn(format="%.3f"),
+                                    'Média (ms)': st.column_config.NumberColumn(format="%.1f"),
+                                    'Máx (ms)': st.column_config.NumberColumn(format="%.1f"),
+                                    'Memória (MB)': st.column_config.NumberColumn(format="%.1f")})
+        st.download_button("Exportar medições (JSON)", coletor.para_json(), file_name="desempenho.json",
+                           mime="application/json", use_container_width=True)
+        col1, col2 = st.columns(2)
+        if col1.button("Limpar", use_container_width=True):
+            coletor.limpar()
+            st.rerun()
+        if col2.button("Medir carga a frio", use_container_width=True, help="Descarta o cache do Streamlit e recarrega dados e modelo"):
+            coletor.limpar()
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            st.rerun()
@@ -0,0 +1,118 @@
+import threading
+import time
+from banco_dados import COMPETICAO_PADRAO, atualizar_temporada, carregar_temporada, conectar
+from instrumentacao import medir
+
+# Intervalo mínimo entre duas buscas da temporada no FBref feitas pelo app
+INTERVALO_ATUALIZACAO = 30 * 60
+
+
+class DadosTemporada:
+    """
+    Conjunto imutável de dados e modelo servido pelo app: jogos da temporada, artefato do modelo e o
+    instante em que foram carregados. Uma atualização cria um novo objeto em vez de alterar este.
+    """
+
+    def __init__(self, df_total, artefato, versao):
+        self.df_total = df_total
+        self.df_resultados = df_total[df_total['FTHG'].notna()].copy()
+        self.df_futuro = df_total[df_total['FTHG'].isna()].copy()
+        self.lista_times = sorted(set(df_total['HomeTeam']).union(set(df_total['AwayTeam'])))
+        self.artefato = artefato
+        self.versao = versao
+        self.carregado_em = time.time()
+
+
+class AtualizadorDados:
+    """
+    Mantém os últimos dados e modelo válidos de uma temporada e os renova em uma thread de fundo
+    (stale-while-revalidate): quem lê `dados` recebe sempre um conjunto completo, e o novo conjunto só
+    substitui o anterior, de uma vez, depois de pronto.
+    """
+
+    def __init__(self, ano, competicao=COMPETICAO_PADRAO, intervalo=INTERVALO_ATUALIZACAO):
+        self.ano = ano
+        self.competicao = competicao
+        self.intervalo = intervalo
+        self.dados = None
+        self.ultima_tentativa = 0.0
+        self.ultimo_erro = None
+        self._versao = 0
+        self._trava = threading.Lock()
+        # Uma busca e um treino por vez, seja da thread de fundo ou da primeira carga de uma sessão
+        self._trava_atualizacao = threading.Lock()
+        self._thread = None
+
+    def _montar(self, df_total):
+        # Importado aqui para não carregar o scikit-learn antes de a página ser exibida
+        from model_trainer import obter_modelo
+
+        with medir('app.montar_dados', linhas=len(df_total)):
+            artefato = obter_modelo(df_total[df_total['FTHG'].notna()].copy())
+            with self._trava:
+                self._versao += 1
+                versao = self._versao
+            return DadosTemporada(df_total, artefato, versao)
+
+    def _trocar(self, dados):
+        with self._trava:
+            if self.dados is None or dados.versao > self.dados.versao:
+                self.dados = dados
+
+    def carregar_do_disco(self):
+        """
+        Carrega a temporada já gravada no banco local e o modelo correspondente, sem acessar a rede.
+        Retorna False se a temporada ainda não estiver no banco.
+        """
+        with medir('app.carregar_do_disco'):
+            with conectar() as conexao:
+                df_total = carregar_temporada(conexao, self.ano, self.competicao)
+            if df_total.empty:
+                return False
+            self._trocar(self._montar(df_total))
+            return True
+
+    def atualizar(self):
+        """
+        Busca a temporada no FBref, grava as alterações no banco e, se algo mudou (ou ainda não há dados),
+        monta e publica o novo conjunto. Retorna True se a busca funcionou.
+        Chamadas simultâneas são feitas uma de cada vez; a página é sempre revalidada no FBref (ETag/
+        Last-Modified), e a que espera não treina de novo se os jogos não mudaram.
+        """
+        with self._trava_atualizacao, medir('app.atualizar'):
+            self.ultima_tentativa = time.time()
+            try:
+                with conectar() as conexao:
+                    linhas = atualizar_temporada(conexao, self.ano, self.competicao, ttl=0)
+                    if linhas is None:
+                        self.ultimo_erro = "Falha ao buscar os dados no FBref."
+                        return False
+                    if linhas == 0 and self.dados is not None:
+                        self.ultimo_erro = None
+                        return True
+                    df_total = carregar_temporada(conexao, self.ano, self.competicao)
+                self._trocar(self._montar(df_total))
+                self.ultimo_erro = None
+                return True
+            except Exception as e:
+                print(f"ERRO ao atualizar os dados de {self.ano}: {e}")
+                self.ultimo_erro = str(e)
+                return False
+
+    def em_andamento(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def atualizar_em_segundo_plano(self, forcar=False):
+        """
+        Dispara atualizar() em uma thread de fundo, se não houver outra em andamento e a última tentativa
+        tiver sido há mais de `intervalo` segundos. Retorna True se uma atualização foi iniciada.
+        """
+        with self._trava:
+            if self.em_andamento():
+                return False
+            if not forcar and time.time() - self.ultima_tentativa < self.intervalo:
+                return False
+            self.ultima_tentativa = time.time()
+            self._thread = threading.Thread(target=self.atualizar, name=f"atualizador-{self.ano}", daemon=True)
+            self._thread.start()
+            return True
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import io
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import EstadoFeatures
+from instrumentacao import instrumentar, medir
+from model_trainer import (JANELA_FORMA, MAX_ATUALIZACOES_INCREMENTAIS, aceita_atualizacao_incremental, atualizar_modelo,
+                           calcular_precisao, treinar_modelo)
+from predictor import prever_jogos
+
+CLASSES = ['Casa', 'Empate', 'Visitante']
+# Rodadas iniciais sem previsão e mínimo de jogos de treino para prever uma rodada
+RODADA_INICIAL = 5
+MIN_JOGOS_TREINO = 30
+
+
+def avaliar_previsoes(probabilidades, resultados):
+    """
+    Log-loss, Brier (soma dos erros quadráticos das três classes, média por jogo) e acurácia de
+    probabilidades (n_jogos, 3) na ordem (Casa, Empate, Visitante) contra os resultados observados.
+    """
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    observado = np.searchsorted(CLASSES, np.asarray(resultados))
+    if len(probabilidades) == 0:
+        return {'Jogos': 0, 'Log-loss': np.nan, 'Brier': np.nan, 'Acurácia': np.nan}
+    indicadora = np.zeros_like(probabilidades)
+    indicadora[np.arange(len(observado)), observado] = 1
+    prob_observado = np.clip(probabilidades[np.arange(len(observado)), observado], 1e-15, 1)
+    return {
+        'Jogos': len(observado),
+        'Log-loss': float(-np.mean(np.log(prob_observado))),
+        'Brier': float(np.mean(((probabilidades - indicadora) ** 2).sum(axis=1))),
+        'Acurácia': float(np.mean(np.argmax(probabilidades, axis=1) == observado)),
+    }
+
+
+def _resultado(df_jogos):
+    return np.where(df_jogos['FTHG'] > df_jogos['FTAG'], 'Casa',
+                    np.where(df_jogos['FTHG'] < df_jogos['FTAG'], 'Visitante', 'Empate'))
+
+
+def _artefato_backtest(modelo, encoder, colunas_modelo, estado, df_treino):
+    # O mínimo de um artefato que atualizar_modelo() precisa, montado após um treino completo
+    return {
+        'modelo': modelo,
+        'encoder': encoder,
+        'colunas_modelo': colunas_modelo,
+        'time_stats': estado.times.copia(),
+        'estado_features': estado.para_dict(),
+        'precisao': calcular_precisao(modelo, encoder.montar_jogos(df_treino), modelo.C),
+        'atualizacoes_incrementais': 0,
+    }
+
+
+def _backtest_temporada(temporada, df_anteriores, df_temporada, rodada_inicial, min_jogos_treino, janela,
+                        max_atualizacoes=MAX_ATUALIZACOES_INCREMENTAIS):
+    """
+    Repete uma temporada em ordem cronológica. Antes de cada rodada, ajusta o modelo aos jogos anteriores ao
+    início dela (temporadas anteriores e rodadas já disputadas) e prevê os jogos da rodada com o estado das
+    features naquele momento. O estado é atualizado só com os jogos novos a cada rodada; o modelo também,
+    como no app: até max_atualizacoes atualizações incrementais (atualizar_modelo) entre dois treinos
+    completos (0 retreina do zero a cada rodada; modelos que não são regressão logística sempre retreinam).
+    Executada em um processo separado quando o backtest é paralelizado.
+    """
+    estado = EstadoFeatures(janela=janela)
+    linhas_treino = []
+    contagem = pd.Series(0, index=CLASSES)
+    df_anteriores = df_anteriores.sort_values(by='Date', kind='stable')
+    if not df_anteriores.empty:
+        linhas_treino.append(estado.atualizar(df_anteriores))
+        contagem += linhas_treino[-1]['Resultado'].value_counts().reindex(CLASSES, fill_value=0)
+    artefato, jogos_pendentes = None, []
+
+    df_temporada = df_temporada.copy()
+    df_temporada['Date'] = pd.to_datetime(df_temporada['Date'])
+    df_temporada['Rodada'] = pd.to_numeric(df_temporada['Rodada'])
+    df_temporada = df_temporada.sort_values(by='Date', kind='stable').reset_index(drop=True)
+    # As rodadas são previstas na ordem em que começam; o corte é a data do primeiro jogo da rodada
+    inicio_rodadas = df_temporada.groupby('Rodada')['Date'].min().sort_values(kind='stable')
+    incluidos = 0
+
+    previsoes = []
+    for rodada, inicio in inicio_rodadas.items():
+        disponiveis = int(np.searchsorted(df_temporada['Date'].to_numpy(), np.datetime64(inicio), side='left'))
+        if disponiveis > incluidos:
+            linhas_treino.append(estado.atualizar(df_temporada.iloc[incluidos:disponiveis]))
+            contagem += linhas_treino[-1]['Resultado'].value_counts().reindex(CLASSES, fill_value=0)
+            jogos_pendentes.append(df_temporada.iloc[incluidos:disponiveis])
+            incluidos = disponiveis
+        if rodada < rodada_inicial:
+            continue
+        n_treino = int(contagem.sum())
+        if n_treino < min_jogos_treino or (contagem == 0).any():
+            continue
+
+        if artefato is not None and jogos_pendentes and artefato['atualizacoes_incrementais'] < max_atualizacoes:
+            artefato = atualizar_modelo(artefato, pd.concat(jogos_pendentes, ignore_index=True))
+            modelo, encoder, colunas_modelo = artefato['modelo'], artefato['encoder'], artefato['colunas_modelo']
+        elif artefato is None or jogos_pendentes:
+            df_treino = pd.concat(linhas_treino, ignore_index=True)
+            modelo, encoder, colunas_modelo = treinar_modelo(df_treino.copy())
+            artefato = (_artefato_backtest(modelo, encoder, colunas_modelo, estado, df_treino)
+                        if max_atualizacoes > 0 and aceita_atualizacao_incremental(modelo) else None)
+        jogos_pendentes = []
+
+        jogos_rodada = df_temporada[df_temporada['Rodada'] == rodada]
+        jogos = list(zip(jogos_rodada['HomeTeam'], jogos_rodada['AwayTeam']))
+        probabilidades = prever_jogos(jogos, modelo, encoder, estado.times, colunas_modelo)
+        probabilidades = probabilidades[:, [list(modelo.classes_).index(classe) for classe in CLASSES]]
+
+        # Baseline sem casas de apostas: frequência de cada resultado nos jogos de treino (com suavização)
+        frequencias = (contagem.to_numpy() + 1) / (n_treino + len(CLASSES))
+
+        previsao = pd.DataFrame({
+            'Temporada': temporada,
+            'Rodada': rodada,
+            'Date': jogos_rodada['Date'].to_numpy(),
+            'HomeTeam': jogos_rodada['HomeTeam'].to_numpy(),
+            'AwayTeam': jogos_rodada['AwayTeam'].to_numpy(),
+            'Resultado': _resultado(jogos_rodada),
+            'Jogos Treino': n_treino,
+        })
+        for i, classe in enumerate(CLASSES):
+            previsao[f'P {classe}'] = probabilidades[:, i]
+            previsao[f'Frequência {classe}'] = frequencias[i]
+        previsoes.append(previsao)
+
+    if not previsoes:
+        return pd.DataFrame()
+    return pd.concat(previsoes, ignore_index=True)
+
+
+def _backtest_silencioso(*args):
+    # O treino de cada rodada imprime mensagens; no backtest elas só poluiriam a saída
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return _backtest_temporada(*args)
+
+
+def resumir_backtest(df_previsoes):
+    """
+    Métricas do modelo e das baselines (sempre o mandante e a frequência dos resultados no treino),
+    por temporada e no total.
+    """
+    baselines = {
+        'Modelo': [f'P {classe}' for classe in CLASSES],
+        'Frequências': [f'Frequência {classe}' for classe in CLASSES],
+    }
+    linhas = []
+    grupos = [(temporada, df) for temporada, df in df_previsoes.groupby('Temporada', sort=True)]
+    grupos.append(('Total', df_previsoes))
+    for temporada, df in grupos:
+        for nome, colunas in baselines.items():
+            linhas.append({'Temporada': temporada, 'Previsor': nome, **avaliar_previsoes(df[colunas].to_numpy(), df['Resultado'])})
+        sempre_mandante = np.tile([1.0, 0.0, 0.0], (len(df), 1))
+        linhas.append({'Temporada': temporada, 'Previsor': 'Sempre o mandante',
+                       **avaliar_previsoes(sempre_mandante, df['Resultado'])})
+    return pd.DataFrame(linhas)
+
+
+def tabela_calibracao(df_previsoes, n_faixas=10):
+    """
+    Calibração do modelo: para cada resultado e faixa de probabilidade prevista, a probabilidade média
+    prevista e a frequência observada.
+    """
+    linhas = []
+    for classe in CLASSES:
+        prevista = df_previsoes[f'P {classe}'].to_numpy()
+        observada = (df_previsoes['Resultado'] == classe).to_numpy()
+        faixa = np.minimum((prevista * n_faixas).astype(int), n_faixas - 1)
+        for indice in np.unique(faixa):
+            na_faixa = faixa == indice
+            linhas.append({'Resultado': classe, 'Faixa': f"{indice / n_faixas:.1f}-{(indice + 1) / n_faixas:.1f}",
+                           'Jogos': int(na_faixa.sum()), 'Prevista': float(prevista[na_faixa].mean()),
+                           'Observada': float(observada[na_faixa].mean())})
+    return pd.DataFrame(linhas)
+
+
+@instrumentar('backtest.executar', linhas=lambda resultado: len(resultado[0]))
+def executar_backtest(df_historico, temporadas=None, temporadas_anteriores=1, rodada_inicial=RODADA_INICIAL,
+                      min_jogos_treino=MIN_JOGOS_TREINO, janela=JANELA_FORMA, n_processos=1,
+                      max_atualizacoes=MAX_ATUALIZACOES_INCREMENTAIS):
+    """
+    Backtest walk-forward: cada temporada de `temporadas` (padrão: todas menos a primeira, que só serve de
+    histórico) é repetida rodada a rodada, treinando apenas com os jogos anteriores ao início de cada rodada
+    e com até `temporadas_anteriores` temporadas completas antes dela (1 reproduz o chatbot; 0, o app).
+    Entre dois treinos completos o modelo recebe até `max_atualizacoes` atualizações incrementais, como no app.
+    As temporadas são independentes e rodam em paralelo com n_processos > 1.
+    df_historico precisa da coluna Temporada. Retorna as previsões jogo a jogo e o resumo das métricas.
+    """
+    df_historico = df_historico[df_historico['FTHG'].notna() & df_historico['FTAG'].notna()].copy()
+    df_historico['Date'] = pd.to_datetime(df_historico['Date'])
+    todas = sorted(df_historico['Temporada'].astype(str).unique())
+    df_historico['Temporada'] = df_historico['Temporada'].astype(str)
+    if temporadas is None:
+        temporadas = todas[1:] if len(todas) > 1 else todas
+    temporadas = [str(temporada) for temporada in temporadas]
+
+    argumentos = []
+    for temporada in temporadas:
+        posicao = todas.index(temporada)
+        anteriores = todas[max(0, posicao - temporadas_anteriores):posicao]
+        argumentos.append((temporada, df_historico[df_historico['Temporada'].isin(anteriores)],
+                           df_historico[df_historico['Temporada'] == temporada], rodada_inicial, min_jogos_treino, janela,
+                           max_atualizacoes))
+
+    n_processos = max(1, min(n_processos, len(argumentos)))
+    with medir('backtest.temporadas', linhas=len(argumentos), processos=n_processos):
+        if n_processos == 1:
+            resultados = [_backtest_silencioso(*argumento) for argumento in argumentos]
+        else:
+            with ProcessPoolExecutor(max_workers=n_processos) as executor:
+                resultados = list(executor.map(_backtest_silencioso, *zip(*argumentos)))
+
+    resultados = [resultado for resultado in resultados if not resultado.empty]
+    if not resultados:
+        print("Nenhuma rodada teve dados de treino suficientes para o backtest.")
+        return pd.DataFrame(), pd.DataFrame()
+    df_previsoes = pd.concat(resultados, ignore_index=True)
+    return df_previsoes, resumir_backtest(df_previsoes)
+
+
+if __name__ == "__main__":
+    # Uso: python backtest.py 2015 2016 ... 2024 [--processos 4] [--saida previsoes.csv]
+    from banco_dados import conectar, obter_temporadas
+
+    parser = argparse.ArgumentParser(description="Backtest walk-forward do modelo nas temporadas do banco local.")
+    parser.add_argument('anos', nargs='+', help="Temporadas usadas; a primeira serve só de histórico.")
+    parser.add_argument('--processos', type=int, default=1, help="Temporadas avaliadas em paralelo.")
+    parser.add_argument('--temporadas-anteriores', type=int, default=1,
+                        help="Temporadas completas anteriores incluídas no treino (1 = como o chatbot, 0 = como o app).")
+    parser.add_argument('--rodada-inicial', type=int, default=RODADA_INICIAL, help="Primeira rodada prevista.")
+    parser.add_argument('--max-atualizacoes', type=int, default=MAX_ATUALIZACOES_INCREMENTAIS,
+                        help="Atualizações incrementais do modelo entre dois treinos completos (0 = treino completo a cada rodada).")
+    parser.add_argument('--saida', help="Grava as previsões jogo a jogo em CSV.")
+    args = parser.parse_args()
+
+    with conectar() as conexao:
+        temporadas = obter_temporadas(conexao, args.anos)
+    faltantes = [ano for ano, df in temporadas.items() if df is None]
+    if faltantes:
+        print(f"Não foi possível obter as temporadas: {', '.join(faltantes)}.")
+    historico = pd.concat([df.assign(Temporada=ano) for ano, df in temporadas.items() if df is not None], ignore_index=True)
+
+    df_previsoes, df_metricas = executar_backtest(historico, temporadas=[ano for ano in args.anos[1:] if ano not in faltantes],
+                                                  temporadas_anteriores=args.temporadas_anteriores,
+                                                  rodada_inicial=args.rodada_inicial, n_processos=args.processos,
+                                                  max_atualizacoes=args.max_atualizacoes)
+    if not df_metricas.empty:
+        print(df_metricas.to_string(index=False, float_format=lambda valor: f"{valor:.4f}"))
+        print()
+        print(tabela_calibracao(df_previsoes).to_string(index=False, float_format=lambda valor: f"{valor:.3f}"))
+    if args.saida and not df_previsoes.empty:
+        df_previsoes.to_csv(args.saida, index=False)
+        print(f"Previsões gravadas em {args.saida}.")
@@ -0,0 +1,283 @@
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from instrumentacao import instrumentar
+
+CAMINHO_BANCO = os.environ.get("FUTBOT_BANCO", "futbot.db")
+COMPETICAO_PADRAO = "Serie-A"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidas (
+    competicao TEXT NOT NULL,
+    temporada TEXT NOT NULL,
+    rodada INTEGER,
+    data TEXT,
+    mandante TEXT NOT NULL,
+    visitante TEXT NOT NULL,
+    gols_mandante INTEGER NOT NULL,
+    gols_visitante INTEGER NOT NULL,
+    PRIMARY KEY (competicao, temporada, mandante, visitante)
+);
+CREATE INDEX IF NOT EXISTS idx_partidas_rodada ON partidas (competicao, temporada, rodada);
+CREATE INDEX IF NOT EXISTS idx_partidas_data ON partidas (data);
+CREATE INDEX IF NOT EXISTS idx_partidas_times ON partidas (mandante, visitante);
+
+CREATE TABLE IF NOT EXISTS calendario (
+    competicao TEXT NOT NULL,
+    temporada TEXT NOT NULL,
+    rodada INTEGER,
+    data TEXT,
+    mandante TEXT NOT NULL,
+    visitante TEXT NOT NULL,
+    PRIMARY KEY (competicao, temporada, mandante, visitante)
+);
+CREATE INDEX IF NOT EXISTS idx_calendario_rodada ON calendario (competicao, temporada, rodada);
+CREATE INDEX IF NOT EXISTS idx_calendario_data ON calendario (data);
+CREATE INDEX IF NOT EXISTS idx_calendario_times ON calendario (mandante, visitante);
+
+CREATE TABLE IF NOT EXISTS confrontos (
+    time1 TEXT NOT NULL,
+    time2 TEXT NOT NULL,
+    vitorias_time1 INTEGER NOT NULL,
+    vitorias_time2 INTEGER NOT NULL,
+    empates INTEGER NOT NULL,
+    PRIMARY KEY (time1, time2)
+);
+"""
+
+# Colunas do banco -> colunas usadas pelo restante do pipeline
+COLUNAS_PIPELINE = {
+    'temporada': 'Temporada',
+    'rodada': 'Rodada',
+    'data': 'Date',
+    'mandante': 'HomeTeam',
+    'visitante': 'AwayTeam',
+    'gols_mandante': 'FTHG',
+    'gols_visitante': 'FTAG',
+}
+
+
+@contextmanager
+def conectar(caminho=CAMINHO_BANCO):
+    """
+    Abre (e cria, se necessário) o banco SQLite local com as tabelas e índices do FUTBot, para uso em
+    `with conectar() as conexao:`. Ao sair do bloco confirma as alterações (ou as desfaz, se houver
+    exceção) e fecha a conexão.
+    """
+    conexao = sqlite3.connect(caminho)
+    try:
+        conexao.executescript(ESQUEMA)
+        with conexao:
+            yield conexao
+    finally:
+        conexao.close()
+
+
+def _formatar_data(valor):
+    if pd.isna(valor):
+        return None
+    return pd.Timestamp(valor).strftime('%Y-%m-%d')
+
+
+def _formatar_rodada(valor):
+    rodada = pd.to_numeric(valor, errors='coerce')
+    return None if pd.isna(rodada) else int(rodada)
+
+
+def salvar_jogos(conexao, df_jogos, temporada, competicao=COMPETICAO_PADRAO):
+    """
+    Insere ou atualiza (upsert) os jogos de uma temporada no formato retornado pelo web scraper.
+    Jogos com placar vão para a tabela de partidas e saem do calendário; os demais ficam no calendário.
+    Apenas linhas novas ou alteradas são escritas, então repetir a mesma carga não altera o banco.
+    Retorna o número de linhas escritas.
+    """
+    temporada = str(temporada)
+    realizados = df_jogos[df_jogos['FTHG'].notna() & df_jogos['FTAG'].notna()]
+    futuros = df_jogos[df_jogos['FTHG'].isna() | df_jogos['FTAG'].isna()]
+
+    linhas_partidas = [
+        (competicao, temporada, _formatar_rodada(rodada), _formatar_data(data), casa, visitante, int(gc), int(gv))
+        for rodada, data, casa, visitante, gc, gv in zip(realizados['Rodada'], realizados['Date'], realizados['HomeTeam'],
+                                                         realizados['AwayTeam'], realizados['FTHG'], realizados['FTAG'])
+    ]
+    linhas_calendario = [
+        (competicao, temporada, _formatar_rodada(rodada), _formatar_data(data), casa, visitante)
+        for rodada, data, casa, visitante in zip(futuros['Rodada'], futuros['Date'], futuros['HomeTeam'], futuros['AwayTeam'])
+    ]
+
+    alteracoes_antes = conexao.total_changes
+    with conexao:
+        conexao.executemany("""
+            INSERT INTO partidas (competicao, temporada, rodada, data, mandante, visitante, gols_mandante, gols_visitante)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (competicao, temporada, mandante, visitante) DO UPDATE SET
+                rodada = excluded.rodada, data = excluded.data,
+                gols_mandante = excluded.gols_mandante, gols_visitante = excluded.gols_visitante
+            WHERE partidas.rodada IS NOT excluded.rodada OR partidas.data IS NOT excluded.data
+               OR partidas.gols_mandante IS NOT excluded.gols_mandante
+               OR partidas.gols_visitante IS NOT excluded.gols_visitante
+        """, linhas_partidas)
+        conexao.executemany("""
+            INSERT INTO calendario (competicao, temporada, rodada, data, mandante, visitante)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (competicao, temporada, mandante, visitante) DO UPDATE SET
+                rodada = excluded.rodada, data = excluded.data
+            WHERE calendario.rodada IS NOT excluded.rodada OR calendario.data IS NOT excluded.data
+        """, linhas_calendario)
+        # Jogos que já têm placar deixam de fazer parte do calendário
+        conexao.execute("""
+            DELETE FROM calendario
+            WHERE competicao = ? AND temporada = ? AND EXISTS (
+                SELECT 1 FROM partidas p
+                WHERE p.competicao = calendario.competicao AND p.temporada = calendario.temporada
+                  AND p.mandante = calendario.mandante AND p.visitante = calendario.visitante
+            )
+        """, (competicao, temporada))
+    return conexao.total_changes - alteracoes_antes
+
+
+def salvar_confrontos(conexao, df_confrontos):
+    """
+    Insere ou atualiza a base histórica de confrontos (mesmo formato de historico_confrontos.csv).
+    """
+    linhas = list(zip(df_confrontos['Time1'], df_confrontos['Time2'], df_confrontos['Vitorias_Time1'].astype(int),
+                      df_confrontos['Vitorias_Time2'].astype(int), df_confrontos['Empates'].astype(int)))
+    alteracoes_antes = conexao.total_changes
+    with conexao:
+        conexao.executemany("""
+            INSERT INTO confrontos (time1, time2, vitorias_time1, vitorias_time2, empates) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (time1, time2) DO UPDATE SET
+                vitorias_time1 = excluded.vitorias_time1, vitorias_time2 = excluded.vitorias_time2, empates = excluded.empates
+            WHERE confrontos.vitorias_time1 IS NOT excluded.vitorias_time1
+               OR confrontos.vitorias_time2 IS NOT excluded.vitorias_time2 OR confrontos.empates IS NOT excluded.empates
+        """, linhas)
+    return conexao.total_changes - alteracoes_antes
+
+
+def _filtro_temporadas(temporadas, competicao):
+    condicoes, parametros = ["competicao = ?"], [competicao]
+    if temporadas is not None:
+        temporadas = [str(t) for t in temporadas]
+        condicoes.append(f"temporada IN ({', '.join('?' * len(temporadas))})")
+        parametros.extend(temporadas)
+    return " AND ".join(condicoes), parametros
+
+
+def carregar_partidas(conexao, temporadas=None, competicao=COMPETICAO_PADRAO):
+    """
+    Carrega os jogos já realizados, no formato de colunas esperado pelo pipeline (Date como datetime, como no
+    web scraper).
+    """
+    filtro, parametros = _filtro_temporadas(temporadas, competicao)
+    df = pd.read_sql_query(f"""
+        SELECT temporada, rodada, data, mandante, visitante, gols_mandante, gols_visitante
+        FROM partidas WHERE {filtro} ORDER BY data, rodada
+    """, conexao, params=parametros)
+    df = df.rename(columns=COLUNAS_PIPELINE)
+    df[['FTHG', 'FTAG']] = df[['FTHG', 'FTAG']].astype(float)
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    return df
+
+
+def carregar_calendario(conexao, temporadas=None, competicao=COMPETICAO_PADRAO):
+    """
+    Carrega os jogos ainda não realizados, com FTHG e FTAG vazios como no retorno do web scraper.
+    """
+    filtro, parametros = _filtro_temporadas(temporadas, competicao)
+    df = pd.read_sql_query(f"""
+        SELECT temporada, rodada, data, mandante, visitante, NULL AS gols_mandante, NULL AS gols_visitante
+        FROM calendario WHERE {filtro} ORDER BY data, rodada
+    """, conexao, params=parametros)
+    df = df.rename(columns=COLUNAS_PIPELINE)
+    df[['FTHG', 'FTAG']] = df[['FTHG', 'FTAG']].astype(float)
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    return df
+
+
+def carregar_temporada(conexao, temporada, competicao=COMPETICAO_PADRAO):
+    """
+    Carrega todos os jogos (realizados e futuros) de uma temporada, como o DataFrame do web scraper.
+    """
+    df = pd.concat([carregar_partidas(conexao, [temporada], competicao),
+                    carregar_calendario(conexao, [temporada], competicao)], ignore_index=True)
+    return df.sort_values(by=['Rodada', 'Date'], kind='stable').reset_index(drop=True)
+
+
+def carregar_confrontos(conexao):
+    """
+    Carrega a base histórica de confrontos no formato de historico_confrontos.csv.
+    """
+    return pd.read_sql_query("""
+        SELECT time1 AS Time1, time2 AS Time2, vitorias_time1 AS Vitorias_Time1,
+               vitorias_time2 AS Vitorias_Time2, empates AS Empates
+        FROM confrontos
+    """, conexao)
+
+
+def atualizar_temporada(conexao, ano, competicao=COMPETICAO_PADRAO, ttl=None):
+    """
+    Busca a temporada no FBref e grava no banco apenas os jogos novos ou alterados. `ttl` é a idade
+    máxima (segundos) da página em cache aceita sem revalidar (padrão: web_scraper.TTL_CACHE).
+    Retorna o número de linhas escritas, ou None se a busca falhar.
+    """
+    from web_scraper import TTL_CACHE, buscar_dados_brasileirao
+
+    df = buscar_dados_brasileirao(str(ano), TTL_CACHE if ttl is None else ttl)
+    if df is None:
+        return None
+    return salvar_jogos(conexao, df, ano, competicao)
+
+
+@instrumentar('banco.obter_temporada', linhas=lambda df: 0 if df is None else len(df))
+def obter_temporada(conexao, ano, competicao=COMPETICAO_PADRAO):
+    """
+    Retorna os jogos da temporada a partir do banco local. Só recorre ao web scraper quando a
+    temporada ainda não existe no banco.
+    """
+    df = carregar_temporada(conexao, ano, competicao)
+    if df.empty:
+        if atualizar_temporada(conexao, ano, competicao) is None:
+            return None
+        df = carregar_temporada(conexao, ano, competicao)
+    return df
+
+
+def atualizar_temporadas(conexao, anos, competicoes=(COMPETICAO_PADRAO,), **opcoes_busca):
+    """
+    Busca várias temporadas em paralelo (veja web_scraper.buscar_temporadas) e grava cada uma no banco
+    assim que fica pronta. Retorna {(ano, competicao): linhas escritas ou None se a busca falhar}.
+    """
+    from web_scraper import buscar_temporadas
+
+    alteracoes = {}
+    for ano, competicao, df in buscar_temporadas(anos, competicoes, **opcoes_busca):
+        alteracoes[(ano, competicao)] = None if df is None else salvar_jogos(conexao, df, ano, competicao)
+    return alteracoes
+
+
+@instrumentar('banco.obter_temporadas', linhas=lambda temporadas: sum(len(df) for df in temporadas.values() if df is not None))
+def obter_temporadas(conexao, anos, competicao=COMPETICAO_PADRAO):
+    """
+    Versão de obter_temporada para várias temporadas: as que faltam no banco são buscadas em paralelo.
+    Retorna {ano: DataFrame ou None}.
+    """
+    temporadas = {str(ano): carregar_temporada(conexao, ano, competicao) for ano in anos}
+    faltantes = [ano for ano, df in temporadas.items() if df.empty]
+    if faltantes:
+        for (ano, _), linhas in atualizar_temporadas(conexao, faltantes, (competicao,)).items():
+            temporadas[ano] = None if linhas is None else carregar_temporada(conexao, ano, competicao)
+    return temporadas
+
+
+if __name__ == "__main__":
+    # Uso: python banco_dados.py [ano ...]  -> atualiza o banco com a última rodada de cada temporada
+    anos = sys.argv[1:] or [str(datetime.now().year)]
+    with conectar() as conexao:
+        if carregar_confrontos(conexao).empty and os.path.exists("historico_confrontos.csv"):
+            salvar_confrontos(conexao, pd.read_csv("historico_confrontos.csv"))
+        for (ano, competicao), alteracoes in atualizar_temporadas(conexao, anos).items():
+            if alteracoes is not None:
+                print(f"Temporada {ano} ({competicao}): {alteracoes} linha(s) nova(s) ou alterada(s).")
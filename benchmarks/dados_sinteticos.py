@@ -0,0 +1,223 @@
+import html
+import os
+import numpy as np
+import pandas as pd
+
+DIRETORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Colunas da tabela "Scores & Fixtures" do FBref (atributo data-stat, cabeçalho exibido)
+COLUNAS_FBREF = [
+    ('gameweek', 'Wk'), ('dayofweek', 'Day'), ('date', 'Date'), ('start_time', 'Time'), ('home_team', 'Home'),
+    ('home_xg', 'xG'), ('score', 'Score'), ('away_xg', 'xG'), ('away_team', 'Away'), ('attendance', 'Attendance'),
+    ('venue', 'Venue'), ('referee', 'Referee'), ('match_report', 'Match Report'), ('notes', 'Notes'),
+]
+
+# Textos da coluna Notes da página real (a célula fica vazia na maioria dos jogos)
+OBSERVACOES_FBREF = ['Match played behind closed doors', 'Match played at a neutral venue',
+                     'Match rescheduled from an earlier date']
+
+
+def _tabela_turno(n_times):
+    """
+    Rodadas de um turno pelo método do círculo: lista de rodadas, cada uma com os pares (mandante, visitante).
+    """
+    indices = list(range(n_times))
+    rodadas = []
+    for rodada in range(n_times - 1):
+        jogos = []
+        for i in range(n_times // 2):
+            casa, visitante = indices[i], indices[n_times - 1 - i]
+            if rodada % 2:
+                casa, visitante = visitante, casa
+            jogos.append((casa, visitante))
+        rodadas.append(jogos)
+        indices = [indices[0], indices[-1]] + indices[1:-1]
+    return rodadas
+
+
+def gerar_liga(n_times=20, n_temporadas=1, rodadas_jogadas=None, semente=0, ano_final=2025):
+    """
+    Gera temporadas sintéticas de um campeonato de pontos corridos (turno e returno), no mesmo formato
+    devolvido por buscar_dados_brasileirao (Rodada, Date, HomeTeam, AwayTeam, FTHG, FTAG) mais a coluna
+    Temporada. Os gols seguem uma Poisson com a força de cada time, que varia um pouco entre temporadas;
+    a cada ano os 4 últimos da temporada anterior dão lugar a times novos. Na última temporada apenas as
+    `rodadas_jogadas` primeiras rodadas têm placar (None: todas). O resultado depende só dos parâmetros.
+    """
+    if n_times % 2:
+        raise ValueError("n_times deve ser par.")
+    rng = np.random.default_rng(semente)
+    total_rodadas = 2 * (n_times - 1)
+    rodadas_jogadas = total_rodadas if rodadas_jogadas is None else rodadas_jogadas
+    turno = _tabela_turno(n_times)
+    rodadas = turno + [[(visitante, casa) for casa, visitante in jogos] for jogos in turno]
+
+    proximo_time = n_times
+    times = [f"Time {i:03d}" for i in range(n_times)]
+    forca = dict(zip(times, rng.normal(0, 0.4, n_times)))
+    temporadas = []
+    for ano in range(ano_final - n_temporadas + 1, ano_final + 1):
+        ordem = rng.permutation(n_times)
+        elenco = [times[i] for i in ordem]
+        ataque = np.array([forca[time] for time in elenco])
+        inicio = pd.Timestamp(f"{ano}-04-01")
+        ultima = ano == ano_final
+        linhas = []
+        for numero, jogos in enumerate(rodadas, 1):
+            casa = np.array([jogo[0] for jogo in jogos])
+            visitante = np.array([jogo[1] for jogo in jogos])
+            gols_casa = rng.poisson(np.exp(0.3 + ataque[casa] - 0.5 * ataque[visitante])).astype(float)
+            gols_visitante = rng.poisson(np.exp(ataque[visitante] - 0.5 * ataque[casa])).astype(float)
+            if ultima and numero > rodadas_jogadas:
+                gols_casa[:] = np.nan
+                gols_visitante[:] = np.nan
+            for k in range(len(jogos)):
+                data = inicio + pd.Timedelta(days=7 * (numero - 1) + k % 3)
+                linhas.append((str(numero), data.strftime('%Y-%m-%d'), elenco[casa[k]], elenco[visitante[k]],
+                               gols_casa[k], gols_visitante[k]))
+        df = pd.DataFrame(linhas, columns=['Rodada', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+        df['Temporada'] = str(ano)
+        temporadas.append(df)
+
+        # Os 4 times mais fracos são rebaixados e as forças variam um pouco para a próxima temporada
+        for time in sorted(elenco, key=forca.get)[:4]:
+            times.remove(time)
+            novo = f"Time {proximo_time:03d}"
+            proximo_time += 1
+            times.append(novo)
+            forca[novo] = rng.normal(-0.2, 0.3)
+        for time in times:
+            forca[time] += rng.normal(0, 0.1)
+    return pd.concat(temporadas, ignore_index=True)
+
+
+def gerar_base_confrontos(df_jogos, semente=0):
+    """
+    Gera uma base histórica de confrontos (mesmo formato de historico_confrontos.csv) para os times de df_jogos.
+    """
+    rng = np.random.default_rng(semente)
+    times = sorted(set(df_jogos['HomeTeam']) | set(df_jogos['AwayTeam']))
+    pares = [(a, b) for i, a in enumerate(times) for b in times[i + 1:]]
+    vitorias = rng.integers(0, 30, size=(len(pares), 3))
+    return pd.DataFrame({
+        'Time1': [a for a, _ in pares], 'Time2': [b for _, b in pares],
+        'Vitorias_Time1': vitorias[:, 0], 'Vitorias_Time2': vitorias[:, 1], 'Empates': vitorias[:, 2],
+    })
+
+
+def gerar_pagina_fbref(df_temporada, ano, semente=0):
+    """
+    Monta o HTML sintético de uma página "Scores & Fixtures" do FBref para a temporada, imitando a estrutura
+    da página real: tabela sched_{ano}_24_1, células com data-stat e links, linhas separadoras entre rodadas,
+    cabeçalhos repetidos, observações na coluna Notes e uma tabela de estatísticas dentro de um comentário
+    HTML (como o FBref entrega as tabelas secundárias). Não substitui uma página real salva.
+    """
+    rng = np.random.default_rng(semente)
+    cabecalho = ''.join(f'<th aria-label="{rotulo}" data-stat="{stat}" scope="col">{rotulo}</th>'
+                        for stat, rotulo in COLUNAS_FBREF)
+    linhas = []
+    rodada_anterior = None
+    for i, jogo in enumerate(df_temporada.itertuples(index=False)):
+        if rodada_anterior is not None and jogo.Rodada != rodada_anterior:
+            linhas.append(f'<tr class="spacer partial_table result_all"><td colspan="{len(COLUNAS_FBREF)}"></td></tr>')
+            if int(jogo.Rodada) % 10 == 0:
+                linhas.append(f'<tr class="thead">{cabecalho}</tr>')
+        rodada_anterior = jogo.Rodada
+        realizado = pd.notna(jogo.FTHG)
+        if realizado:
+            placar = f'<a href="/en/matches/{i:08x}/">{int(jogo.FTHG)}&ndash;{int(jogo.FTAG)}</a>'
+            xg_casa, xg_visitante = (f'{x:.1f}' for x in rng.gamma(2.0, 0.7, 2))
+            publico = f'{int(rng.integers(5000, 60000)):,}'
+            relatorio = 'Match Report'
+        else:
+            placar = xg_casa = xg_visitante = publico = ''
+            relatorio = 'Head-to-Head'
+        casa, visitante = html.escape(jogo.HomeTeam), html.escape(jogo.AwayTeam)
+        linhas.append(
+            f'<tr><th scope="row" class="right" data-stat="gameweek">{jogo.Rodada}</th>'
+            f'<td class="left" data-stat="dayofweek">{pd.Timestamp(jogo.Date).strftime("%a")}</td>'
+            f'<td class="left" data-stat="date" csk="{jogo.Date.replace("-", "")}"><a href="/en/matches/{jogo.Date}">{jogo.Date}</a></td>'
+            f'<td class="right" data-stat="start_time" csk="16:00:00"><span class="venuetime">16:00</span></td>'
+            f'<td class="right" data-stat="home_team"><a href="/en/squads/{i:08x}/">{casa}</a></td>'
+            f'<td class="right" data-stat="home_xg">{xg_casa}</td>'
+            f'<td class="center" data-stat="score">{placar}</td>'
+            f'<td class="right" data-stat="away_xg">{xg_visitante}</td>'
+            f'<td class="left" data-stat="away_team"><a href="/en/squads/{i:08x}/">{visitante}</a></td>'
+            f'<td class="right" data-stat="attendance">{publico}</td>'
+            f'<td class="left" data-stat="venue">Estádio {i % 20}</td>'
+            f'<td class="left" data-stat="referee">Árbitro {i % 30}</td>'
+            f'<td class="left" data-stat="match_report"><a href="/en/matches/{i:08x}/">{relatorio}</a></td>'
+            f'<td class="left" data-stat="notes">{OBSERVACOES_FBREF[i % len(OBSERVACOES_FBREF)] if i % 17 == 0 else ""}</td></tr>'
+        )
+    # Tabelas secundárias vêm comentadas e só são inseridas no DOM pelo JavaScript da página
+    comentada = (
+        '<div class="placeholder"></div>\n<!--\n<div class="table_container" id="div_stats_squads_standard_for">'
+        '<table class="stats_table" id="stats_squads_standard_for"><caption>Squad Standard Stats Table</caption>'
+        '<thead><tr class="over_header"><th colspan="2">Playing Time</th></tr><tr><th data-stat="team">Squad</th>'
+        '<th data-stat="games">MP</th></tr></thead><tbody>'
+        + ''.join(f'<tr><th data-stat="team"><a href="/en/squads/{k:08x}/">{html.escape(time)}</a></th>'
+                  f'<td data-stat="games">{k}</td></tr>' for k, time in enumerate(sorted(set(df_temporada['HomeTeam']))))
+        + '</tbody></table></div>\n-->\n'
+    )
+    return (
+        f'<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+        f'<title>{ano} Serie A Scores &amp; Fixtures | FBref.com</title></head><body><div id="content">\n'
+        f'<div class="table_container" id="div_sched_{ano}_24_1">'
+        f'<table class="stats_table sortable min_width" id="sched_{ano}_24_1" data-cols-to-freeze=",3">'
+        f'<caption>Scores &amp; Fixtures Table</caption>\n<thead><tr>{cabecalho}</tr></thead>\n<tbody>\n'
+        + '\n'.join(linhas) +
+        '\n</tbody></table></div>\n' + comentada + '</div></body></html>\n'
+    )
+
+
+def gerar_pagina_multicompeticao(df_temporada, ano, tabelas_extras=12, linhas_por_tabela=600, semente=0):
+    """
+    Página grande como as de clube/temporada do FBref com várias competições: a tabela de jogos seguida de
+    várias tabelas de estatísticas (elenco, jogadores, outras competições) que o extrator deve ignorar.
+    """
+    rng = np.random.default_rng(semente)
+    pagina = gerar_pagina_fbref(df_temporada, ano, semente)
+    extras = []
+    for k in range(tabelas_extras):
+        valores = rng.integers(0, 1000, size=(linhas_por_tabela, 20))
+        cabecalho = ''.join(f'<th data-stat="estat_{j}" scope="col">E{j}</th>' for j in range(20))
+        corpo = ''.join(
+            f'<tr><th data-stat="jogador" scope="row"><a href="/en/players/{k}{i}/">Jogador {k}-{i}</a></th>'
+            + ''.join(f'<td class="right" data-stat="estat_{j}">{v}</td>' for j, v in enumerate(linha)) + '</tr>'
+            for i, linha in enumerate(valores))
+        extras.append(f'<div class="table_container"><table class="stats_table" id="stats_{k}">'
+                      f'<caption>Estatísticas {k}</caption><thead><tr><th>Jogador</th>{cabecalho}</tr></thead>'
+                      f'<tbody>{corpo}</tbody></table></div>\n')
+    return pagina.replace('</div></body></html>', ''.join(extras) + '</div></body></html>')
+
+
+def gerar_pagina_tabela_comentada(df_temporada, ano, semente=0):
+    """
+    Página com uma versão antiga da tabela de jogos (outro id sched_, placares invertidos) dentro de um
+    comentário HTML antes da tabela visível; o extrator deve ler só a tabela fora do comentário.
+    """
+    pagina = gerar_pagina_fbref(df_temporada, ano, semente)
+    antiga = gerar_pagina_fbref(df_temporada.rename(columns={'FTHG': 'FTAG', 'FTAG': 'FTHG'}), ano, semente)
+    inicio = antiga.index('<div class="table_container" id="div_sched_')
+    tabela = antiga[inicio:antiga.index('</table></div>', inicio) + len('</table></div>')]
+    tabela = tabela.replace(f'sched_{ano}_24_1', f'sched_{ano}_24_0')
+    return pagina.replace('<div class="table_container" id="div_sched_', f'<!--\n{tabela}\n-->\n<div class="table_container" id="div_sched_', 1)
+
+
+def caminho_fixture(ano):
+    return os.path.join(DIRETORIO_FIXTURES, f"fbref_serie_a_{ano}.html")
+
+
+def gerar_fixtures(semente=0):
+    """
+    Regrava as páginas salvas usadas pelos benchmarks: uma temporada completa (2024) e uma em andamento (2025).
+    """
+    df = gerar_liga(n_times=20, n_temporadas=2, rodadas_jogadas=25, semente=semente)
+    os.makedirs(DIRETORIO_FIXTURES, exist_ok=True)
+    for ano, df_temporada in df.groupby('Temporada'):
+        with open(caminho_fixture(ano), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(gerar_pagina_fbref(df_temporada, ano, semente))
+
+
+if __name__ == "__main__":
+    gerar_fixtures()
+    print(f"Páginas salvas em {DIRETORIO_FIXTURES}")
@@ -0,0 +1,390 @@
+"""
+Benchmarks do pipeline (parsing do FBref, features, treino, previsão, simulação e confronto direto) com dados
+sintéticos reprodutíveis. Cada etapa é medida `--repeticoes` vezes (tempo de relógio) e uma vez a mais com
+tracemalloc (pico de memória alocada pelo Python/NumPy). O resultado é gravado em JSON junto com o commit e as
+versões das bibliotecas, para comparar execuções entre commits:
+
+    python -m benchmarks.executar --times 20 --temporadas 5 --saida atual.json
+    python -m benchmarks.executar --saida novo.json --comparar atual.json
+
+As etapas de download servem as páginas de benchmarks/fixtures em um servidor HTTP local, que pode simular a
+latência e as falhas (HTTP 503) do FBref; as duas etapas de buscar_temporadas comparam os downloads em série e
+com várias conexões simultâneas:
+
+    python -m benchmarks.executar --etapas buscar_temporadas_serial buscar_temporadas_paralelo \
+        --latencia-ms 300 --taxa-503 0.2 --downloads 8 --concorrencia 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+import web_scraper
+from analysis import IndiceConfrontos, gerar_confronto_direto
+from benchmarks.dados_sinteticos import DIRETORIO_FIXTURES, gerar_base_confrontos, gerar_liga
+from feature_engineering import preparar_dados_para_modelo
+from model_trainer import JANELA_FORMA, treinar_modelo
+from modelo_gols import ModeloGols
+from predictor import CenarioSimulacao, prever_jogo_especifico, simular_campeonato, simular_campeonato_monte_carlo
+
+# Jogos fixados, um de cada vez, na etapa cenario_editar
+EDICOES_CENARIO = 5
+# Espera antes de repetir um download que falhou, nas etapas de buscar_temporadas (a do scraper é de segundos)
+ESPERA_RETENTATIVA = 0.05
+
+
+class _ServidorFixtures(BaseHTTPRequestHandler):
+    """
+    Serve as páginas salvas em benchmarks/fixtures no caminho em que o FBref publica cada temporada.
+    Cada resposta espera `latencia` segundos e, com probabilidade `taxa_503`, é um HTTP 503 (sorteado com
+    `sorteio`, para que a sequência de falhas se repita com a mesma semente).
+    """
+    latencia = 0.0
+    taxa_503 = 0.0
+    sorteio = random.Random(0)
+    _trava = threading.Lock()
+
+    def do_GET(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._trava:
+            falhar = self.taxa_503 > 0 and self.sorteio.random() < self.taxa_503
+        if falhar:
+            self.send_error(503)
+            return
+        ano = self.path.rstrip('/').rsplit('/', 1)[-1].split('-', 1)[0]
+        caminho = os.path.join(DIRETORIO_FIXTURES, f"fbref_serie_a_{ano}.html")
+        if not os.path.exists(caminho):
+            self.send_error(404)
+            return
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def servidor_fixtures(latencia=0.0, taxa_503=0.0, semente=0):
+    """
+    Sobe um servidor HTTP local com as páginas salvas e aponta o web_scraper para ele (com cache vazio).
+    latencia (segundos) e taxa_503 simulam um servidor lento e instável.
+    """
+    _ServidorFixtures.latencia, _ServidorFixtures.taxa_503 = latencia, taxa_503
+    _ServidorFixtures.sorteio = random.Random(semente)
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ServidorFixtures)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    url_base, diretorio_cache = web_scraper.URL_BASE, web_scraper.DIRETORIO_CACHE
+    try:
+        with tempfile.TemporaryDirectory() as diretorio:
+            web_scraper.URL_BASE = f"http://127.0.0.1:{servidor.server_address[1]}"
+            web_scraper.DIRETORIO_CACHE = diretorio
+            yield diretorio
+    finally:
+        web_scraper.URL_BASE, web_scraper.DIRETORIO_CACHE = url_base, diretorio_cache
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def _anos_fixtures():
+    return sorted(nome[len('fbref_serie_a_'):-len('.html')] for nome in os.listdir(DIRETORIO_FIXTURES)
+                  if nome.startswith('fbref_serie_a_') and nome.endswith('.html'))
+
+
+def montar_etapas(args):
+    """
+    Lista ordenada de (nome, função). Cada função recebe o contexto compartilhado, que guarda os
+    resultados das etapas anteriores.
+    """
+    def dados_sinteticos(ctx):
+        df = gerar_liga(args.times, args.temporadas, args.rodadas, args.semente)
+        atual = df['Temporada'] == df['Temporada'].max()
+        ctx['df_total'] = df[atual].drop(columns='Temporada').reset_index(drop=True)
+        ctx['df_resultados'] = df[df['FTHG'].notna()].drop(columns='Temporada')
+        ctx['df_resultados_atuais'] = ctx['df_total'][ctx['df_total']['FTHG'].notna()]
+        ctx['df_futuro'] = ctx['df_total'][ctx['df_total']['FTHG'].isna()]
+        ctx['base_confrontos'] = gerar_base_confrontos(df, args.semente)
+        return len(df)
+
+    def parsing_fbref(ctx):
+        total = 0
+        for ano in _anos_fixtures():
+            with open(os.path.join(DIRETORIO_FIXTURES, f"fbref_serie_a_{ano}.html"), encoding='utf-8') as arquivo:
+                total += len(web_scraper.processar_pagina(arquivo.read(), ano))
+        return total
+
+    def parsing_fbref_read_html(ctx):
+        total = 0
+        for ano in _anos_fixtures():
+            with open(os.path.join(DIRETORIO_FIXTURES, f"fbref_serie_a_{ano}.html"), encoding='utf-8') as arquivo:
+                total += len(web_scraper.processar_pagina_read_html(arquivo.read(), ano))
+        return total
+
+    latencia = args.latencia_ms / 1000
+
+    def buscar_dados_brasileirao(ctx):
+        # Sem falhas injetadas: buscar_dados_brasileirao não repete o download
+        total = 0
+        with servidor_fixtures(latencia):
+            for ano in _anos_fixtures():
+                df = web_scraper.buscar_dados_brasileirao(ano)
+                if df is None:
+                    raise RuntimeError(f"Falha ao processar a página salva de {ano}.")
+                total += len(df)
+        return total
+
+    def buscar_temporadas(max_concorrencia):
+        # args.downloads páginas (as temporadas salvas, repetidas), sempre baixadas de novo (ttl=0) e sem o
+        # limite de requisições por segundo, para medir só o efeito das conexões simultâneas
+        def etapa(ctx):
+            anos = _anos_fixtures()
+            total = 0
+            with servidor_fixtures(latencia, args.taxa_503, args.semente):
+                for _, _, df in web_scraper.buscar_temporadas(
+                        [anos[i % len(anos)] for i in range(args.downloads)], max_concorrencia=max_concorrencia,
+                        requisicoes_por_segundo=0, espera_inicial=ESPERA_RETENTATIVA, processos=1, ttl=0):
+                    total += 0 if df is None else len(df)
+            return total
+        return etapa
+
+    def preparar_dados(ctx):
+        ctx['df_treino'], ctx['time_stats'] = preparar_dados_para_modelo(ctx['df_resultados'].copy(), JANELA_FORMA)
+        return len(ctx['df_treino'])
+
+    def treinar(ctx):
+        ctx['modelo'], ctx['encoder'], ctx['colunas_modelo'] = treinar_modelo(ctx['df_treino'])
+        return len(ctx['df_treino'])
+
+    def ajustar_modelo_gols(ctx):
+        ctx['modelo_gols'] = ModeloGols.ajustar(ctx['df_resultados'])
+        return len(ctx['df_resultados'])
+
+    def prever_jogos(ctx):
+        jogos = ctx['df_futuro']
+        for casa, visitante in zip(jogos['HomeTeam'], jogos['AwayTeam']):
+            prever_jogo_especifico(casa, visitante, ctx['modelo'], ctx['encoder'], ctx['time_stats'], ctx['colunas_modelo'])
+        return len(jogos)
+
+    def simular(ctx):
+        rodada_final = int(pd.to_numeric(ctx['df_total']['Rodada']).max())
+        simular_campeonato(rodada_final, ctx['df_futuro'], ctx['df_resultados_atuais'], ctx['modelo'],
+                           ctx['encoder'], ctx['time_stats'], ctx['colunas_modelo'], modelo_gols=ctx['modelo_gols'])
+        return len(ctx['df_futuro'])
+
+    def simular_monte_carlo(ctx):
+        rodada_final = int(pd.to_numeric(ctx['df_total']['Rodada']).max())
+        simular_campeonato_monte_carlo(rodada_final, ctx['df_futuro'], ctx['df_resultados_atuais'], ctx['modelo'],
+                                       ctx['encoder'], ctx['time_stats'], ctx['colunas_modelo'],
+                                       n_simulacoes=args.simulacoes, semente=args.semente)
+        return args.simulacoes
+
+    def simular_monte_carlo_gols(ctx):
+        # Mesma simulação sorteando também o placar de cada jogo (saldo e gols pró simulados)
+        rodada_final = int(pd.to_numeric(ctx['df_total']['Rodada']).max())
+        simular_campeonato_monte_carlo(rodada_final, ctx['df_futuro'], ctx['df_resultados_atuais'], ctx['modelo'],
+                                       ctx['encoder'], ctx['time_stats'], ctx['colunas_modelo'],
+                                       n_simulacoes=args.simulacoes, semente=args.semente,
+                                       modelo_gols=ctx['modelo_gols'])
+        return args.simulacoes
+
+    def preparar_cenario(ctx):
+        rodada_final = int(pd.to_numeric(ctx['df_total']['Rodada']).max())
+        ctx['cenario'] = CenarioSimulacao.preparar(rodada_final, ctx['df_futuro'], ctx['df_resultados_atuais'],
+                                                   ctx['modelo'], ctx['encoder'], ctx['time_stats'],
+                                                   ctx['colunas_modelo'], n_simulacoes=args.simulacoes,
+                                                   semente=args.semente, modelo_gols=ctx['modelo_gols'])
+        ctx['cenario'].resultados()
+        return args.simulacoes
+
+    def editar_cenario(ctx):
+        # Fixa, um a um, os resultados dos primeiros jogos restantes, recalculando a tabela a cada edição
+        if 'cenario' not in ctx:
+            preparar_cenario(ctx)
+        cenario = ctx['cenario']
+        cenario.limpar()
+        jogos = list(zip(ctx['df_futuro']['HomeTeam'], ctx['df_futuro']['AwayTeam']))[:EDICOES_CENARIO]
+        for i, (casa, visitante) in enumerate(jogos):
+            cenario.fixar(casa, visitante, ('Casa', 'Empate', 'Visitante')[i % 3])
+            cenario.resultados()
+        return len(jogos)
+
+    def confronto_direto(ctx):
+        indice = IndiceConfrontos(ctx['base_confrontos'], ctx['df_resultados'])
+        times = sorted(set(ctx['df_total']['HomeTeam']))
+        pares = [(a, b) for i, a in enumerate(times) for b in times[i + 1:]]
+        for time_a, time_b in pares:
+            gerar_confronto_direto(ctx['df_resultados'], time_a, time_b, indice)
+        return len(pares)
+
+    etapas = [
+        ('dados_sinteticos', dados_sinteticos),
+        ('parsing_fbref', parsing_fbref),
+        ('parsing_fbref_read_html', parsing_fbref_read_html),
+        ('buscar_dados_brasileirao', buscar_dados_brasileirao),
+        ('buscar_temporadas_serial', buscar_temporadas(1)),
+        ('buscar_temporadas_paralelo', buscar_temporadas(args.concorrencia)),
+        ('preparar_dados_para_modelo', preparar_dados),
+        ('treinar_modelo', treinar),
+        ('ajustar_modelo_gols', ajustar_modelo_gols),
+        ('prever_jogo_especifico', prever_jogos),
+        ('simular_campeonato', simular),
+        ('simular_campeonato_monte_carlo', simular_monte_carlo),
+        ('simular_campeonato_monte_carlo_gols', simular_monte_carlo_gols),
+        ('cenario_preparar', preparar_cenario),
+        ('cenario_editar', editar_cenario),
+        ('gerar_confronto_direto', confronto_direto),
+    ]
+    if args.etapas:
+        selecionadas = set(args.etapas)
+        # As etapas que produzem dados usados pelas seguintes sempre rodam
+        selecionadas |= {'dados_sinteticos', 'preparar_dados_para_modelo', 'treinar_modelo', 'ajustar_modelo_gols'}
+        etapas = [(nome, funcao) for nome, funcao in etapas if nome in selecionadas]
+    return etapas
+
+
+def medir_etapa(funcao, contexto, repeticoes):
+    """
+    Executa a etapa `repeticoes` vezes medindo o tempo e uma vez com tracemalloc para o pico de memória.
+    A saída impressa e os avisos do pipeline são descartados.
+    """
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            itens = funcao(contexto)
+            tempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        try:
+            funcao(contexto)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'tempo_mediano_s': statistics.median(tempos),
+        'tempo_min_s': min(tempos),
+        'tempo_max_s': max(tempos),
+        'repeticoes': repeticoes,
+        'pico_memoria_mb': pico / 2 ** 20,
+        'itens': itens,
+    }
+
+
+def _commit_atual():
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=raiz, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(args):
+    contexto = {}
+    resultados = {}
+    for nome, funcao in montar_etapas(args):
+        resultados[nome] = medir_etapa(funcao, contexto, args.repeticoes)
+        print(f"{nome:<32} {resultados[nome]['tempo_mediano_s'] * 1000:>10.1f} ms "
+              f"{resultados[nome]['pico_memoria_mb']:>9.1f} MB", file=sys.stderr)
+    return {
+        'commit': _commit_atual(),
+        'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'parametros': {
+            'times': args.times, 'temporadas': args.temporadas, 'rodadas': args.rodadas,
+            'simulacoes': args.simulacoes, 'semente': args.semente, 'repeticoes': args.repeticoes,
+            'latencia_ms': args.latencia_ms, 'taxa_503': args.taxa_503, 'downloads': args.downloads,
+            'concorrencia': args.concorrencia,
+        },
+        'ambiente': {
+            'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+        },
+        'etapas': resultados,
+    }
+
+
+def comparar(atual, referencia):
+    """
+    Imprime a razão entre o tempo mediano e o pico de memória de cada etapa e os da execução de referência.
+    """
+    print(f"\nComparação com {referencia.get('commit') or 'referência'} (atual / referência):", file=sys.stderr)
+    for nome, medidas in atual['etapas'].items():
+        anterior = referencia['etapas'].get(nome)
+        if not anterior:
+            continue
+        razao_tempo = medidas['tempo_mediano_s'] / anterior['tempo_mediano_s'] if anterior['tempo_mediano_s'] else float('nan')
+        razao_memoria = medidas['pico_memoria_mb'] / anterior['pico_memoria_mb'] if anterior['pico_memoria_mb'] else float('nan')
+        print(f"{nome:<32} tempo x{razao_tempo:>6.2f}   memória x{razao_memoria:>6.2f}", file=sys.stderr)
+
+
+def comparar_downloads(resultado):
+    """
+    Imprime quantas vezes os downloads com várias conexões foram mais rápidos que os downloads em série.
+    """
+    serial = resultado['etapas'].get('buscar_temporadas_serial')
+    paralelo = resultado['etapas'].get('buscar_temporadas_paralelo')
+    if not serial or not paralelo:
+        return
+    parametros = resultado['parametros']
+    print(f"\nDownloads: {parametros['downloads']} páginas, latência {parametros['latencia_ms']:.0f} ms, "
+          f"{parametros['taxa_503']:.0%} de HTTP 503; {parametros['concorrencia']} conexões são "
+          f"x{serial['tempo_mediano_s'] / paralelo['tempo_mediano_s']:.2f} mais rápidas que 1.", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline do FUTBot com dados sintéticos.")
+    parser.add_argument('--times', type=int, default=20, help="Times por temporada (par).")
+    parser.add_argument('--temporadas', type=int, default=3, help="Temporadas geradas (a última fica em andamento).")
+    parser.add_argument('--rodadas', type=int, default=25, help="Rodadas já jogadas na última temporada.")
+    parser.add_argument('--simulacoes', type=int, default=10_000, help="Simulações do Monte Carlo.")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--etapas', nargs='*', help="Executa apenas estas etapas.")
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help="Latência de cada resposta do servidor local.")
+    parser.add_argument('--taxa-503', type=float, default=0.0, help="Fração das respostas do servidor local que são HTTP 503.")
+    parser.add_argument('--downloads', type=int, default=8, help="Páginas baixadas nas etapas de buscar_temporadas.")
+    parser.add_argument('--concorrencia', type=int, default=4, help="Downloads simultâneos em buscar_temporadas_paralelo.")
+    parser.add_argument('--saida', help="Arquivo JSON de saída (padrão: imprime na saída padrão).")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparação.")
+    args = parser.parse_args(argv)
+
+    resultado = executar(args)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+    else:
+        print(texto)
+    comparar_downloads(resultado)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(resultado, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
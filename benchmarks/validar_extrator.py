@@ -0,0 +1,128 @@
+"""
+Confere que o extrator direto da tabela de jogos (web_scraper.extrair_calendario) produz os mesmos jogos que o
+caminho antigo com pd.read_html em um conjunto de páginas salvas, e compara o tempo dos dois:
+
+    python -m benchmarks.validar_extrator [pagina.html ...]
+    python -m benchmarks.validar_extrator --salvar 2024 2025
+
+Sem argumentos usa as páginas de benchmarks/fixtures (sintéticas, geradas por dados_sinteticos), as páginas
+reais salvas em benchmarks/fixtures/reais e duas páginas geradas na hora: uma grande com várias tabelas e uma
+com uma tabela de jogos antiga dentro de um comentário HTML.
+--salvar baixa do FBref as páginas das temporadas indicadas para benchmarks/fixtures/reais, onde passam a
+fazer parte do corpus de validação.
+Termina com código 1 se alguma página divergir ou se não houver nenhuma página real no corpus.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import (DIRETORIO_FIXTURES, gerar_liga, gerar_pagina_multicompeticao,
+                                         gerar_pagina_tabela_comentada)
+from web_scraper import baixar_pagina, extrair_calendario, montar_url, processar_pagina_read_html
+
+DIRETORIO_REAIS = os.path.join(DIRETORIO_FIXTURES, 'reais')
+COLUNAS_COMUNS = ['Rodada', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
+
+
+def _normalizar_read_html(df):
+    """
+    Converte a saída do caminho com read_html para os tipos emitidos pelo extrator.
+    """
+    return pd.DataFrame({
+        'Rodada': pd.to_numeric(df['Rodada']).astype('int64').to_numpy(),
+        'Date': pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce').to_numpy(),
+        'HomeTeam': df['HomeTeam'].astype(object).to_numpy(),
+        'AwayTeam': df['AwayTeam'].astype(object).to_numpy(),
+        'FTHG': df['FTHG'].astype(float).to_numpy(),
+        'FTAG': df['FTAG'].astype(float).to_numpy(),
+    })
+
+
+def _tempo(funcao, *args, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def validar_pagina(nome, html, ano='0'):
+    """
+    Compara as duas extrações de uma página. Retorna (ok, tempo read_html, tempo extrator).
+    """
+    esperado = _normalizar_read_html(processar_pagina_read_html(html, ano))
+    obtido = extrair_calendario(html)
+    try:
+        pd.testing.assert_frame_equal(obtido[COLUNAS_COMUNS].astype({'HomeTeam': object, 'AwayTeam': object}),
+                                      esperado, check_dtype=False)
+        ok = True
+    except AssertionError as e:
+        print(f"DIVERGÊNCIA em {nome}: {e}")
+        ok = False
+    tempo_antigo = _tempo(processar_pagina_read_html, html, ano)
+    tempo_novo = _tempo(extrair_calendario, html)
+    extras = [c for c in obtido.columns if c not in COLUNAS_COMUNS]
+    print(f"{nome:<40} {len(obtido):>5} jogos  read_html {tempo_antigo * 1000:>8.1f} ms  "
+          f"extrator {tempo_novo * 1000:>7.1f} ms  x{tempo_antigo / tempo_novo:>5.1f}  "
+          f"{'ok' if ok else 'DIVERGE'}  {' '.join(extras)}")
+    return ok, tempo_antigo, tempo_novo
+
+
+def salvar_paginas_reais(anos, competicao='Serie-A'):
+    """
+    Baixa (sem usar o cache) as páginas reais do FBref das temporadas e as grava em DIRETORIO_REAIS.
+    Retorna os caminhos gravados; temporadas que falharem são avisadas e ignoradas.
+    """
+    os.makedirs(DIRETORIO_REAIS, exist_ok=True)
+    caminhos = []
+    for ano in anos:
+        try:
+            html = baixar_pagina(montar_url(ano, competicao), ttl=0)
+        except Exception as e:
+            print(f"ERRO ao baixar a página de {ano}: {e}")
+            continue
+        caminho = os.path.join(DIRETORIO_REAIS, f"fbref_{competicao.lower().replace('-', '_')}_{ano}.html")
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(html)
+        print(f"Página real de {ano} gravada em {caminho}.")
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main(caminhos=None):
+    paginas = []
+    padrao = sorted(glob.glob(os.path.join(DIRETORIO_FIXTURES, '*.html')))
+    reais = sorted(glob.glob(os.path.join(DIRETORIO_REAIS, '*.html')))
+    for caminho in caminhos or padrao + reais:
+        with open(caminho, encoding='utf-8') as arquivo:
+            paginas.append((os.path.relpath(caminho, DIRETORIO_FIXTURES) if caminho in reais else os.path.basename(caminho),
+                            arquivo.read()))
+    if not caminhos:
+        df = gerar_liga(n_times=20, n_temporadas=1, rodadas_jogadas=30)
+        paginas.append(('multicompeticao (gerada)', gerar_pagina_multicompeticao(df, 2025)))
+        paginas.append(('tabela comentada (gerada)', gerar_pagina_tabela_comentada(df, 2025)))
+
+    resultados = [validar_pagina(nome, html) for nome, html in paginas]
+    if not all(ok for ok, _, _ in resultados):
+        sys.exit(1)
+    print(f"Todas as {len(resultados)} páginas idênticas.")
+    # As páginas sintéticas vêm do mesmo gerador usado para escrever o extrator: sem páginas reais a
+    # validação não é conclusiva
+    if not caminhos and not reais:
+        print(f"ERRO: nenhuma página real em {DIRETORIO_REAIS}. Use --salvar ANO para incluir uma.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Valida o extrator da tabela de jogos contra o pd.read_html.")
+    parser.add_argument('paginas', nargs='*', help="Páginas HTML a validar (padrão: o corpus de benchmarks/fixtures).")
+    parser.add_argument('--salvar', nargs='+', metavar='ANO', help="Baixa as páginas reais dessas temporadas antes de validar.")
+    args = parser.parse_args()
+    if args.salvar and not salvar_paginas_reais(args.salvar) and not args.paginas:
+        sys.exit(1)
+    main(args.paginas)
@@ -1,10 +1,10 @@
+import argparse
 import pandas as pd
-import time
 from datetime import datetime
-from web_scraper import buscar_dados_brasileirao
-from feature_engineering import preparar_dados_para_modelo
-from model_trainer import treinar_modelo
-from predictor import prever_jogo_especifico, simular_campeonato
+import instrumentacao
+from banco_dados import conectar, obter_temporadas
+from model_trainer import obter_modelo
+from predictor import PrevisorLote, prever_jogo_especifico, simular_campeonato
 
 
 def main():
@@ -16,9 +16,9 @@ def main():
     ano_atual = datetime.now().year
     ano_anterior = ano_atual - 1
 
-    df_anterior = buscar_dados_brasileirao(str(ano_anterior))
-    time.sleep(1)
-    df_atual = buscar_dados_brasileirao(str(ano_atual))
+    with conectar() as conexao:
+        temporadas = obter_temporadas(conexao, [ano_anterior, ano_atual])
+    df_anterior, df_atual = temporadas[str(ano_anterior)], temporadas[str(ano_atual)]
 
     if df_anterior is None or df_atual is None:
         print("Não foi possível obter os dados necessários. Encerrando.")
@@ -29,15 +29,20 @@ def main():
     df_resultados = df_total[df_total['FTHG'].notna()].copy()
     df_futuro = df_total[df_total['FTHG'].isna()].copy()
 
-    df_treino, time_stats = preparar_dados_para_modelo(df_resultados)
+    # Carrega o modelo salvo para estes jogos ou treina um novo
+    artefato = obter_modelo(df_resultados)
 
-    if df_treino.empty:
+    if artefato is None:
         print("Não há dados de treino suficientes após o pré-processamento. Encerrando.")
         return
 
-    modelo, encoder, colunas_modelo = treinar_modelo(df_treino)
+    modelo, encoder = artefato['modelo'], artefato['encoder']
+    colunas_modelo, time_stats = artefato['colunas_modelo'], artefato['time_stats']
+    matriz_probabilidades, modelo_gols = artefato['matriz_probabilidades'], artefato.get('modelo_gols')
+    df_resultados_atuais = df_atual[df_atual['FTHG'].notna()].copy()
 
     lista_times = sorted(list(set(df_total['HomeTeam']).union(set(df_total['AwayTeam']))))
+    previsor = None  # Montado na primeira previsão fora da matriz e reutilizado nas seguintes
 
     # Essa parte não será acessada caso use o Streamlit ------------------------
     while True:
@@ -59,7 +64,13 @@ def main():
                 print("Erro: Um ou ambos os times não foram encontrados na lista.")
                 continue
 
-            odds = prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo)
+            if matriz_probabilidades.contem(time_casa, time_visitante):
+                odds = matriz_probabilidades.prever(time_casa, time_visitante)
+            else:
+                if previsor is None:
+                    previsor = PrevisorLote(modelo, encoder, time_stats, colunas_modelo, lista_times)
+                odds = prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo,
+                                              previsor=previsor)
             
             print("\n--- Previsão do Jogo ---")
             print(f"{time_casa} vs {time_visitante}")
@@ -68,6 +79,9 @@ def main():
             if odds:
                 for resultado, prob in odds.items():
                     print(f"  - Chance de '{resultado}': {prob:.1%}")
+                if modelo_gols is not None:
+                    gols_casa, gols_visitante = modelo_gols.gols_esperados(time_casa, time_visitante)
+                    print(f"  - Gols esperados: {gols_casa:.2f} x {gols_visitante:.2f}")
             else:
                 print("Não foi possível gerar a previsão para este jogo.")
 
@@ -80,7 +94,7 @@ def main():
                     continue
 
                 print(f"\nSimulando a classificação até a rodada {rodada}...")
-                tabela_simulada = simular_campeonato(rodada, df_futuro, df_treino, modelo, encoder, time_stats, colunas_modelo)
+                tabela_simulada = simular_campeonato(rodada, df_futuro, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo, matriz_probabilidades, modelo_gols)
                 print("\n--- Tabela de Classificação Prevista ---")
                 print(tabela_simulada)
 
@@ -95,5 +109,30 @@ def main():
             print("Escolha inválida. Por favor, digite 1, 2 ou 3.")
 
 
+def exibir_perfil(saida=None):
+    """
+    Imprime o tempo, as linhas e a memória de cada etapa medida e, se pedido, grava as medições em arquivo.
+    """
+    coletor = instrumentacao.desativar()
+    if coletor is None:
+        return
+    print("\n--- Desempenho por etapa ---")
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 120):
+        print(coletor.resumo().to_string(index=False))
+    if saida:
+        coletor.exportar(saida)
+        print(f"Medições gravadas em {saida}")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Chatbot de previsão do Brasileirão.")
+    parser.add_argument('--profile', action='store_true', help="Mede tempo, linhas e memória de cada etapa do pipeline.")
+    parser.add_argument('--profile-saida', help="Grava as medições em JSON (ou JSON Lines, se terminar em .jsonl).")
+    args = parser.parse_args()
+
+    if args.profile or args.profile_saida:
+        instrumentacao.ativar()
+    try:
+        main()
+    finally:
+        exibir_perfil(args.profile_saida)
\ No newline at end of file
@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+
+# Estatísticas acumuladas por time (a última dimensão dos arrays de estatísticas)
+ESTATISTICAS = ['J', 'V', 'E', 'D', 'GP', 'GC']
+J, V, E, D, GP, GC = range(len(ESTATISTICAS))
+COLUNAS_TABELA = ['P', 'J', 'V', 'E', 'D', 'GP', 'GC', 'SG']
+# Pontos do mandante pelo código do resultado + 1 (o visitante usa o índice 1 - código)
+PONTOS_RESULTADO = np.array([0, 1, 3])
+
+
+def resultado_dos_gols(gols_casa, gols_visitante):
+    """
+    Código do resultado de cada jogo: 1 (vitória do mandante), 0 (empate) ou -1 (vitória do visitante).
+    """
+    return np.sign(np.asarray(gols_casa, dtype=float) - np.asarray(gols_visitante, dtype=float)).astype(np.int64)
+
+
+def estatisticas_por_rodada(casa, visitante, gols_casa, gols_visitante, rodada, n_times, n_rodadas, resultado=None):
+    """
+    Estatísticas acumuladas (J, V, E, D, GP, GC) de todos os times após cada rodada, calculadas em uma passada
+    com bincount: retorna um array (..., n_rodadas + 1, n_times, 6) em que o índice k é a tabela após a
+    rodada k (0 = antes do início). casa, visitante e rodada são índices inteiros por jogo; gols e resultado
+    (padrão: derivado dos gols) podem ter dimensões extras à esquerda, para um lote de temporadas simuladas.
+    """
+    casa, visitante, rodada = (np.asarray(a, dtype=np.int64) for a in (casa, visitante, rodada))
+    gols_casa = np.asarray(gols_casa, dtype=np.int64)
+    gols_visitante = np.asarray(gols_visitante, dtype=np.int64)
+    if resultado is None:
+        resultado = resultado_dos_gols(gols_casa, gols_visitante)
+    resultado, gols_casa, gols_visitante = np.broadcast_arrays(resultado, gols_casa, gols_visitante)
+    lote = resultado.shape[:-1]
+    n_lote = int(np.prod(lote, dtype=np.int64))
+
+    vitoria_casa = (resultado > 0).astype(np.int64)
+    empate = (resultado == 0).astype(np.int64)
+    vitoria_visitante = (resultado < 0).astype(np.int64)
+    um = np.ones_like(resultado)
+    # Incremento de cada estatística para o mandante e para o visitante de cada jogo
+    incrementos = [
+        (casa, [um, vitoria_casa, empate, vitoria_visitante, gols_casa, gols_visitante]),
+        (visitante, [um, vitoria_visitante, empate, vitoria_casa, gols_visitante, gols_casa]),
+    ]
+
+    tamanho = (n_rodadas + 1) * n_times
+    deslocamento_lote = (np.arange(n_lote, dtype=np.int64) * tamanho)[:, None]
+    acumulado = np.zeros((len(ESTATISTICAS), n_lote * tamanho), dtype=np.int64)
+    for times, valores in incrementos:
+        indices = (deslocamento_lote + rodada * n_times + times).ravel()
+        for i, valor in enumerate(valores):
+            acumulado[i] += np.bincount(indices, weights=valor.reshape(n_lote, -1).ravel(),
+                                        minlength=n_lote * tamanho).astype(np.int64)
+    acumulado = np.moveaxis(acumulado.reshape(len(ESTATISTICAS), *lote, n_rodadas + 1, n_times), 0, -1)
+    return np.cumsum(acumulado, axis=-3)
+
+
+def pontos_confronto(casa, visitante, resultado, n_times):
+    """
+    Matriz (..., n_times, n_times) com os pontos que o time i somou nos jogos contra o time j.
+    """
+    casa = np.asarray(casa, dtype=np.int64)
+    visitante = np.asarray(visitante, dtype=np.int64)
+    resultado = np.asarray(resultado)
+    lote = resultado.shape[:-1]
+    n_lote = int(np.prod(lote, dtype=np.int64))
+    pontos_casa = np.select([resultado > 0, resultado == 0], [3, 1], 0).reshape(n_lote, -1)
+    pontos_visitante = np.select([resultado < 0, resultado == 0], [3, 1], 0).reshape(n_lote, -1)
+    deslocamento_lote = (np.arange(n_lote, dtype=np.int64) * n_times * n_times)[:, None]
+    minimo = n_lote * n_times * n_times
+    matriz = np.bincount((deslocamento_lote + casa * n_times + visitante).ravel(), weights=pontos_casa.ravel(), minlength=minimo)
+    matriz += np.bincount((deslocamento_lote + visitante * n_times + casa).ravel(), weights=pontos_visitante.ravel(), minlength=minimo)
+    return matriz.astype(np.int64).reshape(*lote, n_times, n_times)
+
+
+def jogos_entre_pares(casa, visitante, n_times):
+    """
+    Índices dos jogos entre cada par de times, em qualquer mando: array (n_times, n_times, k) com -1 nas
+    posições vazias, para calcular o confronto direto só dos pares que precisarem.
+    """
+    jogos_entre = [[[] for _ in range(n_times)] for _ in range(n_times)]
+    for jogo, (time_casa, time_visitante) in enumerate(zip(casa, visitante)):
+        jogos_entre[time_casa][time_visitante].append(jogo)
+        jogos_entre[time_visitante][time_casa].append(jogo)
+    maximo_jogos = max((len(jogos) for linha in jogos_entre for jogos in linha), default=0)
+    return np.array([[jogos + [-1] * (maximo_jogos - len(jogos)) for jogos in linha] for linha in jogos_entre],
+                    dtype=np.int64).reshape(n_times, n_times, maximo_jogos)
+
+
+def confronto_direto_sorteado(confrontos_base, jogos_entre, casa, resultado_jogos, linhas, time_a, time_b):
+    """
+    Pontos de a contra b e de b contra a em temporadas sorteadas: os dos jogos já realizados
+    (confrontos_base) mais os dos jogos restantes entre os dois. resultado_jogos(linhas, jogos) devolve o
+    código do resultado (1, 0 ou -1) de cada jogo na linha (temporada) correspondente.
+    """
+    pontos_a = confrontos_base[time_a, time_b].astype(np.int64)
+    pontos_b = confrontos_base[time_b, time_a].astype(np.int64)
+    for k in range(jogos_entre.shape[2]):
+        jogo = jogos_entre[time_a, time_b, k]
+        valido = jogo >= 0
+        jogo = np.where(valido, jogo, 0)
+        resultado = np.rint(resultado_jogos(linhas, jogo)).astype(np.int64)
+        pontos_mandante = PONTOS_RESULTADO[resultado + 1]
+        pontos_visitante = PONTOS_RESULTADO[1 - resultado]
+        a_mandante = casa[jogo] == time_a
+        pontos_a += valido * np.where(a_mandante, pontos_mandante, pontos_visitante)
+        pontos_b += valido * np.where(a_mandante, pontos_visitante, pontos_mandante)
+    return pontos_a, pontos_b
+
+
+def contar_posicoes(ordem):
+    """
+    Quantas vezes cada time terminou em cada posição: matriz (n_times, n_times) a partir das ordens de
+    classificação (..., n_times) de várias temporadas.
+    """
+    ordem = np.reshape(ordem, (-1, np.shape(ordem)[-1])).astype(np.int64, copy=False)
+    n_times = ordem.shape[1]
+    indices = ordem * n_times + np.arange(n_times)
+    return np.bincount(indices.ravel(), minlength=n_times * n_times).reshape(n_times, n_times)
+
+
+def contar_pontos(pontos, pontos_maximos):
+    """
+    Histograma (n_times, pontos_maximos) dos pontos finais de cada time em várias temporadas (..., n_times).
+    """
+    pontos = np.asarray(pontos)
+    if pontos.dtype.kind not in 'iu':
+        pontos = np.rint(pontos)
+    pontos = np.reshape(pontos.astype(np.int64, copy=False), (-1, pontos.shape[-1]))
+    n_times = pontos.shape[1]
+    indices = np.arange(n_times) * pontos_maximos + pontos
+    return np.bincount(indices.ravel(), minlength=n_times * pontos_maximos).reshape(n_times, pontos_maximos)
+
+
+def _ordem_por_criterios(criterios, sorteio):
+    """
+    Ordena cada linha de forma decrescente pelos critérios (inteiros, em ordem de prioridade) e crescente
+    pelo sorteio. Quando cabem em uma chave float64, os critérios são combinados e ordenados com um único
+    argsort; senão, usa np.lexsort. Retorna a ordem e, para cada par de posições vizinhas, se os dois
+    times estão empatados em todos os critérios.
+    """
+    chave = np.zeros(sorteio.shape, dtype=np.int64)
+    amplitude_total = 1
+    for criterio in criterios:
+        if criterio.dtype.kind not in 'iu':
+            criterio = np.rint(criterio)
+        criterio = criterio.astype(np.int64, copy=False)
+        minimo = criterio.min(initial=0)
+        amplitude = int(criterio.max(initial=0)) - int(minimo) + 1
+        amplitude_total *= amplitude
+        if amplitude_total >= 2 ** 32:
+            criterios = [np.broadcast_to(c, sorteio.shape) for c in criterios]
+            ordem = np.lexsort([sorteio] + [-c for c in reversed(criterios)], axis=-1)
+            ordenados = [np.take_along_axis(c, ordem, axis=-1) for c in criterios]
+            return ordem, np.logical_and.reduce([c[:, 1:] == c[:, :-1] for c in ordenados])
+        chave = chave * amplitude + (criterio - minimo)
+    # O sorteio vira a parte fracionária da chave, em [0, 1)
+    minimo, maximo = sorteio.min(initial=0), sorteio.max(initial=0)
+    fracao = (sorteio - minimo) / (maximo - minimo + 1)
+    ordem = np.argsort(fracao - chave, axis=-1)
+    chave_ordenada = np.take_along_axis(chave, ordem, axis=-1)
+    return ordem, chave_ordenada[:, 1:] == chave_ordenada[:, :-1]
+
+
+def ordenar_classificacao(pontos, vitorias, saldo, gols_pro, confrontos=None, sorteio=None):
+    """
+    Ordem de classificação pelos critérios de desempate da CBF: pontos, vitórias, saldo de gols, gols pró,
+    confronto direto (apenas quando o empate é entre dois clubes) e sorteio. Os critérios de cartões
+    vermelhos e amarelos, anteriores ao sorteio, não existem nos dados e são pulados.
+    Os arrays têm forma (..., n_times) e a ordem é calculada para cada linha do lote.
+    confrontos: matriz (..., n_times, n_times) de pontos de i contra j, ou uma função
+    (linhas, time_a, time_b) -> (pontos de a contra b, pontos de b contra a) chamada só para os pares empatados.
+    sorteio: chave (..., n_times) usada no último critério (menor vence); padrão: índice do time.
+    Retorna (..., n_times) com os índices dos times do primeiro ao último colocado.
+    """
+    criterios = [np.asarray(c) for c in (pontos, vitorias, saldo, gols_pro)]
+    forma = np.broadcast_shapes(*(c.shape for c in criterios), np.shape(sorteio) if sorteio is not None else ())
+    n_times = forma[-1]
+    # Critérios iguais para todo o lote (forma (n_times,)) não são copiados para cada linha
+    criterios = [c if c.ndim == 1 else np.reshape(np.broadcast_to(c, forma), (-1, n_times)) for c in criterios]
+    if sorteio is None:
+        sorteio = np.arange(n_times)
+    sorteio = np.reshape(np.broadcast_to(sorteio, forma), (-1, n_times))
+
+    ordem, empatado = _ordem_por_criterios(criterios, sorteio)
+
+    # Confronto direto: pares de posições vizinhas empatadas nos quatro primeiros critérios, sem um terceiro clube empatado
+    if n_times > 1 and confrontos is not None:
+        borda = np.zeros((len(ordem), 1), dtype=bool)
+        par = empatado & ~np.hstack([borda, empatado[:, :-1]]) & ~np.hstack([empatado[:, 1:], borda])
+        linhas, posicoes = np.nonzero(par)
+        if len(linhas):
+            time_a, time_b = ordem[linhas, posicoes], ordem[linhas, posicoes + 1]
+            if callable(confrontos):
+                pontos_a, pontos_b = confrontos(linhas, time_a, time_b)
+            else:
+                matriz = np.reshape(confrontos, (-1, n_times, n_times))
+                pontos_a, pontos_b = matriz[linhas, time_a, time_b], matriz[linhas, time_b, time_a]
+            trocar = np.asarray(pontos_b) > np.asarray(pontos_a)
+            ordem[linhas[trocar], posicoes[trocar]] = time_b[trocar]
+            ordem[linhas[trocar], posicoes[trocar] + 1] = time_a[trocar]
+    return ordem.reshape(forma)
+
+
+class TabelaRodadas:
+    """
+    Classificação acumulada rodada a rodada de uma temporada (ou de um lote de temporadas simuladas).
+    As estatísticas de todas as rodadas são calculadas de uma vez; a tabela após a rodada k é um recorte.
+    """
+
+    def __init__(self, times, casa, visitante, gols_casa, gols_visitante, rodada, resultado=None, n_rodadas=None):
+        self.times = list(times)
+        self.casa = np.asarray(casa, dtype=np.int64)
+        self.visitante = np.asarray(visitante, dtype=np.int64)
+        self.rodada = np.asarray(rodada, dtype=np.int64)
+        self.resultado = resultado_dos_gols(gols_casa, gols_visitante) if resultado is None else np.asarray(resultado)
+        self.n_rodadas = int(self.rodada.max(initial=0)) if n_rodadas is None else n_rodadas
+        self.acumulado = estatisticas_por_rodada(self.casa, self.visitante, gols_casa, gols_visitante, self.rodada,
+                                                 len(self.times), self.n_rodadas, self.resultado)
+
+    @classmethod
+    def de_jogos(cls, df_jogos, times=None, n_rodadas=None):
+        """
+        Monta a tabela a partir dos jogos realizados de um DataFrame (HomeTeam, AwayTeam, FTHG, FTAG, Rodada).
+        """
+        realizados = df_jogos[df_jogos['FTHG'].notna() & df_jogos['FTAG'].notna()]
+        if times is None:
+            times = sorted(set(df_jogos['HomeTeam']).union(set(df_jogos['AwayTeam'])))
+        indice = {time: i for i, time in enumerate(times)}
+        return cls(times, realizados['HomeTeam'].map(indice).to_numpy(), realizados['AwayTeam'].map(indice).to_numpy(),
+                   realizados['FTHG'].to_numpy(), realizados['FTAG'].to_numpy(),
+                   pd.to_numeric(realizados['Rodada']).to_numpy(), n_rodadas=n_rodadas)
+
+    def _rodada(self, rodada):
+        return self.n_rodadas if rodada is None else min(max(int(rodada), 0), self.n_rodadas)
+
+    def estatisticas(self, rodada=None):
+        """
+        Estatísticas (..., n_times, 6) após a rodada informada (padrão: a última).
+        """
+        return self.acumulado[..., self._rodada(rodada), :, :]
+
+    def confrontos(self, rodada=None):
+        """
+        Pontos de cada time contra cada adversário nos jogos até a rodada informada.
+        """
+        ate_rodada = self.rodada <= self._rodada(rodada)
+        return pontos_confronto(self.casa[ate_rodada], self.visitante[ate_rodada],
+                                self.resultado[..., ate_rodada], len(self.times))
+
+    def ordem(self, rodada=None, sorteio=None):
+        """
+        Índices dos times em ordem de classificação após a rodada (critérios de ordenar_classificacao).
+        """
+        estatisticas = self.estatisticas(rodada)
+        pontos = 3 * estatisticas[..., V] + estatisticas[..., E]
+        rodada = self._rodada(rodada)
+        return ordenar_classificacao(pontos, estatisticas[..., V], estatisticas[..., GP] - estatisticas[..., GC],
+                                     estatisticas[..., GP], lambda linhas, a, b: self._confronto_par(rodada, linhas, a, b),
+                                     sorteio)
+
+    def _confronto_par(self, rodada, linhas, time_a, time_b):
+        matriz = np.reshape(self.confrontos(rodada), (-1, len(self.times), len(self.times)))
+        return matriz[linhas, time_a, time_b], matriz[linhas, time_b, time_a]
+
+    def tabela(self, rodada=None):
+        """
+        Tabela de classificação após a rodada (padrão: a última), com as colunas #, Time, P, J, V, E, D, GP, GC e SG.
+        """
+        if self.acumulado.ndim != 3:
+            raise ValueError("tabela() só está disponível para uma única temporada; use estatisticas() em lotes.")
+        estatisticas = self.estatisticas(rodada)
+        ordem = self.ordem(rodada)
+        df_tabela = pd.DataFrame(estatisticas[ordem], columns=ESTATISTICAS)
+        df_tabela.insert(0, 'P', 3 * df_tabela['V'] + df_tabela['E'])
+        df_tabela['SG'] = df_tabela['GP'] - df_tabela['GC']
+        df_tabela.insert(0, 'Time', [self.times[i] for i in ordem])
+        df_tabela.insert(0, '#', np.arange(1, len(df_tabela) + 1))
+        return df_tabela
@@ -1,67 +1,391 @@
+import json
 import pandas as pd
 import numpy as np
+from instrumentacao import instrumentar
 
 
-def preparar_dados_para_modelo(df_historico):
+def _tabela_longa(df_historico, coluna_temporada=None):
+    """
+    Reorganiza os jogos (já em ordem cronológica) em uma tabela longa time-jogo, com uma linha para o
+    mandante e outra para o visitante de cada partida, intercaladas para manter a ordem cronológica.
+    """
+    times = np.column_stack([df_historico['HomeTeam'].to_numpy(), df_historico['AwayTeam'].to_numpy()]).ravel()
+    pontos = np.column_stack([df_historico['HomePoints'].to_numpy(), df_historico['AwayPoints'].to_numpy()]).ravel()
+    gols_casa = df_historico['FTHG'].to_numpy(dtype=float)
+    gols_visitante = df_historico['FTAG'].to_numpy(dtype=float)
+    gm = np.column_stack([gols_casa, gols_visitante]).ravel()
+    gs = np.column_stack([gols_visitante, gols_casa]).ravel()
+
+    # Cada grupo é a sequência de jogos de um time (ou de um time em uma temporada)
+    if coluna_temporada is None:
+        chaves = times
+    else:
+        temporadas = np.repeat(df_historico[coluna_temporada].to_numpy(), 2)
+        chaves = pd.MultiIndex.from_arrays([temporadas, times])
+    codigos, _ = pd.factorize(chaves)
+
+    return {'time': times, 'grupo': codigos, 'pontos': pontos.astype(np.int64), 'gm': gm, 'gs': gs}
+
+
+def calcular_features_forma(df_historico, janela=5, coluna_temporada=None):
+    """
+    Calcula de forma vetorizada as features de forma de cada jogo, usando somas acumuladas deslocadas
+    (apenas jogos anteriores) e janelas móveis por time. Se coluna_temporada for informada, as
+    estatísticas são reiniciadas a cada temporada.
+    Espera os jogos em ordem cronológica, com as colunas HomePoints e AwayPoints já calculadas.
+    """
+    return _features_tabela_longa(_tabela_longa(df_historico, coluna_temporada), janela, df_historico.index)
+
+
+def _features_tabela_longa(longa, janela, indice):
+    """
+    Calcula as features a partir da tabela longa e devolve uma linha por jogo, com colunas _Home e _Away.
+    """
+    n_linhas = len(longa['grupo'])
+
+    # Ordena por grupo mantendo a ordem cronológica dentro de cada grupo
+    ordem = np.argsort(longa['grupo'], kind='stable')
+    grupos = longa['grupo'][ordem]
+    inicio_grupo = np.r_[True, grupos[1:] != grupos[:-1]] if n_linhas else np.zeros(0, dtype=bool)
+    posicao_inicio = np.maximum.accumulate(np.where(inicio_grupo, np.arange(n_linhas), 0))
+    jogos_anteriores = np.arange(n_linhas) - posicao_inicio
+    jogos_na_janela = np.minimum(jogos_anteriores, janela)
+
+    def soma_anterior(valores):
+        # Soma acumulada excluindo o jogo atual: total e apenas a janela dos últimos jogos
+        acumulado = np.cumsum(valores) - valores
+        total = acumulado - acumulado[posicao_inicio]
+        deslocado = np.where(jogos_anteriores >= janela, np.arange(n_linhas) - janela, posicao_inicio)
+        return total, acumulado - acumulado[deslocado]
+
+    soma_pontos, forma_pontos = soma_anterior(longa['pontos'][ordem])
+    _, soma_gm = soma_anterior(longa['gm'][ordem])
+    _, soma_gs = soma_anterior(longa['gs'][ordem])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features_ordenadas = {
+            'ForcaGeral': np.where(jogos_anteriores > 0, soma_pontos / jogos_anteriores, 1.0),
+            'FormaPontos': forma_pontos,
+            'MediaGolsMarcados': np.where(jogos_na_janela > 0, soma_gm / jogos_na_janela, 0.0),
+            'MediaGolsSofridos': np.where(jogos_na_janela > 0, soma_gs / jogos_na_janela, 0.0),
+        }
+
+    # Volta à ordem cronológica e separa as linhas do mandante (pares) e do visitante (ímpares)
+    features = {}
+    for lado, inicio in [('Home', 0), ('Away', 1)]:
+        for nome, valores in features_ordenadas.items():
+            valores_originais = np.empty_like(valores)
+            valores_originais[ordem] = valores
+            features[f'{nome}_{lado}'] = valores_originais[inicio::2]
+    return pd.DataFrame(features, index=indice)
+
+
+class EstadoTimes:
+    """
+    Estado compacto das estatísticas de forma dos times. Cada time recebe um id inteiro; para cada id
+    são guardados os totais acumulados (jogos e pontos) e buffers circulares NumPy de tamanho fixo
+    (janela) com os pontos e gols marcados/sofridos dos últimos jogos. A leitura das features de um
+    time é O(1) e a memória por time não cresce com o histórico.
+    Usado pelo cálculo de features (EstadoFeatures), pelo previsor e pelas simulações.
+    """
+
+    def __init__(self, janela=5, capacidade=32):
+        self.janela = janela
+        self.nomes = []
+        self.ids = {}
+        self.jogos = np.zeros(capacidade, dtype=np.int64)
+        self.soma_pontos = np.zeros(capacidade, dtype=np.int64)
+        self.ultimos_pontos = np.zeros((capacidade, janela), dtype=np.int64)
+        self.ultimos_gm = np.zeros((capacidade, janela))
+        self.ultimos_gs = np.zeros((capacidade, janela))
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def __contains__(self, time):
+        return time in self.ids
+
+    def __iter__(self):
+        return iter(self.nomes)
+
+    def _crescer(self, capacidade):
+        for nome in ('jogos', 'soma_pontos', 'ultimos_pontos', 'ultimos_gm', 'ultimos_gs'):
+            atual = getattr(self, nome)
+            novo = np.zeros((capacidade,) + atual.shape[1:], dtype=atual.dtype)
+            novo[:len(atual)] = atual
+            setattr(self, nome, novo)
+
+    def id_time(self, time):
+        """
+        Id inteiro do time, criado (com estatísticas zeradas) se o time ainda não existir.
+        """
+        id_time = self.ids.get(time)
+        if id_time is None:
+            id_time = len(self.nomes)
+            if id_time == len(self.jogos):
+                self._crescer(2 * id_time)
+            self.ids[time] = id_time
+            self.nomes.append(time)
+        return id_time
+
+    def registrar(self, id_time, pontos, gm, gs):
+        """
+        Acrescenta um jogo às estatísticas do time, sobrescrevendo a posição mais antiga da janela.
+        """
+        posicao = self.jogos[id_time] % self.janela
+        self.jogos[id_time] += 1
+        self.soma_pontos[id_time] += pontos
+        self.ultimos_pontos[id_time, posicao] = pontos
+        self.ultimos_gm[id_time, posicao] = gm
+        self.ultimos_gs[id_time, posicao] = gs
+
+    def registrar_jogos(self, df_jogos):
+        """
+        Acrescenta jogos realizados (em ordem cronológica) às estatísticas dos dois times de cada partida.
+        """
+        for time_casa, time_visitante, gols_casa, gols_visitante in zip(df_jogos['HomeTeam'], df_jogos['AwayTeam'],
+                                                                        df_jogos['FTHG'], df_jogos['FTAG']):
+            pontos_casa, pontos_visitante = (3, 0) if gols_casa > gols_visitante else (0, 3) if gols_casa < gols_visitante else (1, 1)
+            self.registrar(self.id_time(time_casa), pontos_casa, float(gols_casa), float(gols_visitante))
+            self.registrar(self.id_time(time_visitante), pontos_visitante, float(gols_visitante), float(gols_casa))
+
+    def features(self, ids):
+        """
+        Matriz N x 4 com as features (ForcaGeral, FormaPontos, MediaGolsMarcados, MediaGolsSofridos) dos ids
+        informados. Ids negativos (times desconhecidos) e times sem jogos recebem os valores padrão.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        conhecidos = ids >= 0
+        validos = np.where(conhecidos, ids, 0)
+        jogos = np.where(conhecidos, self.jogos[validos], 0)
+        na_janela = np.minimum(jogos, self.janela)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.column_stack([
+                np.where(jogos > 0, self.soma_pontos[validos] / jogos, 1.0),
+                np.where(conhecidos, self.ultimos_pontos[validos].sum(axis=1), 0),
+                np.where(na_janela > 0, self.ultimos_gm[validos].sum(axis=1) / na_janela, 0.0),
+                np.where(na_janela > 0, self.ultimos_gs[validos].sum(axis=1) / na_janela, 0.0),
+            ])
+
+    def features_nomes(self, times):
+        """
+        Versão de features() que recebe nomes de times (desconhecidos recebem os valores padrão).
+        """
+        return self.features([self.ids.get(time, -1) for time in times])
+
+    def copia(self):
+        copia = EstadoTimes(self.janela, capacidade=len(self.jogos))
+        copia.nomes = list(self.nomes)
+        copia.ids = dict(self.ids)
+        for nome in ('jogos', 'soma_pontos', 'ultimos_pontos', 'ultimos_gm', 'ultimos_gs'):
+            setattr(copia, nome, getattr(self, nome).copy())
+        return copia
+
+    @classmethod
+    def de_tabela_longa(cls, longa, janela=5):
+        """
+        Monta o estado a partir da tabela longa de _tabela_longa. Com reinício por temporada, mantém apenas
+        a temporada mais recente de cada time.
+        """
+        ordem = np.argsort(longa['grupo'], kind='stable')
+        grupos = longa['grupo'][ordem]
+        n_linhas = len(grupos)
+        inicios = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]]) if n_linhas else np.zeros(0, dtype=np.int64)
+        tamanhos = np.diff(np.r_[inicios, n_linhas])
+        posicao = np.arange(n_linhas) - np.repeat(inicios, tamanhos)
+
+        # Grupo mais recente de cada time (os códigos seguem a ordem de aparição)
+        times_grupo = longa['time'][ordem][inicios]
+        ultimo_grupo = {}
+        for indice_grupo, time in enumerate(times_grupo):
+            ultimo_grupo[time] = indice_grupo
+
+        estado = cls(janela, capacidade=max(1, len(ultimo_grupo)))
+        for time in ultimo_grupo:
+            estado.id_time(time)
+        grupos_escolhidos = np.array(list(ultimo_grupo.values()), dtype=np.int64)
+        ids_escolhidos = np.arange(len(grupos_escolhidos))
+        estado.jogos[ids_escolhidos] = tamanhos[grupos_escolhidos]
+        pontos = longa['pontos'][ordem]
+        estado.soma_pontos[ids_escolhidos] = np.add.reduceat(pontos, inicios)[grupos_escolhidos] if n_linhas else 0
+
+        # Linhas que ficam na janela: os últimos `janela` jogos de cada grupo escolhido
+        id_do_grupo = np.full(len(inicios), -1, dtype=np.int64)
+        id_do_grupo[grupos_escolhidos] = ids_escolhidos
+        id_linha = np.repeat(id_do_grupo, tamanhos)
+        na_janela = (id_linha >= 0) & (posicao >= np.repeat(tamanhos, tamanhos) - janela)
+        linhas, slots = id_linha[na_janela], posicao[na_janela] % janela
+        estado.ultimos_pontos[linhas, slots] = pontos[na_janela]
+        estado.ultimos_gm[linhas, slots] = longa['gm'][ordem][na_janela]
+        estado.ultimos_gs[linhas, slots] = longa['gs'][ordem][na_janela]
+        return estado
+
+    def para_dict(self):
+        """
+        Serializa o estado em um dicionário compatível com JSON.
+        """
+        n_times = len(self.nomes)
+        return {
+            'janela': self.janela,
+            'times': list(self.nomes),
+            'jogos': self.jogos[:n_times].tolist(),
+            'soma_pontos': self.soma_pontos[:n_times].tolist(),
+            'ultimos_pontos': self.ultimos_pontos[:n_times].tolist(),
+            'ultimos_gm': self.ultimos_gm[:n_times].tolist(),
+            'ultimos_gs': self.ultimos_gs[:n_times].tolist(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """
+        Reconstrói o estado a partir do dicionário gerado por para_dict().
+        """
+        janela = dados['janela']
+        estado = cls(janela, capacidade=max(1, len(dados['times'])))
+        for time in dados['times']:
+            estado.id_time(time)
+        n_times = len(dados['times'])
+        estado.jogos[:n_times] = dados['jogos']
+        estado.soma_pontos[:n_times] = dados['soma_pontos']
+        for nome in ('ultimos_pontos', 'ultimos_gm', 'ultimos_gs'):
+            getattr(estado, nome)[:n_times] = np.array(dados[nome]).reshape(n_times, janela)
+        return estado
+
+
+@instrumentar('features.preparar_dados', linhas=lambda resultado: len(resultado[0]))
+def preparar_dados_para_modelo(df_historico, janela=5, coluna_temporada=None):
     """
     Cria a variável alvo (resultado) e calcula features de forma (médias móveis).
+    Retorna as linhas de treino e o EstadoTimes com as estatísticas de cada time ao fim do histórico.
     """
     print("Preparando dados e calculando features...")
     # Garantir que os dados estão ordenados por data
     df_historico['Date'] = pd.to_datetime(df_historico['Date'])
-    df_historico = df_historico.sort_values(by='Date').reset_index(drop=True)
+    df_historico = df_historico.sort_values(by='Date', kind='stable').reset_index(drop=True)
 
     # Criar a variável alvo
     df_historico['Resultado'] = np.where(df_historico['FTHG'] > df_historico['FTAG'], 'Casa',
                                          np.where(df_historico['FTHG'] < df_historico['FTAG'], 'Visitante', 'Empate'))
 
-    def get_points(resultado):
-        if resultado == 'Casa':
-            return 3, 0
-        elif resultado == 'Visitante':
-            return 0, 3
-        else:
-            return 1, 1
-
     # Criar colunas de pontos para casa e visitante
-    df_historico['HomePoints'], df_historico['AwayPoints'] = zip(*df_historico['Resultado'].apply(get_points))
+    df_historico['HomePoints'] = np.select([df_historico['Resultado'] == 'Casa', df_historico['Resultado'] == 'Empate'], [3, 1], 0)
+    df_historico['AwayPoints'] = np.select([df_historico['Resultado'] == 'Visitante', df_historico['Resultado'] == 'Empate'], [3, 1], 0)
+
+    # Calcular as features de todos os jogos de uma só vez
+    longa = _tabela_longa(df_historico, coluna_temporada)
+    df_features = _features_tabela_longa(longa, janela, df_historico.index)
+    df_final = pd.concat([df_historico, df_features], axis=1)
+    time_stats = EstadoTimes.de_tabela_longa(longa, janela)
 
-    time_stats = {}
-    features_calculadas = []
+    df_final = df_final.iloc[20:].reset_index(drop=True)
+    return df_final, time_stats
 
-    # Calcular as features para cada jogo
-    for index, row in df_historico.iterrows():
-        time_casa, time_visitante = row['HomeTeam'], row['AwayTeam']
-        features_jogo = {}
 
-        for time, lado in [(time_casa, 'Home'), (time_visitante, 'Away')]:
-            if time not in time_stats:
-                time_stats[time] = {'pontos': [], 'gm': [], 'gs': []}
+def acumular_time_stats(time_stats, df_jogos):
+    """
+    Retorna uma cópia do EstadoTimes com os jogos informados (em ordem cronológica) acrescentados.
+    """
+    time_stats = time_stats.copia()
+    time_stats.registrar_jogos(df_jogos)
+    return time_stats
 
-            if len(time_stats[time]['pontos']) > 0:
-                features_jogo[f'ForcaGeral_{lado}'] = np.mean(time_stats[time]['pontos'])
-            else:
-                features_jogo[f'ForcaGeral_{lado}'] = 1.0
 
-            features_jogo[f'FormaPontos_{lado}'] = sum(time_stats[time]['pontos'][-5:])
-            features_jogo[f'MediaGolsMarcados_{lado}'] = np.mean(time_stats[time]['gm'][-5:]) if time_stats[time][
-                'gm'] else 0
-            features_jogo[f'MediaGolsSofridos_{lado}'] = np.mean(time_stats[time]['gs'][-5:]) if time_stats[time][
-                'gs'] else 0
+class EstadoFeatures:
+    """
+    Estado incremental das features de forma. Guarda, em um EstadoTimes, os totais de pontos
+    (ForcaGeral) e janelas móveis de tamanho fixo com os últimos pontos e gols de cada time, de modo
+    que uma nova rodada é processada sem percorrer o histórico novamente.
+    O resultado acumulado das chamadas a atualizar() é idêntico ao de preparar_dados_para_modelo().
+    """
 
-        features_calculadas.append(features_jogo)
+    def __init__(self, janela=5, jogos_descartados=20):
+        self.janela = janela
+        self.jogos_descartados = jogos_descartados
+        self.total_jogos = 0
+        self.ultima_data = None
+        self.times = EstadoTimes(janela)
 
-        # Atualizar as estatísticas do time após calcular as features
-        time_stats[time_casa]['pontos'].append(row['HomePoints'])
-        time_stats[time_casa]['gm'].append(row['FTHG'])
-        time_stats[time_casa]['gs'].append(row['FTAG'])
+    def atualizar(self, novos_jogos):
+        """
+        Processa apenas os jogos novos (posteriores aos já processados) e retorna as linhas de treino
+        correspondentes, no mesmo formato de preparar_dados_para_modelo().
+        """
+        df_novos = novos_jogos.copy()
+        df_novos['Date'] = pd.to_datetime(df_novos['Date'])
+        df_novos = df_novos.sort_values(by='Date', kind='stable').reset_index(drop=True)
+        if self.ultima_data is not None and not df_novos.empty and df_novos['Date'].iloc[0] < self.ultima_data:
+            raise ValueError("Há jogos anteriores aos já processados. Recalcule o estado a partir do histórico completo.")
 
-        time_stats[time_visitante]['pontos'].append(row['AwayPoints'])
-        time_stats[time_visitante]['gm'].append(row['FTAG'])
-        time_stats[time_visitante]['gs'].append(row['FTHG'])
+        df_novos['Resultado'] = np.where(df_novos['FTHG'] > df_novos['FTAG'], 'Casa',
+                                         np.where(df_novos['FTHG'] < df_novos['FTAG'], 'Visitante', 'Empate'))
+        df_novos['HomePoints'] = np.select([df_novos['Resultado'] == 'Casa', df_novos['Resultado'] == 'Empate'], [3, 1], 0)
+        df_novos['AwayPoints'] = np.select([df_novos['Resultado'] == 'Visitante', df_novos['Resultado'] == 'Empate'], [3, 1], 0)
 
-    df_features = pd.DataFrame(features_calculadas, index=df_historico.index)
-    df_final = pd.concat([df_historico, df_features], axis=1)
+        features_calculadas = np.zeros((len(df_novos), 2, 4))
+        colunas = zip(df_novos['HomeTeam'], df_novos['AwayTeam'], df_novos['FTHG'], df_novos['FTAG'],
+                      df_novos['HomePoints'], df_novos['AwayPoints'])
+        for i, (time_casa, time_visitante, gols_casa, gols_visitante, pontos_casa, pontos_visitante) in enumerate(colunas):
+            id_casa, id_visitante = self.times.id_time(time_casa), self.times.id_time(time_visitante)
+            features_calculadas[i] = self.times.features([id_casa, id_visitante])
 
-    df_final = df_final.iloc[20:].reset_index(drop=True)
-    return df_final, time_stats
\ No newline at end of file
+            # Atualizar as estatísticas dos times após calcular as features
+            self.times.registrar(id_casa, int(pontos_casa), gols_casa, gols_visitante)
+            self.times.registrar(id_visitante, int(pontos_visitante), gols_visitante, gols_casa)
+
+        df_features = pd.DataFrame({
+            f'{feature}_{lado}': features_calculadas[:, j, k]
+            for j, lado in enumerate(('Home', 'Away'))
+            for k, feature in enumerate(('ForcaGeral', 'FormaPontos', 'MediaGolsMarcados', 'MediaGolsSofridos'))
+        }, index=df_novos.index)
+        df_features = df_features.astype({f'FormaPontos_{lado}': 'int64' for lado in ('Home', 'Away')})
+        df_final = pd.concat([df_novos, df_features], axis=1)
+
+        # Descarta os primeiros jogos do histórico, assim como no cálculo completo
+        descartar = max(0, self.jogos_descartados - self.total_jogos)
+        self.total_jogos += len(df_novos)
+        if not df_novos.empty:
+            self.ultima_data = df_novos['Date'].iloc[-1]
+        return df_final.iloc[descartar:].reset_index(drop=True)
+
+    @classmethod
+    def de_time_stats(cls, time_stats, total_jogos, ultima_data, janela=5, jogos_descartados=20):
+        """
+        Reconstrói o estado a partir do EstadoTimes de preparar_dados_para_modelo(), sem percorrer os jogos.
+        """
+        estado = cls(janela=janela, jogos_descartados=jogos_descartados)
+        estado.total_jogos = total_jogos
+        estado.ultima_data = pd.Timestamp(ultima_data) if ultima_data is not None else None
+        estado.times = time_stats.copia()
+        return estado
+
+    def para_dict(self):
+        """
+        Serializa o estado em um dicionário compatível com JSON.
+        """
+        return {
+            'janela': self.janela,
+            'jogos_descartados': self.jogos_descartados,
+            'total_jogos': self.total_jogos,
+            'ultima_data': self.ultima_data.isoformat() if self.ultima_data is not None else None,
+            'times': self.times.para_dict(),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """
+        Reconstrói o estado a partir do dicionário gerado por para_dict().
+        """
+        estado = cls(janela=dados['janela'], jogos_descartados=dados['jogos_descartados'])
+        estado.total_jogos = dados['total_jogos']
+        estado.ultima_data = pd.Timestamp(dados['ultima_data']) if dados['ultima_data'] else None
+        estado.times = EstadoTimes.de_dict(dados['times'])
+        return estado
+
+    def salvar(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.para_dict(), arquivo, ensure_ascii=False)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            return cls.de_dict(json.load(arquivo))
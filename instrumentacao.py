@@ -0,0 +1,224 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# FUTBOT_PERFIL=1 ativa a coleta desde a importação; FUTBOT_PERFIL_ARQUIVO grava cada medição (JSON Lines)
+VARIAVEL_ATIVACAO = "FUTBOT_PERFIL"
+VARIAVEL_ARQUIVO = "FUTBOT_PERFIL_ARQUIVO"
+
+_coletor = None
+_pilha = threading.local()
+
+
+def _memoria_mb():
+    """
+    Memória residente do processo em MB (no Linux via /proc; nos demais, o pico informado pelo sistema).
+    """
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 2 ** 10
+    return 0.0
+
+
+class Coletor:
+    """
+    Guarda as medições (etapa, duração, linhas processadas e variação de memória) de uma execução.
+    Pode ser usado por várias threads; cada medição vira um dicionário em `registros`.
+    """
+
+    def __init__(self, arquivo=None):
+        self.registros = []
+        self.arquivo = arquivo
+        self.trava = threading.Lock()
+
+    def registrar(self, registro):
+        with self.trava:
+            self.registros.append(registro)
+            if self.arquivo:
+                with open(self.arquivo, 'a', encoding='utf-8') as saida:
+                    saida.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+    def limpar(self):
+        with self.trava:
+            self.registros = []
+
+    def resumo(self):
+        """
+        Agrega as medições por etapa: chamadas, tempo total/médio/máximo, linhas e variação de memória.
+        """
+        with self.trava:
+            df = pd.DataFrame(self.registros)
+        if df.empty:
+            return pd.DataFrame(columns=['Etapa', 'Chamadas', 'Total (s)', 'Média (ms)', 'Máx (ms)', 'Linhas', 'Memória (MB)'])
+        resumo = df.groupby('etapa', sort=False).agg(
+            chamadas=('duracao_s', 'size'), total=('duracao_s', 'sum'), media=('duracao_s', 'mean'),
+            maximo=('duracao_s', 'max'), linhas=('linhas', 'sum'), memoria=('memoria_delta_mb', 'sum'),
+        ).reset_index()
+        resumo['linhas'] = resumo['linhas'].fillna(0).astype(int)
+        resumo['media'] *= 1000
+        resumo['maximo'] *= 1000
+        resumo.columns = ['Etapa', 'Chamadas', 'Total (s)', 'Média (ms)', 'Máx (ms)', 'Linhas', 'Memória (MB)']
+        return resumo.sort_values('Total (s)', ascending=False, kind='stable').reset_index(drop=True)
+
+    def para_json(self):
+        """
+        Resumo por etapa e registros em um documento JSON.
+        """
+        with self.trava:
+            registros = list(self.registros)
+        return json.dumps({'resumo': self.resumo().to_dict(orient='records'), 'registros': registros},
+                          ensure_ascii=False, indent=2, default=str)
+
+    def exportar(self, caminho):
+        """
+        Grava as medições em arquivo: JSON Lines (um registro por linha) se o caminho terminar em .jsonl,
+        senão o documento de para_json.
+        """
+        with self.trava:
+            registros = list(self.registros)
+        with open(caminho, 'w', encoding='utf-8') as saida:
+            if caminho.endswith('.jsonl'):
+                for registro in registros:
+                    saida.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+            else:
+                saida.write(self.para_json())
+
+
+def ativar(arquivo=None):
+    """
+    Liga a coleta de medições (se já estiver ligada, mantém o coletor atual) e retorna o coletor.
+    """
+    global _coletor
+    if _coletor is None:
+        _coletor = Coletor(arquivo)
+    elif arquivo:
+        _coletor.arquivo = arquivo
+    return _coletor
+
+
+def desativar():
+    """
+    Desliga a coleta e retorna o coletor com as medições feitas até aqui.
+    """
+    global _coletor
+    coletor, _coletor = _coletor, None
+    return coletor
+
+
+def ativo():
+    return _coletor is not None
+
+
+def obter_coletor():
+    return _coletor
+
+
+class _Medicao:
+    """
+    Medição em andamento; `linhas` e `atributos` podem ser preenchidos dentro do bloco medido.
+    """
+    __slots__ = ('coletor', 'etapa', 'linhas', 'atributos', 'inicio', 'memoria_inicial', 'nivel')
+
+    def __init__(self, coletor, etapa, linhas, atributos):
+        self.coletor = coletor
+        self.etapa = etapa
+        self.linhas = linhas
+        self.atributos = atributos
+
+    def __enter__(self):
+        pilha = getattr(_pilha, 'etapas', None)
+        if pilha is None:
+            pilha = _pilha.etapas = []
+        self.nivel = len(pilha)
+        pilha.append(self.etapa)
+        self.memoria_inicial = _memoria_mb()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, erro, rastreamento):
+        duracao = time.perf_counter() - self.inicio
+        pilha = _pilha.etapas
+        pilha.pop()
+        registro = {
+            'etapa': self.etapa,
+            'inicio': time.time() - duracao,
+            'duracao_s': duracao,
+            'linhas': self.linhas,
+            'memoria_delta_mb': _memoria_mb() - self.memoria_inicial,
+            'nivel': self.nivel,
+            'pai': pilha[-1] if pilha else None,
+            'erro': tipo_erro.__name__ if tipo_erro else None,
+        }
+        if self.atributos:
+            registro.update(self.atributos)
+        self.coletor.registrar(registro)
+        return False
+
+
+class _MedicaoNula:
+    """
+    Contexto vazio usado com a coleta desligada: não mede nada e ignora os atributos informados.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, erro, rastreamento):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_medicao_nula = _MedicaoNula()
+
+
+def medir(etapa, linhas=None, **atributos):
+    """
+    Context manager que mede um trecho do pipeline. Com a coleta desligada retorna um contexto vazio
+    compartilhado (nenhuma medição é feita); com ela ligada, o objeto retornado permite informar as
+    linhas processadas depois do fato: `with medir('etapa') as m: ...; m.linhas = len(df)`.
+    """
+    if _coletor is None:
+        return _medicao_nula
+    return _Medicao(_coletor, etapa, linhas, atributos)
+
+
+def instrumentar(etapa, linhas=None):
+    """
+    Decorador que mede cada chamada da função. `linhas`, se informado, recebe o retorno da função e
+    devolve o número de linhas processadas. Com a coleta desligada a função é chamada diretamente.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            coletor = _coletor
+            if coletor is None:
+                return funcao(*args, **kwargs)
+            with _Medicao(coletor, etapa, None, None) as medicao:
+                resultado = funcao(*args, **kwargs)
+                if linhas is not None:
+                    medicao.linhas = linhas(resultado)
+            return resultado
+        return envoltorio
+    return decorador
+
+
+if os.environ.get(VARIAVEL_ATIVACAO) or os.environ.get(VARIAVEL_ARQUIVO):
+    ativar(os.environ.get(VARIAVEL_ARQUIVO))
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class EsquemaDesign:
+    """
+    Layout fixo da matriz de features do modelo: um bloco one-hot do mandante, um do visitante (uma coluna
+    por time, na ordem de `times`) e as features numéricas, na ordem de `numericas`. Faz o papel do encoder:
+    é salvo com o modelo e monta a matriz esparsa (CSR) direto dos códigos inteiros dos times, tanto no
+    treino quanto na previsão, sem DataFrames nem reindexação por nome de coluna.
+    """
+
+    def __init__(self, times, numericas):
+        self.times = list(times)
+        self.numericas = list(numericas)
+        self.indice = pd.Index(self.times)
+
+    @classmethod
+    def ajustar(cls, times, numericas):
+        """
+        Esquema com os times informados (em ordem alfabética, sem repetição) e as features numéricas.
+        """
+        return cls(sorted(set(times)), numericas)
+
+    def expandir(self, times):
+        """
+        Novo esquema com os times atuais mais os informados (ex.: promovidos), mesmas features numéricas.
+        """
+        return EsquemaDesign.ajustar([*self.times, *times], self.numericas)
+
+    @property
+    def n_times(self):
+        return len(self.times)
+
+    @property
+    def n_colunas(self):
+        return 2 * len(self.times) + len(self.numericas)
+
+    @property
+    def colunas(self):
+        """
+        Nome de cada coluna da matriz, na ordem do layout.
+        """
+        return ([f'HomeTeam_{time}' for time in self.times] + [f'AwayTeam_{time}' for time in self.times] +
+                self.numericas)
+
+    def codificar(self, times):
+        """
+        Código inteiro de cada time (-1 para times que não fazem parte do esquema).
+        """
+        return self.indice.get_indexer(pd.Index(times))
+
+    def montar(self, codigos_casa, codigos_visitante, numericas):
+        """
+        Matriz CSR (N x n_colunas) a partir dos códigos do mandante e do visitante e de uma matriz N x k com
+        as features numéricas na ordem de `numericas`. Times com código -1 ficam sem coluna one-hot.
+        """
+        codigos_casa = np.asarray(codigos_casa, dtype=np.int64)
+        codigos_visitante = np.asarray(codigos_visitante, dtype=np.int64)
+        numericas = np.asarray(numericas, dtype=float).reshape(len(codigos_casa), len(self.numericas))
+        n_linhas, n_times = len(codigos_casa), len(self.times)
+
+        # Cada linha tem até 2 colunas one-hot seguidas das k numéricas; as posições inválidas são descartadas
+        indices = np.empty((n_linhas, 2 + len(self.numericas)), dtype=np.int64)
+        indices[:, 0] = codigos_casa
+        indices[:, 1] = np.where(codigos_visitante >= 0, n_times + codigos_visitante, -1)
+        indices[:, 2:] = 2 * n_times + np.arange(len(self.numericas))
+        valores = np.column_stack([np.ones((n_linhas, 2)), numericas])
+        validas = (indices >= 0) & (valores != 0)
+
+        indptr = np.zeros(n_linhas + 1, dtype=np.int64)
+        np.cumsum(validas.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix((valores[validas], indices[validas], indptr), shape=(n_linhas, self.n_colunas))
+
+    def montar_jogos(self, df_jogos):
+        """
+        Matriz CSR de um DataFrame de jogos com HomeTeam, AwayTeam e as features numéricas (nulos viram 0).
+        """
+        numericas = df_jogos[self.numericas].to_numpy(dtype=float) if self.numericas else np.zeros((len(df_jogos), 0))
+        return self.montar(self.codificar(df_jogos['HomeTeam']), self.codificar(df_jogos['AwayTeam']),
+                           np.nan_to_num(numericas, nan=0.0))
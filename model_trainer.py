@@ -1,48 +1,449 @@
+import copy
+import hashlib
+import json
+import os
+import time
+import joblib
+import numpy as np
 import pandas as pd
+import sklearn
+from scipy import sparse
+from scipy.optimize import minimize, minimize_scalar
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import OneHotEncoder
+from instrumentacao import instrumentar, medir
+from feature_engineering import EstadoFeatures, acumular_time_stats, preparar_dados_para_modelo
+from matriz_design import EsquemaDesign
+from modelo_gols import GOLS_MAXIMOS, REGULARIZACAO_GOLS, ModeloGols
+from predictor import MatrizProbabilidades, prever_jogos
 
+# Versão do formato dos artefatos salvos; incrementar invalida todos os artefatos antigos
+VERSAO_ARTEFATO = 5
+DIRETORIO_ARTEFATOS = os.environ.get("FUTBOT_ARTEFATOS", "artefatos")
+ARTEFATOS_MANTIDOS = 3
+# Configuração do modelo de produção exportada pela seleção de modelos (selecao_modelo.py)
+ARQUIVO_CONFIGURACAO = os.environ.get("FUTBOT_CONFIG_MODELO", "configuracao_modelo.json")
 
-def treinar_modelo(df_treino):
+FEATURES_NUMERICAS = [
+    'ForcaGeral_Home', 'ForcaGeral_Away', 'FormaPontos_Home', 'FormaPontos_Away',
+    'MediaGolsMarcados_Home', 'MediaGolsMarcados_Away', 'MediaGolsSofridos_Home', 'MediaGolsSofridos_Away'
+]
+PARAMETROS_MODELO = {'multi_class': 'multinomial', 'solver': 'lbfgs', 'max_iter': 2000}
+PARAMETROS_FLORESTA = {'n_estimators': 100, 'min_samples_leaf': 20, 'random_state': 0}
+# Classificadores disponíveis e seus parâmetros fixos; os da configuração são aplicados por cima
+CLASSIFICADORES = {
+    'logistica': (LogisticRegression, PARAMETROS_MODELO),
+    'floresta': (RandomForestClassifier, PARAMETROS_FLORESTA),
+}
+CONFIGURACAO_PADRAO = {
+    'janela': 5,
+    'features': FEATURES_NUMERICAS,
+    'classificador': 'logistica',
+    'parametros': {},
+    'calibracao': None,
+}
+# Fração final (mais recente) dos jogos de treino usada para ajustar a calibração por temperatura
+FRACAO_CALIBRACAO = 0.2
+# Quantas atualizações incrementais seguidas são aceitas antes de forçar um treino completo
+MAX_ATUALIZACOES_INCREMENTAIS = 10
+
+
+def carregar_configuracao(caminho=ARQUIVO_CONFIGURACAO):
     """
-    Treinando o modelo de regressão logística.
+    Configuração do modelo de produção (janela, features, classificador, parâmetros e calibração): a do
+    arquivo exportado pela seleção de modelos, se existir e for válida, ou a padrão.
     """
-    print("Treinando o modelo de previsão...")
-    features_cols = [
-        'HomeTeam', 'AwayTeam', 'ForcaGeral_Home', 'ForcaGeral_Away',
-        'FormaPontos_Home', 'FormaPontos_Away', 'MediaGolsMarcados_Home', 'MediaGolsMarcados_Away',
-        'MediaGolsSofridos_Home', 'MediaGolsSofridos_Away'
-    ]
+    if not os.path.exists(caminho):
+        return dict(CONFIGURACAO_PADRAO)
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        configuracao = {chave: dados.get(chave, padrao) for chave, padrao in CONFIGURACAO_PADRAO.items()}
+        if configuracao['classificador'] not in CLASSIFICADORES:
+            raise ValueError(f"classificador desconhecido: {configuracao['classificador']}")
+        if not set(configuracao['features']) <= set(FEATURES_NUMERICAS):
+            raise ValueError(f"features desconhecidas: {sorted(set(configuracao['features']) - set(FEATURES_NUMERICAS))}")
+        if configuracao['calibracao'] not in (None, 'temperatura'):
+            raise ValueError(f"calibração desconhecida: {configuracao['calibracao']}")
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"AVISO: configuração do modelo {caminho} inválida ({e}). Usando a configuração padrão.")
+        return dict(CONFIGURACAO_PADRAO)
+    return configuracao
+
+
+CONFIGURACAO_MODELO = carregar_configuracao()
+FEATURES_COLS = ['HomeTeam', 'AwayTeam', *CONFIGURACAO_MODELO['features']]
+JANELA_FORMA = CONFIGURACAO_MODELO['janela']
+
+
+def criar_classificador(nome, parametros=None):
+    """
+    Instância não treinada do classificador `nome` com os parâmetros fixos mais os informados.
+    """
+    classe, fixos = CLASSIFICADORES[nome]
+    return classe(**{**fixos, **(parametros or {})})
+
+
+def _aplicar_temperatura(probabilidades, temperatura):
+    log_P = np.log(np.clip(probabilidades, 1e-15, 1)) / temperatura
+    P = np.exp(log_P - log_P.max(axis=1, keepdims=True))
+    return P / P.sum(axis=1, keepdims=True)
+
+
+def ajustar_temperatura(probabilidades, observado):
+    """
+    Temperatura que minimiza a log-loss das probabilidades (n_jogos, n_classes) contra os índices das
+    classes observadas.
+    """
+    linhas = np.arange(len(observado))
+
+    def perda(log_temperatura):
+        P = _aplicar_temperatura(probabilidades, np.exp(log_temperatura))
+        return -np.mean(np.log(np.clip(P[linhas, observado], 1e-15, 1)))
+
+    return float(np.exp(minimize_scalar(perda, bounds=(-3, 3), method='bounded').x))
+
+
+class ModeloCalibrado:
+    """
+    Classificador calibrado por temperatura: as probabilidades do modelo base são elevadas a 1/T e
+    renormalizadas (T > 1 suaviza previsões confiantes demais, T < 1 as acentua).
+    """
+
+    def __init__(self, modelo, temperatura):
+        self.modelo = modelo
+        self.temperatura = temperatura
+        self.classes_ = modelo.classes_
 
-    # Garante que não há valores nulos nas features numéricas
-    numeric_features = [col for col in features_cols if col not in ['HomeTeam', 'AwayTeam']]
-    df_treino[numeric_features] = df_treino[numeric_features].fillna(0)
+    def predict_proba(self, X):
+        return _aplicar_temperatura(self.modelo.predict_proba(X), self.temperatura)
 
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
 
-    X = df_treino[features_cols]
-    y = df_treino['Resultado']
 
-    # Separar colunas categóricas e numéricas
-    X_categorico = X[['HomeTeam', 'AwayTeam']]
-    X_numerico = X.drop(['HomeTeam', 'AwayTeam'], axis=1)
+def ajustar_classificador(X, y, configuracao=None):
+    """
+    Treina o classificador da configuração (padrão: a de produção) na matriz de design X, com as linhas
+    em ordem cronológica. Com calibração 'temperatura', a temperatura é ajustada nas previsões para os
+    jogos mais recentes (FRACAO_CALIBRACAO) de um modelo treinado só com os anteriores; o modelo
+    retornado é treinado com todos os jogos.
+    """
+    configuracao = configuracao or CONFIGURACAO_MODELO
+    y = np.asarray(y)
+    modelo = criar_classificador(configuracao['classificador'], configuracao['parametros'])
+    with medir(f"modelo.{configuracao['classificador']}", linhas=X.shape[0]):
+        modelo.fit(X, y)
+    if configuracao['calibracao'] != 'temperatura':
+        return modelo
 
-    # Aplicar OneHotEncoder nas colunas categóricas
-    encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-    X_encoded_teams = encoder.fit_transform(X_categorico)
-    
-    # Criar DataFrame com os nomes das colunas encodadas
-    encoded_cols = encoder.get_feature_names_out(['HomeTeam', 'AwayTeam'])
-    X_encoded_df = pd.DataFrame(X_encoded_teams, columns=encoded_cols, index=X.index)
+    corte = int(X.shape[0] * (1 - FRACAO_CALIBRACAO))
+    if len(np.unique(y[:corte])) < len(modelo.classes_) or corte == X.shape[0]:
+        print("AVISO: jogos insuficientes para calibrar o modelo. Usando o modelo sem calibração.")
+        return modelo
+    parcial = clone(modelo).fit(X[:corte], y[:corte])
+    temperatura = ajustar_temperatura(parcial.predict_proba(X[corte:]), np.searchsorted(parcial.classes_, y[corte:]))
+    return ModeloCalibrado(modelo, temperatura)
 
-    # Juntar as features encodadas com as numéricas
-    X_final = pd.concat([X_encoded_df, X_numerico], axis=1)
 
-    # Obter a lista de colunas do modelo treinado
-    colunas_modelo = X_final.columns.tolist()
+@instrumentar('modelo.treinar')
+def treinar_modelo(df_treino, configuracao=None):
+    """
+    Treinando o modelo de previsão com a configuração informada (padrão: a de produção, regressão
+    logística se nenhuma foi exportada).
+    Retorna o modelo, o encoder (EsquemaDesign com o layout das colunas) e os nomes das colunas.
+    """
+    print("Treinando o modelo de previsão...")
+    configuracao = configuracao or CONFIGURACAO_MODELO
 
-    modelo = LogisticRegression(multi_class='multinomial', solver='lbfgs', max_iter=2000)
-    modelo.fit(X_final, y)
+    # One-hot dos times e features numéricas em uma matriz esparsa, direto dos códigos inteiros dos times
+    encoder = EsquemaDesign.ajustar(pd.concat([df_treino['HomeTeam'], df_treino['AwayTeam']]), configuracao['features'])
+    X = encoder.montar_jogos(df_treino)
+    modelo = ajustar_classificador(X, df_treino['Resultado'], configuracao)
 
     print("Modelo treinado com sucesso.")
-    
-    return modelo, encoder, colunas_modelo
\ No newline at end of file
+
+    return modelo, encoder, encoder.colunas
+
+
+def aceita_atualizacao_incremental(modelo):
+    """
+    A atualização incremental (atualizar_modelo) reotimiza os coeficientes da regressão logística; os demais
+    modelos são retreinados.
+    """
+    return isinstance(modelo, LogisticRegression)
+
+
+def calcular_impressao_digital(df_resultados):
+    """
+    Calcula a chave do artefato: um hash dos jogos usados no treino e da configuração de features e
+    do modelo. Qualquer jogo novo ou alterado (ou mudança de configuração) gera uma chave diferente.
+    """
+    colunas = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
+    dados = df_resultados[colunas].astype({'FTHG': float, 'FTAG': float})
+    dados['Date'] = pd.to_datetime(dados['Date']).dt.strftime('%Y-%m-%d')
+    dados = dados.sort_values(by=['Date', 'HomeTeam', 'AwayTeam'], kind='stable')
+    hash_dados = hashlib.sha256(pd.util.hash_pandas_object(dados, index=False).to_numpy().tobytes())
+    configuracao = {
+        'versao': VERSAO_ARTEFATO,
+        'sklearn': sklearn.__version__,
+        'features': FEATURES_COLS,
+        'janela': JANELA_FORMA,
+        'modelo': {**CONFIGURACAO_MODELO, 'fixos': CLASSIFICADORES[CONFIGURACAO_MODELO['classificador']][1]},
+        'gols': {'maximo': GOLS_MAXIMOS, 'regularizacao': REGULARIZACAO_GOLS},
+    }
+    hash_dados.update(json.dumps(configuracao, sort_keys=True).encode('utf-8'))
+    return hash_dados.hexdigest()[:16]
+
+
+def _caminho_artefato(chave, diretorio):
+    return os.path.join(diretorio, f"modelo_v{VERSAO_ARTEFATO}_{chave}.joblib")
+
+
+def salvar_artefato(artefato, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Salva o artefato (modelo, encoder, colunas, time_stats, a matriz de probabilidades de todos os
+    confrontos e o modelo de gols com as matrizes de placar) de forma atômica e remove os mais antigos.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = _caminho_artefato(artefato['chave'], diretorio)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    joblib.dump(artefato, temporario)
+    os.replace(temporario, caminho)
+
+    antigos = sorted((os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.endswith('.joblib')),
+                     key=os.path.getmtime, reverse=True)[ARTEFATOS_MANTIDOS:]
+    for antigo in antigos:
+        os.remove(antigo)
+    return caminho
+
+
+def carregar_artefato(chave, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Carrega o artefato com a chave informada, mapeando os arrays em memória. Retorna None se não existir.
+    """
+    caminho = _caminho_artefato(chave, diretorio)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return joblib.load(caminho, mmap_mode='r')
+    except Exception as e:
+        print(f"AVISO: artefato {caminho} inválido ({e}). O modelo será treinado novamente.")
+        return None
+
+
+def _perda_multinomial(theta, X1, Y, C, theta0, precisao0):
+    """
+    Perda logística multinomial (ponderada por C) dos jogos novos mais a penalização quadrática que
+    mantém os coeficientes próximos dos anteriores, e seu gradiente.
+    """
+    W = theta.reshape(Y.shape[1], X1.shape[1])
+    Z = X1 @ W.T
+    Z -= Z.max(axis=1, keepdims=True)
+    log_P = Z - np.log(np.exp(Z).sum(axis=1, keepdims=True))
+    delta = theta - theta0
+    perda = -C * (Y * log_P).sum() + 0.5 * delta @ precisao0 @ delta
+    gradiente = C * (X1.T @ (np.exp(log_P) - Y)).T.ravel() + precisao0 @ delta
+    return perda, gradiente
+
+
+def _hessiana_dados(modelo, X, C):
+    """
+    Hessiana da perda logística multinomial (ponderada por C) nos jogos de X, com os coeficientes atuais.
+    As linhas/colunas seguem a ordem (classe, coluna de X + intercepto). X é a matriz esparsa do EsquemaDesign.
+    """
+    X1 = sparse.hstack([X, np.ones((X.shape[0], 1))], format='csr')
+    Z = X1 @ np.hstack([modelo.coef_, modelo.intercept_[:, None]]).T
+    P = np.exp(Z - Z.max(axis=1, keepdims=True))
+    P /= P.sum(axis=1, keepdims=True)
+    n_classes, n_colunas = P.shape[1], X1.shape[1]
+    hessiana = np.zeros((n_classes, n_colunas, n_classes, n_colunas))
+    for a in range(n_classes):
+        for b in range(n_classes):
+            pesos = P[:, a] * ((a == b) - P[:, b])
+            hessiana[a, :, b, :] = C * (X1.T @ X1.multiply(pesos[:, None])).toarray()
+    return hessiana.reshape(n_classes * n_colunas, n_classes * n_colunas)
+
+
+def calcular_precisao(modelo, X, C):
+    """
+    Hessiana do objetivo de treino no ponto ótimo (aproximação de Laplace), usada como a "memória" dos
+    jogos já vistos nas atualizações incrementais. Inclui a regularização L2, que não se aplica aos interceptos.
+    """
+    n_classes, n_colunas = modelo.coef_.shape[0], X.shape[1] + 1
+    regularizacao = np.tile(np.r_[np.ones(n_colunas - 1), 0.0], n_classes)
+    return _hessiana_dados(modelo, X, C) + np.diag(regularizacao)
+
+
+@instrumentar('modelo.atualizar_incremental')
+def atualizar_modelo(artefato, df_novos_jogos, max_iter=200):
+    """
+    Atualiza o artefato apenas com os jogos novos: calcula as features pelo estado incremental,
+    inclui colunas para times nunca vistos e reotimiza a regressão logística (LBFGS) a partir dos
+    coeficientes atuais, mantendo-os próximos dos anteriores segundo a precisão acumulada.
+    Retorna um novo artefato; o original não é alterado.
+    """
+    modelo, encoder, colunas_antigas = artefato['modelo'], artefato['encoder'], artefato['colunas_modelo']
+    estado = EstadoFeatures.de_dict(artefato['estado_features'])
+    df_novos = estado.atualizar(df_novos_jogos)
+
+    # Times nunca vistos (ex.: promovidos) ganham colunas novas no esquema, sem novo treino
+    novo_encoder = encoder.expandir(pd.concat([df_novos_jogos['HomeTeam'], df_novos_jogos['AwayTeam']]))
+    colunas_modelo = novo_encoder.colunas
+
+    # Reposiciona coeficientes e precisão na nova ordem de colunas (colunas novas começam zeradas)
+    classes = list(modelo.classes_)
+    n_classes, n_colunas = len(classes), len(colunas_modelo) + 1
+    posicao_antiga = {coluna: i for i, coluna in enumerate(colunas_antigas)}
+    mapa = np.array([posicao_antiga.get(coluna, -1) for coluna in colunas_modelo] + [len(colunas_antigas)])
+    existentes = mapa >= 0
+
+    W0 = np.zeros((n_classes, n_colunas))
+    W0[:, existentes] = np.hstack([modelo.coef_, modelo.intercept_[:, None]])[:, mapa[existentes]]
+    theta0 = W0.ravel()
+
+    precisao_antiga = np.asarray(artefato['precisao']).reshape(n_classes, len(colunas_antigas) + 1,
+                                                               n_classes, len(colunas_antigas) + 1)
+    precisao0 = np.zeros((n_classes, n_colunas, n_classes, n_colunas))
+    indices = np.flatnonzero(existentes)
+    precisao0[np.ix_(range(n_classes), indices, range(n_classes), indices)] = \
+        precisao_antiga[np.ix_(range(n_classes), mapa[indices], range(n_classes), mapa[indices])]
+    precisao0 = precisao0.reshape(n_classes * n_colunas, n_classes * n_colunas)
+    novos_coeficientes = np.flatnonzero(np.tile(~existentes, n_classes))
+    precisao0[novos_coeficientes, novos_coeficientes] = 1.0  # mesma regularização L2 do treino completo
+
+    novo_modelo = copy.deepcopy(modelo)
+    if df_novos.empty:
+        theta = theta0
+        X = sparse.csr_matrix((0, n_colunas - 1))
+    else:
+        X = novo_encoder.montar_jogos(df_novos)
+        X1 = sparse.hstack([X, np.ones((X.shape[0], 1))], format='csr')
+        Y = (df_novos['Resultado'].to_numpy()[:, None] == np.array(classes)[None, :]).astype(float)
+        resultado = minimize(_perda_multinomial, theta0, args=(X1, Y, modelo.C, theta0, precisao0),
+                             jac=True, method='L-BFGS-B', options={'maxiter': max_iter})
+        theta = resultado.x
+
+    W = theta.reshape(n_classes, n_colunas)
+    novo_modelo.coef_, novo_modelo.intercept_ = W[:, :-1].copy(), W[:, -1].copy()
+    novo_modelo.n_features_in_ = len(colunas_modelo)
+
+    precisao = precisao0 + _hessiana_dados(novo_modelo, X, modelo.C)
+
+    return {
+        **artefato,
+        'criado_em': time.time(),
+        'modelo': novo_modelo,
+        'encoder': novo_encoder,
+        'colunas_modelo': colunas_modelo,
+        'time_stats': acumular_time_stats(artefato['time_stats'], df_novos_jogos.sort_values(by='Date', kind='stable')),
+        'estado_features': estado.para_dict(),
+        'precisao': precisao,
+        'atualizacoes_incrementais': artefato.get('atualizacoes_incrementais', 0) + 1,
+    }
+
+
+def medir_desvio_retreino(artefato, df_resultados):
+    """
+    Compara o modelo do artefato (ex.: atualizado incrementalmente) com um treino completo nos mesmos
+    jogos. Retorna o desvio médio e máximo das probabilidades previstas para todos os confrontos
+    possíveis e a log-loss de cada modelo nos jogos de treino, para decidir quando retreinar do zero.
+    """
+    df_treino, time_stats = preparar_dados_para_modelo(df_resultados.copy(), JANELA_FORMA)
+    modelo, encoder, colunas_modelo = treinar_modelo(df_treino)
+
+    times = sorted(time_stats)
+    pares = [(casa, visitante) for casa in times for visitante in times if casa != visitante]
+    probs_completo = prever_jogos(pares, modelo, encoder, time_stats, colunas_modelo)
+    probs_artefato = prever_jogos(pares, artefato['modelo'], artefato['encoder'], artefato['time_stats'],
+                                  artefato['colunas_modelo'])
+    diferenca = np.abs(probs_completo - probs_artefato)
+
+    def log_loss(modelo_avaliado, encoder_avaliado):
+        P = modelo_avaliado.predict_proba(encoder_avaliado.montar_jogos(df_treino))
+        indices = np.searchsorted(modelo_avaliado.classes_, df_treino['Resultado'])
+        return float(-np.mean(np.log(np.clip(P[np.arange(len(P)), indices], 1e-15, 1))))
+
+    desvio = {
+        'desvio_medio': float(diferenca.mean()),
+        'desvio_maximo': float(diferenca.max()),
+        'log_loss_artefato': log_loss(artefato['modelo'], artefato['encoder']),
+        'log_loss_completo': log_loss(modelo, encoder),
+        'atualizacoes_incrementais': artefato.get('atualizacoes_incrementais', 0),
+    }
+    print(f"Desvio em relação ao treino completo: médio {desvio['desvio_medio']:.4f}, "
+          f"máximo {desvio['desvio_maximo']:.4f}.")
+    return desvio
+
+
+def _ultimo_artefato(diretorio):
+    if not os.path.isdir(diretorio):
+        return None
+    caminhos = sorted((os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+                       if nome.startswith(f"modelo_v{VERSAO_ARTEFATO}_") and nome.endswith('.joblib')),
+                      key=os.path.getmtime, reverse=True)
+    for caminho in caminhos:
+        try:
+            return joblib.load(caminho, mmap_mode='r')
+        except Exception:
+            continue
+    return None
+
+
+@instrumentar('modelo.obter')
+def obter_modelo(df_resultados, diretorio=DIRETORIO_ARTEFATOS, incremental=True):
+    """
+    Retorna o artefato treinado para estes jogos: carrega do disco se já existir; se o último artefato
+    cobre apenas parte dos jogos (as rodadas anteriores), atualiza-o incrementalmente com os jogos novos;
+    senão prepara as features, treina e salva. Retorna None se não houver dados de treino suficientes.
+    """
+    chave = calcular_impressao_digital(df_resultados)
+    artefato = carregar_artefato(chave, diretorio)
+    if artefato is not None:
+        print(f"Modelo carregado do artefato {chave}.")
+        return artefato
+
+    if incremental:
+        anterior = _ultimo_artefato(diretorio)
+        if anterior is not None and anterior.get('precisao') is not None and \
+                anterior.get('atualizacoes_incrementais', 0) < MAX_ATUALIZACOES_INCREMENTAIS:
+            datas = pd.to_datetime(df_resultados['Date'])
+            ja_vistos = df_resultados[datas <= anterior['ultima_data']]
+            novos = df_resultados[datas > anterior['ultima_data']]
+            if not novos.empty and calcular_impressao_digital(ja_vistos) == anterior['chave_dados']:
+                print(f"Atualizando o modelo incrementalmente com {len(novos)} jogo(s) novo(s)...")
+                artefato = atualizar_modelo(anterior, novos)
+                artefato.update({'chave': chave, 'chave_dados': chave, 'ultima_data': datas.max()})
+                artefato['matriz_probabilidades'] = MatrizProbabilidades.calcular(
+                    artefato['modelo'], artefato['encoder'], artefato['time_stats'], artefato['colunas_modelo'])
+                artefato['modelo_gols'] = ModeloGols.ajustar(df_resultados)
+                salvar_artefato(artefato, diretorio)
+                return artefato
+
+    df_treino, time_stats = preparar_dados_para_modelo(df_resultados.copy(), JANELA_FORMA)
+    if df_treino.empty:
+        return None
+    modelo, encoder, colunas_modelo = treinar_modelo(df_treino)
+    ultima_data = pd.to_datetime(df_resultados['Date']).max()
+    estado = EstadoFeatures.de_time_stats(time_stats, len(df_resultados), ultima_data, JANELA_FORMA)
+
+    artefato = {
+        'versao': VERSAO_ARTEFATO,
+        'chave': chave,
+        'chave_dados': chave,
+        'ultima_data': ultima_data,
+        'criado_em': time.time(),
+        'modelo': modelo,
+        'encoder': encoder,
+        'colunas_modelo': colunas_modelo,
+        'time_stats': time_stats,
+        'estado_features': estado.para_dict(),
+        'precisao': (calcular_precisao(modelo, encoder.montar_jogos(df_treino), modelo.C)
+                     if aceita_atualizacao_incremental(modelo) else None),
+        'atualizacoes_incrementais': 0,
+        'matriz_probabilidades': MatrizProbabilidades.calcular(modelo, encoder, time_stats, colunas_modelo),
+        'modelo_gols': ModeloGols.ajustar(df_resultados),
+    }
+    salvar_artefato(artefato, diretorio)
+    return artefato
@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import gammaln
+from instrumentacao import instrumentar
+
+# Placares considerados vão de 0 a GOLS_MAXIMOS gols para cada time (a massa acima disso é redistribuída)
+GOLS_MAXIMOS = 10
+# Penalização L2 das forças de ataque e defesa (puxa times com poucos jogos para a média)
+REGULARIZACAO_GOLS = 1.0
+# Limites do parâmetro de dependência de Dixon-Coles para placares baixos
+LIMITES_RHO = (-0.3, 0.3)
+# Divisões da tabela-guia usada no sorteio dos placares
+DIVISOES_GUIA = 256
+
+
+def _indices_placares(n_gols):
+    # Gols do mandante e do visitante e código do resultado (1, 0 ou -1) de cada célula da matriz achatada
+    gols_casa, gols_visitante = np.divmod(np.arange(n_gols * n_gols), n_gols)
+    return gols_casa, gols_visitante, np.sign(gols_casa - gols_visitante)
+
+
+def _perda_dixon_coles(theta, casa, visitante, gols_casa, gols_visitante, pesos, n_times, regularizacao):
+    """
+    Log-verossimilhança negativa (ponderada) do modelo de Dixon-Coles com penalização L2, e seu gradiente.
+    theta = [intercepto, vantagem do mandante, rho, ataque (n_times), defesa (n_times)].
+    """
+    intercepto, vantagem_casa, rho = theta[:3]
+    ataque, defesa = theta[3:3 + n_times], theta[3 + n_times:]
+    log_l = intercepto + vantagem_casa + ataque[casa] + defesa[visitante]
+    log_m = intercepto + ataque[visitante] + defesa[casa]
+    l, m = np.exp(log_l), np.exp(log_m)
+
+    perda = np.sum(pesos * (l - gols_casa * log_l + m - gols_visitante * log_m))
+    grad_l = pesos * (l - gols_casa)
+    grad_m = pesos * (m - gols_visitante)
+
+    # Correção dos placares 0x0, 0x1, 1x0 e 1x1: tau e as derivadas de log(tau) em log(l), log(m) e rho
+    tau = np.ones_like(l)
+    dtau_l, dtau_m, dtau_rho = np.zeros_like(l), np.zeros_like(l), np.zeros_like(l)
+    zero_zero = (gols_casa == 0) & (gols_visitante == 0)
+    zero_um = (gols_casa == 0) & (gols_visitante == 1)
+    um_zero = (gols_casa == 1) & (gols_visitante == 0)
+    um_um = (gols_casa == 1) & (gols_visitante == 1)
+    tau[zero_zero] = 1 - l[zero_zero] * m[zero_zero] * rho
+    tau[zero_um] = 1 + l[zero_um] * rho
+    tau[um_zero] = 1 + m[um_zero] * rho
+    tau[um_um] = 1 - rho
+    tau = np.maximum(tau, 1e-10)
+    dtau_l[zero_zero] = dtau_m[zero_zero] = -l[zero_zero] * m[zero_zero] * rho
+    dtau_rho[zero_zero] = -l[zero_zero] * m[zero_zero]
+    dtau_l[zero_um] = l[zero_um] * rho
+    dtau_rho[zero_um] = l[zero_um]
+    dtau_m[um_zero] = m[um_zero] * rho
+    dtau_rho[um_zero] = m[um_zero]
+    dtau_rho[um_um] = -1.0
+
+    perda -= np.sum(pesos * np.log(tau))
+    grad_l -= pesos * dtau_l / tau
+    grad_m -= pesos * dtau_m / tau
+    perda += 0.5 * regularizacao * (ataque @ ataque + defesa @ defesa)
+
+    gradiente = np.empty_like(theta)
+    gradiente[0] = grad_l.sum() + grad_m.sum()
+    gradiente[1] = grad_l.sum()
+    gradiente[2] = -np.sum(pesos * dtau_rho / tau)
+    gradiente[3:3 + n_times] = (np.bincount(casa, grad_l, n_times) + np.bincount(visitante, grad_m, n_times) +
+                                regularizacao * ataque)
+    gradiente[3 + n_times:] = (np.bincount(visitante, grad_l, n_times) + np.bincount(casa, grad_m, n_times) +
+                               regularizacao * defesa)
+    return perda, gradiente
+
+
+class PlacaresJogos:
+    """
+    Distribuições de placar de uma lista de jogos condicionadas ao resultado (Casa, Empate ou Visitante).
+    Permite sortear o placar de todos os jogos de um lote de temporadas de uma só vez, a partir do resultado
+    já sorteado pelo classificador: as probabilidades de cada resultado continuam sendo as do modelo.
+    """
+
+    def __init__(self, matrizes):
+        matrizes = np.asarray(matrizes, dtype=float)
+        self.n_jogos, self.n_gols = matrizes.shape[0], matrizes.shape[1]
+        n_celulas = self.n_gols * self.n_gols
+        gols_casa, gols_visitante, codigo_celula = _indices_placares(self.n_gols)
+        # Gols do mandante e do visitante de cada célula, para converter células sorteadas direto em float32
+        self.gols_casa_celula = gols_casa.astype(np.float32)
+        self.gols_visitante_celula = gols_visitante.astype(np.float32)
+
+        # (jogo, resultado na ordem Casa/Empate/Visitante, célula): probabilidade do placar dado o resultado
+        mascara = codigo_celula[None, None, :] == np.array([1, 0, -1])[None, :, None]
+        condicionais = matrizes.reshape(self.n_jogos, 1, n_celulas) * mascara
+        self.condicionais = condicionais / condicionais.sum(axis=2, keepdims=True)
+
+        # Sorteio pela inversa da distribuição acumulada com tabela-guia: para cada par (jogo, resultado), as
+        # células em ordem decrescente de probabilidade e a acumulada nessa ordem. A guia divide [0, 1) em
+        # DIVISOES_GUIA faixas: se a faixa cabe inteira em uma célula, guarda a célula (o sorteio é uma consulta);
+        # senão guarda -(posição + 1) da primeira célula possível, e a busca segue a partir dela
+        condicionais = self.condicionais.reshape(self.n_jogos * 3, n_celulas)
+        self._celulas = np.argsort(-condicionais, axis=1, kind='stable').astype(np.int32)
+        acumuladas = np.cumsum(np.take_along_axis(condicionais, self._celulas, axis=1), axis=1)
+        self._acumuladas = acumuladas / acumuladas[:, -1:]
+        limites = np.arange(DIVISOES_GUIA + 1) / DIVISOES_GUIA
+        # Busca de todas as faixas de uma vez: as acumuladas de cada par são deslocadas pelo índice do par
+        n_pares = len(condicionais)
+        deslocamento = 2 * np.arange(n_pares)[:, None]
+        inicio = np.searchsorted((self._acumuladas + deslocamento).ravel(), (limites[:-1] + deslocamento).ravel(),
+                                 side='right').reshape(n_pares, DIVISOES_GUIA) - np.arange(n_pares)[:, None] * n_celulas
+        unica = np.take_along_axis(self._acumuladas, inicio, axis=1) >= limites[None, 1:]
+        self._guia = np.where(unica, np.take_along_axis(self._celulas, inicio, axis=1), -(inicio + 1)).astype(np.int32)
+
+    def sortear(self, resultado, uniformes, jogos=None):
+        """
+        Placar (gols do mandante, gols do visitante) de cada jogo dado o resultado (1, 0 ou -1) e um número
+        uniforme em [0, 1). jogos: índice do jogo de cada elemento (padrão: a última dimensão percorre os jogos).
+        O mesmo número uniforme e o mesmo resultado sempre dão o mesmo placar.
+        """
+        return np.divmod(self.sortear_celulas(resultado, uniformes, jogos), self.n_gols)
+
+    def sortear_celulas(self, resultado, uniformes, jogos=None):
+        """
+        Mesmo sorteio de sortear(), retornando a célula da matriz de placares achatada (gols_casa * n_gols + gols_visitante).
+        """
+        resultado = np.asarray(resultado)
+        if jogos is None:
+            jogos = np.arange(self.n_jogos, dtype=np.int32)
+        bloco = np.asarray(jogos, dtype=np.int32) * 3 + (1 - resultado.astype(np.int32))
+        uniformes = np.asarray(uniformes)
+        celula = self._guia[bloco, (uniformes * DIVISOES_GUIA).astype(np.int32)]
+
+        # Faixas com mais de uma célula: busca linear a partir da primeira célula possível
+        ambiguas = np.flatnonzero(celula < 0)
+        if ambiguas.size:
+            bloco = np.broadcast_to(bloco, celula.shape).ravel()[ambiguas]
+            valores = np.broadcast_to(uniformes, celula.shape).ravel()[ambiguas]
+            posicao = -celula.ravel()[ambiguas] - 1
+            pendentes = np.flatnonzero(self._acumuladas[bloco, posicao] <= valores)
+            while pendentes.size:
+                posicao[pendentes] += 1
+                pendentes = pendentes[self._acumuladas[bloco[pendentes], posicao[pendentes]] <= valores[pendentes]]
+            celula.ravel()[ambiguas] = self._celulas[bloco, posicao]
+        return celula
+
+    def mais_provaveis(self, resultado):
+        """
+        Placar mais provável de cada jogo dado o resultado (1, 0 ou -1).
+        """
+        resultado = np.asarray(resultado, dtype=np.int64)
+        celula = np.argmax(self.condicionais[np.arange(self.n_jogos), 1 - resultado], axis=1)
+        return np.divmod(celula, self.n_gols)
+
+
+class ModeloGols:
+    """
+    Modelo de gols de Dixon-Coles: os gols do mandante e do visitante seguem Poisson com médias dadas pelo
+    ataque de um time, pela defesa do outro e pela vantagem do mando, com a correção de dependência para
+    placares baixos. As matrizes de probabilidade de placar de todos os confrontos ficam calculadas e
+    guardadas junto com o modelo; times desconhecidos usam as forças médias.
+    """
+
+    def __init__(self, times, intercepto, vantagem_casa, rho, ataque, defesa, gols_maximos=GOLS_MAXIMOS):
+        self.times = list(times)
+        self.indice_times = {time: i for i, time in enumerate(self.times)}
+        self.intercepto = float(intercepto)
+        self.vantagem_casa = float(vantagem_casa)
+        self.rho = float(rho)
+        # O último índice é o time médio (ataque e defesa zero), usado para times desconhecidos
+        self.ataque = np.append(np.asarray(ataque, dtype=float), 0.0)
+        self.defesa = np.append(np.asarray(defesa, dtype=float), 0.0)
+        self.gols_maximos = gols_maximos
+
+        n = len(self.ataque)
+        casa, visitante = np.divmod(np.arange(n * n), n)
+        self.placares = self.matrizes(casa, visitante).astype(np.float32).reshape(n, n, gols_maximos + 1, gols_maximos + 1)
+
+    @classmethod
+    @instrumentar('gols.ajustar', linhas=lambda modelo: len(modelo.times))
+    def ajustar(cls, df_resultados, regularizacao=REGULARIZACAO_GOLS, meia_vida=None, gols_maximos=GOLS_MAXIMOS):
+        """
+        Estima ataque e defesa de cada time, vantagem do mando e rho por máxima verossimilhança (L-BFGS com
+        gradiente analítico, vetorizado sobre todos os jogos). meia_vida (em dias) dá menos peso aos jogos
+        antigos. Retorna None se não houver jogos.
+        """
+        df = df_resultados[df_resultados['FTHG'].notna() & df_resultados['FTAG'].notna()]
+        if df.empty:
+            return None
+        times = sorted(set(df['HomeTeam']) | set(df['AwayTeam']))
+        indice = pd.Index(times)
+        casa, visitante = indice.get_indexer(df['HomeTeam']), indice.get_indexer(df['AwayTeam'])
+        gols_casa, gols_visitante = df['FTHG'].to_numpy(dtype=float), df['FTAG'].to_numpy(dtype=float)
+        pesos = np.ones(len(df))
+        if meia_vida is not None:
+            datas = pd.to_datetime(df['Date'])
+            idade = (datas.max() - datas).dt.days.to_numpy(dtype=float)
+            pesos = 0.5 ** (idade / meia_vida)
+
+        n_times = len(times)
+        media = max(np.average(np.r_[gols_casa, gols_visitante], weights=np.r_[pesos, pesos]), 0.1)
+        theta0 = np.zeros(3 + 2 * n_times)
+        theta0[0] = np.log(media)
+        limites = [(None, None), (None, None), LIMITES_RHO] + [(None, None)] * (2 * n_times)
+        resultado = minimize(_perda_dixon_coles, theta0, jac=True, method='L-BFGS-B', bounds=limites,
+                             args=(casa, visitante, gols_casa, gols_visitante, pesos, n_times, regularizacao))
+        theta = resultado.x
+        return cls(times, theta[0], theta[1], theta[2], theta[3:3 + n_times], theta[3 + n_times:], gols_maximos)
+
+    def codificar(self, times):
+        """
+        Índice de cada time nos parâmetros (times desconhecidos recebem o índice do time médio).
+        """
+        desconhecido = len(self.times)
+        return np.array([self.indice_times.get(time, desconhecido) for time in times], dtype=np.int64)
+
+    def medias(self, casa, visitante):
+        """
+        Médias de gols (Poisson) do mandante e do visitante para índices de times.
+        """
+        casa, visitante = np.asarray(casa), np.asarray(visitante)
+        log_l = self.intercepto + self.vantagem_casa + self.ataque[casa] + self.defesa[visitante]
+        log_m = self.intercepto + self.ataque[visitante] + self.defesa[casa]
+        return np.exp(log_l), np.exp(log_m)
+
+    def matrizes(self, casa, visitante):
+        """
+        Matrizes N x (gols_maximos + 1) x (gols_maximos + 1) com a probabilidade de cada placar
+        (linha: gols do mandante; coluna: gols do visitante) para índices de times.
+        """
+        l, m = self.medias(casa, visitante)
+        gols = np.arange(self.gols_maximos + 1)
+        pmf_l = np.exp(gols * np.log(l)[:, None] - l[:, None] - gammaln(gols + 1))
+        pmf_m = np.exp(gols * np.log(m)[:, None] - m[:, None] - gammaln(gols + 1))
+        matrizes = pmf_l[:, :, None] * pmf_m[:, None, :]
+        matrizes[:, 0, 0] *= 1 - l * m * self.rho
+        matrizes[:, 0, 1] *= 1 + l * self.rho
+        matrizes[:, 1, 0] *= 1 + m * self.rho
+        matrizes[:, 1, 1] *= 1 - self.rho
+        matrizes = np.maximum(matrizes, 0)
+        return matrizes / matrizes.sum(axis=(1, 2), keepdims=True)
+
+    def placares_jogos(self, times_casa, times_visitante):
+        """
+        PlacaresJogos dos confrontos informados (listas de nomes), a partir das matrizes guardadas.
+        """
+        return PlacaresJogos(self.placares[self.codificar(times_casa), self.codificar(times_visitante)])
+
+    def gols_esperados(self, time_casa, time_visitante):
+        """
+        Gols esperados do mandante e do visitante em um confronto.
+        """
+        matriz = self.placares[self.codificar([time_casa])[0], self.codificar([time_visitante])[0]].astype(float)
+        gols = np.arange(self.gols_maximos + 1)
+        return float(matriz.sum(axis=1) @ gols), float(matriz.sum(axis=0) @ gols)
@@ -1,100 +1,658 @@
 import pandas as pd
 import numpy as np
+import copy
+from concurrent.futures import ProcessPoolExecutor
+from classificacao import (E, GC, GP, PONTOS_RESULTADO, V, TabelaRodadas, confronto_direto_sorteado, contar_pontos,
+                           contar_posicoes, jogos_entre_pares, ordenar_classificacao, resultado_dos_gols)
+from instrumentacao import instrumentar, medir
 
-def prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo):
+# Features de forma calculadas para cada time (sufixadas com _Home/_Away nas colunas do modelo)
+FEATURES_TIME = ['ForcaGeral', 'FormaPontos', 'MediaGolsMarcados', 'MediaGolsSofridos']
+
+
+class PrevisorLote:
+    """
+    Pré-calcula as features e o código de cada time no esquema do modelo (EsquemaDesign), permitindo
+    prever muitos jogos com uma única chamada a predict_proba sobre a matriz esparsa, sem montar DataFrames.
+    """
+
+    def __init__(self, modelo, encoder, time_stats, colunas_modelo, times_extras=()):
+        self.modelo = modelo
+        self.encoder = encoder
+        self.classes = list(modelo.classes_)
+
+        self.times = list(dict.fromkeys([*time_stats, *encoder.times, *times_extras]))
+        for time in dict.fromkeys(times_extras):
+            if time not in time_stats:
+                print(f"Atenção: Não há dados históricos suficientes para '{time}'. Usando valores padrão.")
+        self.indice_times = {time: i for i, time in enumerate(self.times)}
+
+        # Código de cada time no esquema (-1 se o time não foi visto no treino)
+        self.codigos = encoder.codificar(self.times)
+
+        # Vetor de features numéricas de cada time, na ordem de FEATURES_TIME, lido do EstadoTimes, e a posição
+        # de cada feature numérica do esquema em [features do mandante, features do visitante]
+        self.features = time_stats.features_nomes(self.times)
+        origem = {f'{feature}_{lado}': deslocamento + i
+                  for lado, deslocamento in [('Home', 0), ('Away', len(FEATURES_TIME))]
+                  for i, feature in enumerate(FEATURES_TIME)}
+        self.colunas_numericas = np.array([origem[coluna] for coluna in encoder.numericas], dtype=np.int64)
+
+    def indices(self, jogos):
+        """
+        Converte uma lista de pares (mandante, visitante) em uma matriz N x 2 de índices inteiros dos times.
+        """
+        jogos = np.asarray(jogos)
+        if jogos.size == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        if np.issubdtype(jogos.dtype, np.integer):
+            return jogos.reshape(-1, 2)
+        return np.array([[self.indice_times[casa], self.indice_times[visitante]] for casa, visitante in jogos],
+                        dtype=np.int64)
+
+    def prever(self, jogos):
+        """
+        Retorna a matriz N x 3 de probabilidades (colunas na ordem de modelo.classes_) para os jogos
+        informados, como pares de nomes ou de índices inteiros dos times.
+        """
+        jogos = self.indices(jogos)
+        if len(jogos) == 0:
+            return np.zeros((0, len(self.classes)))
+        casa, visitante = jogos[:, 0], jogos[:, 1]
+        numericas = np.hstack([self.features[casa], self.features[visitante]])[:, self.colunas_numericas]
+        X = self.encoder.montar(self.codigos[casa], self.codigos[visitante], numericas)
+        return self.modelo.predict_proba(X)
+
+
+@instrumentar('previsao.prever_jogos', linhas=len)
+def prever_jogos(jogos, modelo, encoder, time_stats, colunas_modelo):
+    """
+    Prevê as probabilidades de vários jogos de uma só vez.
+    Retorna uma matriz N x 3 com as colunas na ordem de modelo.classes_.
+    """
+    times_extras = [] if np.issubdtype(np.asarray(jogos).dtype, np.integer) else [time for jogo in jogos for time in jogo]
+    return PrevisorLote(modelo, encoder, time_stats, colunas_modelo, times_extras).prever(jogos)
+
+
+class MatrizProbabilidades:
+    """
+    Probabilidades de todos os confrontos possíveis, calculadas de uma só vez após o treino e guardadas
+    em um array mandante x visitante x resultado. Previsões e simulações viram consultas ao array.
+    """
+
+    def __init__(self, times, classes, probabilidades):
+        self.times = list(times)
+        self.classes = list(classes)
+        self.probabilidades = probabilidades
+        self.indice_times = {time: i for i, time in enumerate(self.times)}
+
+    @classmethod
+    @instrumentar('previsao.matriz_todos_confrontos', linhas=lambda matriz: len(matriz.times) ** 2)
+    def calcular(cls, modelo, encoder, time_stats, colunas_modelo):
+        """
+        Calcula a matriz para todos os pares ordenados de times com uma única chamada a predict_proba.
+        """
+        previsor = PrevisorLote(modelo, encoder, time_stats, colunas_modelo)
+        n_times = len(previsor.times)
+        casa, visitante = np.divmod(np.arange(n_times * n_times), n_times)
+        probabilidades = previsor.prever(np.column_stack([casa, visitante]))
+        return cls(previsor.times, previsor.classes, probabilidades.reshape(n_times, n_times, -1))
+
+    def contem(self, *times):
+        return all(time in self.indice_times for time in times)
+
+    def probabilidades_jogos(self, jogos):
+        """
+        Retorna a matriz N x 3 (colunas na ordem de classes) para uma lista de pares (mandante, visitante).
+        """
+        if len(jogos) == 0:
+            return np.zeros((0, len(self.classes)))
+        indices = np.array([[self.indice_times[casa], self.indice_times[visitante]] for casa, visitante in jogos])
+        return self.probabilidades[indices[:, 0], indices[:, 1]]
+
+    @instrumentar('previsao.jogo_matriz', linhas=lambda odds: 1)
+    def prever(self, time_casa, time_visitante):
+        """
+        Mesmo retorno de prever_jogo_especifico (dicionário resultado -> probabilidade), por consulta ao array.
+        """
+        probabilidades = self.probabilidades[self.indice_times[time_casa], self.indice_times[time_visitante]]
+        return {classe: prob for classe, prob in zip(self.classes, probabilidades)}
+
+    def odds_decimais(self):
+        """
+        Odds decimais (1 / probabilidade) de todos os confrontos.
+        """
+        with np.errstate(divide='ignore'):
+            return np.where(self.probabilidades > 0, 1 / self.probabilidades, np.inf)
+
+
+@instrumentar('previsao.jogo', linhas=lambda odds: 1)
+def prever_jogo_especifico(time_casa, time_visitante, modelo, encoder, time_stats, colunas_modelo, matriz=None,
+                           previsor=None):
     """
     Prevê o resultado e as probabilidades para um jogo específico.
+    Consulta a matriz pré-calculada ou um PrevisorLote já montado (ex.: um por artefato) quando eles cobrem
+    os dois times; só monta um previsor novo, com as features de todos os times, se nenhum deles servir.
     """
-    dados_jogo = {}
-    
-    # Preencher as features com base nas estatísticas dos times
-    for time, lado in [(time_casa, 'Home'), (time_visitante, 'Away')]:
-        if time not in time_stats:
-            print(f"Atenção: Não há dados históricos suficientes para '{time}'. Usando valores padrão.")
-            dados_jogo[f'ForcaGeral_{lado}'] = 1.0 
-            dados_jogo[f'FormaPontos_{lado}'] = 0
-            dados_jogo[f'MediaGolsMarcados_{lado}'] = 0
-            dados_jogo[f'MediaGolsSofridos_{lado}'] = 0
-        else:
-            # Evitar divisão por zero ou listas vazias
-            dados_jogo[f'ForcaGeral_{lado}'] = np.mean(time_stats[time]['pontos']) if time_stats[time]['pontos'] else 1.0
-            dados_jogo[f'FormaPontos_{lado}'] = sum(time_stats[time]['pontos'][-5:])
-            dados_jogo[f'MediaGolsMarcados_{lado}'] = np.mean(time_stats[time]['gm'][-5:]) if time_stats[time]['gm'] else 0
-            dados_jogo[f'MediaGolsSofridos_{lado}'] = np.mean(time_stats[time]['gs'][-5:]) if time_stats[time]['gs'] else 0
-
-    # Criar o DataFrame para o jogo
-    df_jogo_features_num = pd.DataFrame([dados_jogo])
-    
-    df_jogo_times = pd.DataFrame([{'HomeTeam': time_casa, 'AwayTeam': time_visitante}])
-    df_jogo_encoded_teams = encoder.transform(df_jogo_times[['HomeTeam', 'AwayTeam']])
-    df_jogo_encoded_df = pd.DataFrame(df_jogo_encoded_teams,
-                                      columns=encoder.get_feature_names_out(['HomeTeam', 'AwayTeam']))
-    
-    # Combinar features numéricas e categóricas
-    df_jogo_final = pd.concat([df_jogo_encoded_df, df_jogo_features_num], axis=1)
-
-    df_jogo_final = df_jogo_final.reindex(columns=colunas_modelo, fill_value=0)
-
-    probabilidades = modelo.predict_proba(df_jogo_final)[0]
+    if matriz is not None and matriz.contem(time_casa, time_visitante):
+        return matriz.prever(time_casa, time_visitante)
+    if previsor is None or time_casa not in previsor.indice_times or time_visitante not in previsor.indice_times:
+        previsor = PrevisorLote(modelo, encoder, time_stats, colunas_modelo, [time_casa, time_visitante])
+    probabilidades = previsor.prever([(time_casa, time_visitante)])[0]
     classes = modelo.classes_
 
     odds = {classe: prob for classe, prob in zip(classes, probabilidades)}
     return odds
 
-def simular_campeonato(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo):
+
+def _probabilidades_jogos(jogos, modelo, encoder, time_stats, colunas_modelo, matriz):
     """
-    Simula o campeonato até uma rodada específica.
+    Probabilidades dos jogos (colunas na ordem de modelo.classes_), consultando a matriz pré-calculada
+    quando ela cobre todos os times.
+    """
+    if matriz is not None and all(matriz.contem(casa, visitante) for casa, visitante in jogos):
+        return matriz.probabilidades_jogos(jogos)
+    return prever_jogos(jogos, modelo, encoder, time_stats, colunas_modelo)
+
+
+def _jogos_restantes(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo,
+                     matriz):
+    """
+    Times da temporada, jogos futuros até a rodada informada e suas probabilidades, previstas de uma só
+    vez, com as colunas na ordem (Casa, Empate, Visitante), independente da ordem de modelo.classes_.
     """
-    df_resultados_atuais['Resultado'] = np.where(
-        df_resultados_atuais['FTHG'] > df_resultados_atuais['FTAG'], 'Casa',
-        np.where(df_resultados_atuais['FTHG'] < df_resultados_atuais['FTAG'], 'Visitante', 'Empate')
-    )
-    
-    tabela = {}
     times_atuais = set(df_resultados_atuais['HomeTeam']).union(set(df_resultados_atuais['AwayTeam']))
     times_futuros = set(df_jogos_futuros['HomeTeam']).union(set(df_jogos_futuros['AwayTeam']))
     todos_times = sorted(list(times_atuais.union(times_futuros)))
 
-    for time in todos_times:
-        tabela[time] = {'P': 0, 'J': 0, 'V': 0, 'E': 0, 'D': 0, 'GP': 0, 'GC': 0, 'SG': 0}
-
-    # Popula a tabela com os resultados atuais
-    for _, row in df_resultados_atuais.iterrows():
-        casa, visitante, gp_casa, gp_visitante = row['HomeTeam'], row['AwayTeam'], row['FTHG'], row['FTAG']
-        tabela[casa]['J'] += 1; tabela[visitante]['J'] += 1
-        tabela[casa]['GP'] += gp_casa; tabela[casa]['GC'] += gp_visitante
-        tabela[visitante]['GP'] += gp_visitante; tabela[visitante]['GC'] += gp_casa
-        if row['Resultado'] == 'Casa':
-            tabela[casa]['P'] += 3; tabela[casa]['V'] += 1; tabela[visitante]['D'] += 1
-        elif row['Resultado'] == 'Visitante':
-            tabela[visitante]['P'] += 3; tabela[visitante]['V'] += 1; tabela[casa]['D'] += 1
+    jogos_a_simular = df_jogos_futuros[pd.to_numeric(df_jogos_futuros['Rodada']) <= rodada_final]
+    jogos = list(zip(jogos_a_simular['HomeTeam'], jogos_a_simular['AwayTeam']))
+    probabilidades = _probabilidades_jogos(jogos, modelo, encoder, time_stats, colunas_modelo, matriz)
+    ordem = [list(modelo.classes_).index(classe) for classe in ('Casa', 'Empate', 'Visitante')]
+    return todos_times, jogos_a_simular, np.asarray(probabilidades).reshape(len(jogos), -1)[:, ordem]
+
+
+def _tabela_com_jogos(todos_times, df_resultados_atuais, jogos_a_simular, resultado_jogos, gols_casa_jogos,
+                      gols_visitante_jogos, rodada_final):
+    """
+    TabelaRodadas dos jogos realizados mais os jogos futuros com os resultados (1, 0 ou -1) e gols informados.
+    """
+    indice_time = {time: i for i, time in enumerate(todos_times)}
+    gols_casa = df_resultados_atuais['FTHG'].to_numpy(dtype=float)
+    gols_visitante = df_resultados_atuais['FTAG'].to_numpy(dtype=float)
+    rodadas = np.concatenate([pd.to_numeric(df_resultados_atuais['Rodada']).to_numpy(dtype=np.int64),
+                              pd.to_numeric(jogos_a_simular['Rodada']).to_numpy(dtype=np.int64)])
+    return TabelaRodadas(
+        todos_times,
+        np.concatenate([df_resultados_atuais['HomeTeam'].map(indice_time).to_numpy(dtype=np.int64),
+                        jogos_a_simular['HomeTeam'].map(indice_time).to_numpy(dtype=np.int64)]),
+        np.concatenate([df_resultados_atuais['AwayTeam'].map(indice_time).to_numpy(dtype=np.int64),
+                        jogos_a_simular['AwayTeam'].map(indice_time).to_numpy(dtype=np.int64)]),
+        np.concatenate([gols_casa, gols_casa_jogos]),
+        np.concatenate([gols_visitante, gols_visitante_jogos]),
+        rodadas,
+        resultado=np.concatenate([resultado_dos_gols(gols_casa, gols_visitante), resultado_jogos]),
+        n_rodadas=max(int(rodada_final), int(rodadas.max(initial=0))),
+    )
+
+
+def _placares_restantes(jogos_a_simular, modelo_gols):
+    # Distribuições de placar dos jogos restantes (None sem modelo de gols: os jogos entram sem gols)
+    if modelo_gols is None:
+        return None
+    return modelo_gols.placares_jogos(jogos_a_simular['HomeTeam'], jogos_a_simular['AwayTeam'])
+
+
+def simular_rodadas(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo,
+                    matriz=None, modelo_gols=None):
+    """
+    Completa a temporada até a rodada informada com o resultado mais provável de cada jogo futuro e
+    retorna a TabelaRodadas com a classificação acumulada após cada rodada. Com o modelo de gols, cada
+    jogo recebe o placar mais provável para o resultado previsto; sem ele, entra sem gols.
+    """
+    todos_times, jogos_a_simular, probabilidades = _jogos_restantes(
+        rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo, matriz)
+    resultado_previsto = 1 - np.argmax(probabilidades, axis=1)
+    placares = _placares_restantes(jogos_a_simular, modelo_gols)
+    if placares is None:
+        gols_casa = gols_visitante = np.zeros(len(jogos_a_simular))
+    else:
+        gols_casa, gols_visitante = placares.mais_provaveis(resultado_previsto)
+    return _tabela_com_jogos(todos_times, df_resultados_atuais, jogos_a_simular, resultado_previsto, gols_casa,
+                             gols_visitante, rodada_final)
+
+
+@instrumentar('simulacao.deterministica', linhas=len)
+def simular_campeonato(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo,
+                       matriz=None, modelo_gols=None):
+    """
+    Simula o campeonato até uma rodada específica.
+    """
+    return simular_rodadas(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats,
+                           colunas_modelo, matriz, modelo_gols).tabela()
+
+
+def _simular_lote(probs_acumuladas, idx_casa, idx_visitante, pontos_base, vitorias_base, saldo_base, gols_pro_base,
+                  confrontos_base, n_simulacoes, semente, placares=None, tamanho_bloco=10_000):
+    """
+    Amostra temporadas completas e agrega as posições finais e os pontos de cada time. Com `placares`
+    (PlacaresJogos), o placar de cada jogo é sorteado a partir do resultado sorteado e entra no saldo e nos gols pró.
+    Executada em um processo separado quando a simulação é paralelizada.
+    """
+    rng = np.random.default_rng(semente)
+    n_times = len(pontos_base)
+    n_jogos = len(idx_casa)
+    pontos_maximos = int(pontos_base.max()) + 3 * n_jogos + 1
+
+    # Matrizes de incidência jogo x time, para acumular os pontos com um produto matricial
+    incidencia_casa = np.zeros((n_jogos, n_times), dtype=np.float32)
+    incidencia_casa[np.arange(n_jogos), idx_casa] = 1
+    incidencia_visitante = np.zeros((n_jogos, n_times), dtype=np.float32)
+    incidencia_visitante[np.arange(n_jogos), idx_visitante] = 1
+
+    # Cada jogo é descrito por dois indicadores: nao_casa (empate ou vitória do visitante) e
+    # visitante (vitória do visitante). Pontos e vitórias são funções lineares desses indicadores:
+    #   pontos do mandante = 3 - 2*nao_casa - visitante     pontos do visitante = nao_casa + 2*visitante
+    #   vitória do mandante = 1 - nao_casa                   vitória do visitante = visitante
+    # o que permite calcular pontos e vitórias de todos os times com um único produto matricial.
+    pesos = np.block([
+        [incidencia_visitante - 2 * incidencia_casa, -incidencia_casa],
+        [2 * incidencia_visitante - incidencia_casa, incidencia_visitante],
+    ]).astype(np.float32)
+    pontos_fixos = pontos_base + 3 * incidencia_casa.sum(axis=0)
+    vitorias_fixas = vitorias_base + incidencia_casa.sum(axis=0)
+    # Gols pró e saldo também são lineares nos gols sorteados do mandante e do visitante de cada jogo
+    pesos_gols_casa = np.hstack([incidencia_casa, incidencia_casa - incidencia_visitante])
+    pesos_gols_visitante = np.hstack([incidencia_visitante, incidencia_visitante - incidencia_casa])
+
+    # Confronto direto dos pares empatados: jogos já realizados mais os sorteados no bloco atual
+    jogos_entre = jogos_entre_pares(idx_casa, idx_visitante, n_times)
+
+    def resultado_bloco(linhas, jogos):
+        return 1 - indicadores[linhas, jogos] - indicadores[linhas, n_jogos + jogos]
+
+    def confronto_par(linhas, time_a, time_b):
+        return confronto_direto_sorteado(confrontos_base, jogos_entre, idx_casa, resultado_bloco, linhas, time_a, time_b)
+
+    contagem_posicoes = np.zeros((n_times, n_times), dtype=np.int64)
+    histograma_pontos = np.zeros((n_times, pontos_maximos), dtype=np.int64)
+    indicadores = np.empty((tamanho_bloco, 2 * n_jogos), dtype=np.float32)
+
+    restantes = n_simulacoes
+    while restantes > 0:
+        bloco = min(tamanho_bloco, restantes)
+        restantes -= bloco
+
+        sorteio = rng.random((bloco, n_jogos), dtype=np.float32)
+        np.greater(sorteio, probs_acumuladas[:, 0], out=indicadores[:bloco, :n_jogos])
+        np.greater(sorteio, probs_acumuladas[:, 1], out=indicadores[:bloco, n_jogos:])
+
+        acumulado = indicadores[:bloco] @ pesos
+        pontos = np.rint(pontos_fixos + acumulado[:, :n_times])
+        vitorias = np.rint(vitorias_fixas + acumulado[:, n_times:])
+
+        if placares is None:
+            # Sem modelo de gols, o saldo e os gols pró vêm só dos jogos realizados
+            gols_pro, saldo = gols_pro_base, saldo_base
         else:
-            tabela[casa]['P'] += 1; tabela[casa]['E'] += 1; tabela[visitante]['P'] += 1; tabela[visitante]['E'] += 1
+            resultado = 1 - indicadores[:bloco, :n_jogos] - indicadores[:bloco, n_jogos:]
+            celulas = placares.sortear_celulas(resultado, rng.random((bloco, n_jogos), dtype=np.float32))
+            gols = (placares.gols_casa_celula[celulas] @ pesos_gols_casa +
+                    placares.gols_visitante_celula[celulas] @ pesos_gols_visitante)
+            gols_pro = np.rint(gols_pro_base + gols[:, :n_times])
+            saldo = np.rint(saldo_base + gols[:, n_times:])
 
-    # Simula os jogos futuros
-    jogos_a_simular = df_jogos_futuros[pd.to_numeric(df_jogos_futuros['Rodada']) <= rodada_final]
-    for _, jogo in jogos_a_simular.iterrows():
-        casa, visitante = jogo['HomeTeam'], jogo['AwayTeam']
-        odds = prever_jogo_especifico(casa, visitante, modelo, encoder, time_stats, colunas_modelo)
-        if not odds: continue
-        resultado_previsto = max(odds, key=lambda k: odds[k])
-        tabela[casa]['J'] += 1; tabela[visitante]['J'] += 1
-        if resultado_previsto == 'Casa':
-            tabela[casa]['P'] += 3; tabela[casa]['V'] += 1; tabela[visitante]['D'] += 1
-        elif resultado_previsto == 'Visitante':
-            tabela[visitante]['P'] += 3; tabela[visitante]['V'] += 1; tabela[casa]['D'] += 1
+        # Critérios de desempate da CBF
+        ordem = ordenar_classificacao(pontos, vitorias, saldo, gols_pro, confronto_par, rng.random((bloco, n_times)))
+        contagem_posicoes += contar_posicoes(ordem)
+        histograma_pontos += contar_pontos(pontos, pontos_maximos)
+
+    return contagem_posicoes, histograma_pontos
+
+
+def resumir_simulacoes(todos_times, pontos_base, contagem_posicoes, histograma_pontos, n_simulacoes,
+                       vagas_libertadores=6, vagas_rebaixamento=4):
+    """
+    Monta o resumo por time e a distribuição das posições finais a partir das contagens das simulações.
+    """
+    n_times = len(todos_times)
+    prob_posicoes = contagem_posicoes / n_simulacoes
+    prob_pontos = histograma_pontos / n_simulacoes
+    valores_pontos = np.arange(prob_pontos.shape[1])
+    pontos_acumulados = np.cumsum(prob_pontos, axis=1)
+
+    df_resumo = pd.DataFrame({
+        'Time': todos_times,
+        'P Atual': pontos_base.astype(int),
+        'P Médio': prob_pontos @ valores_pontos,
+        'P Mín (5%)': (pontos_acumulados < 0.05).sum(axis=1),
+        'P Máx (95%)': (pontos_acumulados < 0.95).sum(axis=1),
+        'Posição Média': prob_posicoes @ np.arange(1, n_times + 1),
+        'Título': prob_posicoes[:, 0],
+        'Libertadores': prob_posicoes[:, :vagas_libertadores].sum(axis=1),
+        'Rebaixamento': prob_posicoes[:, n_times - vagas_rebaixamento:].sum(axis=1),
+    })
+    df_resumo = df_resumo.sort_values(by=['Posição Média', 'P Médio'], ascending=[True, False]).reset_index(drop=True)
+    df_resumo.insert(0, '#', np.arange(1, len(df_resumo) + 1))
+
+    df_posicoes = pd.DataFrame(prob_posicoes, index=todos_times, columns=np.arange(1, n_times + 1))
+    df_posicoes = df_posicoes.loc[df_resumo['Time']]
+
+    return df_resumo, df_posicoes
+
+
+@instrumentar('simulacao.monte_carlo', linhas=lambda resultado: len(resultado[0]))
+def simular_campeonato_monte_carlo(rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats,
+                                   colunas_modelo, n_simulacoes=100_000, n_processos=1, semente=None,
+                                   vagas_libertadores=6, vagas_rebaixamento=4, matriz=None, modelo_gols=None):
+    """
+    Simula o campeonato milhares de vezes (Monte Carlo) até uma rodada específica, sorteando o resultado
+    de cada jogo a partir das probabilidades do modelo (e o placar, com o modelo de gols).
+    Retorna um resumo por time (pontos, chances de título, Libertadores e rebaixamento) e a
+    distribuição de probabilidade da posição final de cada time.
+    """
+    todos_times, jogos_a_simular, probabilidades = _jogos_restantes(
+        rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo, matriz)
+    indice_time = {time: i for i, time in enumerate(todos_times)}
+
+    # Tabela atual e pontos dos confrontos diretos já realizados
+    tabela_atual = TabelaRodadas.de_jogos(df_resultados_atuais, todos_times)
+    estatisticas = tabela_atual.estatisticas()
+    vitorias_base = estatisticas[:, V]
+    pontos_base = 3 * vitorias_base + estatisticas[:, E]
+    gols_pro_base = estatisticas[:, GP]
+    saldo_base = gols_pro_base - estatisticas[:, GC]
+    confrontos_base = tabela_atual.confrontos()
+
+    probs_acumuladas = np.cumsum(probabilidades, axis=1).astype(np.float32)
+    idx_casa = jogos_a_simular['HomeTeam'].map(indice_time).to_numpy(dtype=np.int64)
+    idx_visitante = jogos_a_simular['AwayTeam'].map(indice_time).to_numpy(dtype=np.int64)
+
+    # Divide as simulações entre os processos, cada um com sua própria semente independente
+    n_processos = max(1, min(n_processos, n_simulacoes))
+    sementes = np.random.SeedSequence(semente).spawn(n_processos)
+    lotes = [n_simulacoes // n_processos + (1 if i < n_simulacoes % n_processos else 0) for i in range(n_processos)]
+    placares = _placares_restantes(jogos_a_simular, modelo_gols)
+    argumentos = [(probs_acumuladas, idx_casa, idx_visitante, pontos_base, vitorias_base, saldo_base, gols_pro_base,
+                   confrontos_base, lote, sem, placares)
+                  for lote, sem in zip(lotes, sementes)]
+    with medir('simulacao.monte_carlo.sorteio', linhas=n_simulacoes, jogos=len(jogos_a_simular), processos=n_processos):
+        if n_processos == 1:
+            resultados = [_simular_lote(*argumentos[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=n_processos) as executor:
+                resultados = list(executor.map(_simular_lote, *zip(*argumentos)))
+
+    contagem_posicoes = sum(r[0] for r in resultados)
+    histograma_pontos = sum(r[1] for r in resultados)
+
+    return resumir_simulacoes(todos_times, pontos_base, contagem_posicoes, histograma_pontos, n_simulacoes,
+                              vagas_libertadores, vagas_rebaixamento)
+
+
+# Códigos de resultado usados pela tabela (classificacao.py)
+CODIGOS_RESULTADO = {'Casa': 1, 'Empate': 0, 'Visitante': -1}
+
+
+class CenarioSimulacao:
+    """
+    Cenários "e se" sobre uma simulação Monte Carlo. As temporadas são sorteadas uma única vez; fixar o
+    resultado (ou o placar) de um jogo só troca a coluna desse jogo nas temporadas já sorteadas, sem prever
+    nem sortear de novo os demais jogos. Como os jogos são independentes, isso equivale a simular de novo
+    condicionado ao resultado fixado.
+    """
+
+    def __init__(self, todos_times, df_resultados_atuais, jogos_a_simular, probabilidades, rodada_final,
+                 n_simulacoes=50_000, semente=None, vagas_libertadores=6, vagas_rebaixamento=4, tamanho_bloco=10_000,
+                 placares=None):
+        self.times = list(todos_times)
+        self.df_resultados_atuais = df_resultados_atuais
+        self.jogos_a_simular = jogos_a_simular
+        self.probabilidades = np.asarray(probabilidades, dtype=float)
+        self.rodada_final = rodada_final
+        self.n_simulacoes = n_simulacoes
+        self.vagas_libertadores = vagas_libertadores
+        self.vagas_rebaixamento = vagas_rebaixamento
+        self.placares = placares
+
+        indice_time = {time: i for i, time in enumerate(self.times)}
+        self.idx_casa = jogos_a_simular['HomeTeam'].map(indice_time).to_numpy(dtype=np.int64)
+        self.idx_visitante = jogos_a_simular['AwayTeam'].map(indice_time).to_numpy(dtype=np.int64)
+        self.indice_jogos = {jogo: i for i, jogo in enumerate(zip(jogos_a_simular['HomeTeam'], jogos_a_simular['AwayTeam']))}
+        n_times, n_jogos = len(self.times), len(self.idx_casa)
+
+        tabela_atual = TabelaRodadas.de_jogos(df_resultados_atuais, self.times)
+        estatisticas = tabela_atual.estatisticas()
+        self.vitorias_base = estatisticas[:, V]
+        self.pontos_base = 3 * self.vitorias_base + estatisticas[:, E]
+        self.gols_pro_base = estatisticas[:, GP]
+        self.gols_contra_base = estatisticas[:, GC]
+        self.confrontos_base = tabela_atual.confrontos()
+        self.jogos_entre = jogos_entre_pares(self.idx_casa, self.idx_visitante, n_times)
+        self.pontos_maximos = int(self.pontos_base.max(initial=0)) + 3 * n_jogos + 1
+
+        # Resultado sorteado de cada jogo em cada temporada (1, 0 ou -1) e os pontos, vitórias e gols finais de cada
+        # time. Do placar não se guarda nada: os números uniformes de cada jogo vêm de um gerador próprio (semente
+        # em sementes_placar), e a coluna de um jogo é sorteada de novo quando ele é fixado (_uniformes_placar).
+        # Com ela, o placar para qualquer resultado fixado sai da distribuição condicional (PlacaresJogos.sortear)
+        with medir('simulacao.cenario.sorteio', linhas=n_simulacoes, jogos=n_jogos):
+            rng = np.random.default_rng(semente)
+            self.sementes_placar = np.random.SeedSequence(int(rng.integers(2 ** 63))).spawn(n_jogos)
+            geradores_placar = [np.random.default_rng(semente_jogo) for semente_jogo in self.sementes_placar]
+            probs_acumuladas = np.cumsum(self.probabilidades, axis=1).astype(np.float32)
+            self.amostras = np.empty((n_simulacoes, n_jogos), dtype=np.int8)
+            self.pontos_sorteados = np.empty((n_simulacoes, n_times), dtype=np.int32)
+            self.vitorias_sorteadas = np.empty((n_simulacoes, n_times), dtype=np.int32)
+            self.gols_pro_sorteados = np.tile(self.gols_pro_base.astype(np.int32), (n_simulacoes, 1))
+            self.gols_contra_sorteados = np.tile(self.gols_contra_base.astype(np.int32), (n_simulacoes, 1))
+            incidencia_casa = np.zeros((n_jogos, n_times), dtype=np.float32)
+            incidencia_casa[np.arange(n_jogos), self.idx_casa] = 1
+            incidencia_visitante = np.zeros((n_jogos, n_times), dtype=np.float32)
+            incidencia_visitante[np.arange(n_jogos), self.idx_visitante] = 1
+            for inicio in range(0, n_simulacoes, tamanho_bloco):
+                fim = min(inicio + tamanho_bloco, n_simulacoes)
+                sorteio = rng.random((fim - inicio, n_jogos), dtype=np.float32)
+                amostras = 1 - (sorteio > probs_acumuladas[:, 0]).astype(np.int8) - (sorteio > probs_acumuladas[:, 1])
+                self.amostras[inicio:fim] = amostras
+                self.pontos_sorteados[inicio:fim] = self.pontos_base + np.rint(
+                    PONTOS_RESULTADO[amostras + 1].astype(np.float32) @ incidencia_casa +
+                    PONTOS_RESULTADO[1 - amostras].astype(np.float32) @ incidencia_visitante)
+                self.vitorias_sorteadas[inicio:fim] = self.vitorias_base + np.rint(
+                    (amostras == 1).astype(np.float32) @ incidencia_casa +
+                    (amostras == -1).astype(np.float32) @ incidencia_visitante)
+                if placares is not None:
+                    uniformes = np.empty((fim - inicio, n_jogos), dtype=np.float32)
+                    for jogo, gerador in enumerate(geradores_placar):
+                        uniformes[:, jogo] = gerador.random(fim - inicio, dtype=np.float32)
+                    celulas = placares.sortear_celulas(amostras, uniformes)
+                    gols_casa, gols_visitante = placares.gols_casa_celula[celulas], placares.gols_visitante_celula[celulas]
+                    self.gols_pro_sorteados[inicio:fim] += np.rint(
+                        gols_casa @ incidencia_casa + gols_visitante @ incidencia_visitante).astype(np.int32)
+                    self.gols_contra_sorteados[inicio:fim] += np.rint(
+                        gols_visitante @ incidencia_casa + gols_casa @ incidencia_visitante).astype(np.int32)
+            # Chave do sorteio (último critério de desempate), mantida entre os cenários
+            self.sorteio = rng.random((n_simulacoes, n_times), dtype=np.float32)
+
+        self.fixados = {}
+        self._base = None
+        self._resultados = None
+
+    @classmethod
+    def preparar(cls, rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo,
+                 n_simulacoes=50_000, semente=None, matriz=None, modelo_gols=None, **kwargs):
+        """
+        Prevê os jogos restantes até a rodada informada e sorteia as temporadas do cenário base.
+        """
+        todos_times, jogos_a_simular, probabilidades = _jogos_restantes(
+            rodada_final, df_jogos_futuros, df_resultados_atuais, modelo, encoder, time_stats, colunas_modelo, matriz)
+        return cls(todos_times, df_resultados_atuais, jogos_a_simular, probabilidades, rodada_final,
+                   n_simulacoes=n_simulacoes, semente=semente, placares=_placares_restantes(jogos_a_simular, modelo_gols),
+                   **kwargs)
+
+    def copia(self):
+        """
+        Cenário sobre as mesmas temporadas sorteadas, sem jogos fixados. Os arrays do sorteio (e o cenário base já
+        classificado) são compartilhados, não copiados: várias sessões podem fixar jogos sobre uma única simulação.
+        """
+        self._cenario_base()
+        copia = copy.copy(self)
+        copia.fixados = {}
+        copia._resultados = None
+        return copia
+
+    def fixar(self, time_casa, time_visitante, resultado=None, gols_casa=None, gols_visitante=None):
+        """
+        Fixa o resultado ('Casa', 'Empate' ou 'Visitante') ou o placar de um jogo restante.
+        Retorna False se o jogo não estiver entre os simulados ou se o resultado for inválido.
+        """
+        jogo = self.indice_jogos.get((time_casa, time_visitante))
+        if jogo is None:
+            print(f"AVISO: {time_casa} x {time_visitante} não está entre os jogos simulados.")
+            return False
+        if gols_casa is not None and gols_visitante is not None:
+            fixado = (int(np.sign(gols_casa - gols_visitante)), int(gols_casa), int(gols_visitante))
+        elif resultado in CODIGOS_RESULTADO:
+            fixado = (CODIGOS_RESULTADO[resultado], None, None)
         else:
-            tabela[casa]['P'] += 1; tabela[casa]['E'] += 1; tabela[visitante]['P'] += 1; tabela[visitante]['E'] += 1
+            print(f"AVISO: resultado inválido para {time_casa} x {time_visitante}: {resultado}")
+            return False
+        if self.fixados.get(jogo) != fixado:
+            self.fixados[jogo] = fixado
+            self._resultados = None
+        return True
+
+    def definir_fixados(self, jogos):
+        """
+        Substitui os jogos fixados pela lista de (time_casa, time_visitante, resultado, gols_casa, gols_visitante).
+        Se nada mudar, o último resultado calculado é mantido.
+        """
+        anteriores, resultados = self.fixados, self._resultados
+        self.fixados = {}
+        for time_casa, time_visitante, resultado, gols_casa, gols_visitante in jogos:
+            self.fixar(time_casa, time_visitante, resultado, gols_casa, gols_visitante)
+        self._resultados = resultados if self.fixados == anteriores else None
+
+    def liberar(self, time_casa, time_visitante):
+        """
+        Volta a sortear o resultado de um jogo fixado.
+        """
+        jogo = self.indice_jogos.get((time_casa, time_visitante))
+        if jogo in self.fixados:
+            del self.fixados[jogo]
+            self._resultados = None
+
+    def limpar(self):
+        if self.fixados:
+            self.fixados = {}
+            self._resultados = None
+
+    def _resultado_jogos(self, linhas, jogos):
+        # Resultado de cada jogo na temporada correspondente, já com os jogos fixados
+        codigos_fixados = np.full(len(self.idx_casa), 2, dtype=np.int8)
+        for jogo, (codigo, _, _) in self.fixados.items():
+            codigos_fixados[jogo] = codigo
+        fixado = codigos_fixados[jogos]
+        return np.where(fixado != 2, fixado, self.amostras[linhas, jogos])
+
+    def _uniformes_placar(self, linhas, jogo):
+        # Números uniformes do placar do jogo nas temporadas `linhas`, os mesmos sorteados no cenário base
+        return np.random.default_rng(self.sementes_placar[jogo]).random(self.n_simulacoes, dtype=np.float32)[linhas]
 
-    df_tabela = pd.DataFrame.from_dict(tabela, orient='index')
-    df_tabela['SG'] = df_tabela['GP'] - df_tabela['GC']
-    df_tabela = df_tabela.sort_values(by=['P', 'V', 'SG'], ascending=False)
+    def _gols_jogo(self, jogo, resultado, uniformes):
+        # Placar do jogo para o resultado informado, com os números uniformes do cenário base
+        if self.placares is None:
+            sem_gols = np.zeros(len(resultado), dtype=np.int64)
+            return sem_gols, sem_gols
+        return self.placares.sortear(resultado, uniformes, jogo)
 
-    # Transforma o índice (que tem os nomes dos times) em uma coluna regular
-    df_tabela = df_tabela.reset_index()
-    df_tabela = df_tabela.rename(columns={'index': 'Time'})
+    def _ordenar(self, linhas, pontos, vitorias, gols_pro, gols_contra):
+        # Classificação das temporadas `linhas` (índices em self.amostras)
+        def confronto_par(sublinhas, time_a, time_b):
+            return confronto_direto_sorteado(self.confrontos_base, self.jogos_entre, self.idx_casa, self._resultado_jogos,
+                                             linhas[sublinhas], time_a, time_b)
 
-    # Insere a coluna de posição '#' na primeira posição 
-    df_tabela.insert(0, '#', np.arange(1, len(df_tabela) + 1))
+        return ordenar_classificacao(pontos, vitorias, gols_pro - gols_contra, gols_pro, confronto_par,
+                                     self.sorteio[linhas]).astype(np.int16)
 
-    return df_tabela
\ No newline at end of file
+    def _cenario_base(self):
+        if self._base is None:
+            linhas = np.arange(self.n_simulacoes)
+            ordem = self._ordenar(linhas, self.pontos_sorteados, self.vitorias_sorteadas, self.gols_pro_sorteados,
+                                  self.gols_contra_sorteados)
+            self._base = (ordem, contar_posicoes(ordem), contar_pontos(self.pontos_sorteados, self.pontos_maximos))
+        return self._base
+
+    @instrumentar('simulacao.cenario')
+    def resultados(self):
+        """
+        Resumo por time e distribuição das posições finais no cenário atual (mesmo formato de
+        simular_campeonato_monte_carlo). Só as temporadas em que o resultado sorteado difere do fixado são
+        reclassificadas; as contagens das demais vêm do cenário base.
+        """
+        if self._resultados is not None:
+            return self._resultados
+        ordem_base, contagem_posicoes, histograma_pontos = self._cenario_base()
+        if self.fixados:
+            jogos = np.fromiter(self.fixados, dtype=np.int64)
+            codigos = np.array([codigo for codigo, _, _ in self.fixados.values()], dtype=np.int8)
+            if any(gols_casa is not None for _, gols_casa, _ in self.fixados.values()):
+                # Um placar fixado muda o saldo e os gols pró em todas as temporadas
+                linhas = np.arange(self.n_simulacoes)
+            else:
+                linhas = np.flatnonzero((self.amostras[:, jogos] != codigos).any(axis=1))
+
+            pontos = self.pontos_sorteados[linhas]
+            vitorias = self.vitorias_sorteadas[linhas]
+            gols_pro = self.gols_pro_sorteados[linhas]
+            gols_contra = self.gols_contra_sorteados[linhas]
+            for jogo, (codigo, gols_casa, gols_visitante) in self.fixados.items():
+                casa, visitante = self.idx_casa[jogo], self.idx_visitante[jogo]
+                sorteado = self.amostras[linhas, jogo].astype(np.int64)
+                pontos[:, casa] += PONTOS_RESULTADO[codigo + 1] - PONTOS_RESULTADO[sorteado + 1]
+                pontos[:, visitante] += PONTOS_RESULTADO[1 - codigo] - PONTOS_RESULTADO[1 - sorteado]
+                vitorias[:, casa] += int(codigo == 1) - (sorteado == 1)
+                vitorias[:, visitante] += int(codigo == -1) - (sorteado == -1)
+                # Troca o placar sorteado pelo fixado (ou pelo placar sorteado para o resultado fixado)
+                uniformes = None if self.placares is None else self._uniformes_placar(linhas, jogo)
+                gols_casa_sorteados, gols_visitante_sorteados = self._gols_jogo(jogo, sorteado, uniformes)
+                if gols_casa is None:
+                    gols_casa, gols_visitante = self._gols_jogo(jogo, np.full(len(linhas), codigo), uniformes)
+                gols_pro[:, casa] += gols_casa - gols_casa_sorteados
+                gols_contra[:, casa] += gols_visitante - gols_visitante_sorteados
+                gols_pro[:, visitante] += gols_visitante - gols_visitante_sorteados
+                gols_contra[:, visitante] += gols_casa - gols_casa_sorteados
+
+            ordem = self._ordenar(linhas, pontos, vitorias, gols_pro, gols_contra)
+            if 2 * len(linhas) < self.n_simulacoes:
+                contagem_posicoes = contagem_posicoes - contar_posicoes(ordem_base[linhas]) + contar_posicoes(ordem)
+                histograma_pontos = histograma_pontos - contar_pontos(self.pontos_sorteados[linhas], self.pontos_maximos) + \
+                    contar_pontos(pontos, self.pontos_maximos)
+            else:
+                # Com a maioria das temporadas alterada, contar tudo de novo sai mais barato
+                ordem_completa = ordem_base.copy()
+                ordem_completa[linhas] = ordem
+                pontos_completos = self.pontos_sorteados.copy()
+                pontos_completos[linhas] = pontos
+                contagem_posicoes = contar_posicoes(ordem_completa)
+                histograma_pontos = contar_pontos(pontos_completos, self.pontos_maximos)
+
+        self._resultados = resumir_simulacoes(self.times, self.pontos_base, contagem_posicoes, histograma_pontos,
+                                              self.n_simulacoes, self.vagas_libertadores, self.vagas_rebaixamento)
+        return self._resultados
+
+    def tabela_provavel(self):
+        """
+        Tabela com o resultado mais provável de cada jogo restante e os resultados fixados no cenário.
+        """
+        resultado = 1 - np.argmax(self.probabilidades, axis=1)
+        for jogo, (codigo, _, _) in self.fixados.items():
+            resultado[jogo] = codigo
+        if self.placares is None:
+            gols_casa, gols_visitante = np.zeros(len(resultado)), np.zeros(len(resultado))
+        else:
+            gols_casa, gols_visitante = self.placares.mais_provaveis(resultado)
+        for jogo, (_, gols_casa_fixados, gols_visitante_fixados) in self.fixados.items():
+            if gols_casa_fixados is not None:
+                gols_casa[jogo], gols_visitante[jogo] = gols_casa_fixados, gols_visitante_fixados
+        return _tabela_com_jogos(self.times, self.df_resultados_atuais, self.jogos_a_simular, resultado, gols_casa,
+                                 gols_visitante, self.rodada_final).tabela()
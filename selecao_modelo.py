@@ -0,0 +1,184 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+from backtest import CLASSES, avaliar_previsoes
+from feature_engineering import preparar_dados_para_modelo
+from instrumentacao import instrumentar, medir
+from matriz_design import EsquemaDesign
+from model_trainer import ARQUIVO_CONFIGURACAO, FEATURES_NUMERICAS, ajustar_classificador
+
+# Grade avaliada por padrão: janelas das features de forma, subconjuntos de features numéricas (os times
+# entram sempre) e, por classificador, os valores do parâmetro de regularização
+JANELAS = [3, 5, 8]
+SUBCONJUNTOS_FEATURES = {
+    'todas': FEATURES_NUMERICAS,
+    'forca': ['ForcaGeral_Home', 'ForcaGeral_Away'],
+    'forca_forma': ['ForcaGeral_Home', 'ForcaGeral_Away', 'FormaPontos_Home', 'FormaPontos_Away'],
+    'forma_gols': [coluna for coluna in FEATURES_NUMERICAS if not coluna.startswith('ForcaGeral')],
+}
+GRADE_CLASSIFICADORES = {
+    'logistica': [{'C': C} for C in (0.01, 0.03, 0.1, 0.3, 1.0, 3.0)],
+    'floresta': [{'min_samples_leaf': folhas} for folhas in (10, 30, 100)],
+}
+N_DIVISOES = 5
+
+# Matrizes de design e resultados compartilhados com os processos da avaliação (preenchidos uma vez por processo)
+_MATRIZES = {}
+_RESULTADOS = None
+
+
+def montar_matrizes(df_resultados, janelas=JANELAS, subconjuntos=SUBCONJUNTOS_FEATURES):
+    """
+    Calcula as features uma vez por janela e monta a matriz de design (CSR) com todas as features; cada
+    subconjunto é um recorte de colunas dessa matriz. Retorna as matrizes por (janela, subconjunto), sem
+    repetir recortes idênticos aos de uma janela anterior, e os resultados dos jogos, na mesma ordem
+    cronológica para todas as janelas.
+    """
+    times = pd.concat([df_resultados['HomeTeam'], df_resultados['AwayTeam']])
+    matrizes, resultados = {}, None
+    for janela in janelas:
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_treino, _ = preparar_dados_para_modelo(df_resultados.copy(), janela)
+        esquema = EsquemaDesign.ajustar(times, FEATURES_NUMERICAS)
+        X = esquema.montar_jogos(df_treino)
+        if resultados is None:
+            resultados = df_treino['Resultado'].to_numpy()
+        for nome, features in subconjuntos.items():
+            colunas = np.r_[np.arange(2 * esquema.n_times),
+                            2 * esquema.n_times + np.array([FEATURES_NUMERICAS.index(f) for f in features], dtype=int)]
+            recorte = X[:, colunas]
+            # Subconjuntos que não dependem da janela (ex.: só ForcaGeral) são avaliados uma única vez
+            if not any(chave[1] == nome and (matriz != recorte).nnz == 0 for chave, matriz in matrizes.items()):
+                matrizes[(janela, nome)] = recorte
+    return matrizes, resultados
+
+
+def _iniciar_processo(matrizes, resultados):
+    global _MATRIZES, _RESULTADOS
+    _MATRIZES, _RESULTADOS = matrizes, resultados
+
+
+def _avaliar_candidato(chave, configuracao, n_divisoes):
+    """
+    Validação cruzada em ordem cronológica: cada divisão treina com os jogos anteriores a um bloco e
+    prevê o bloco. Retorna as métricas de todas as previsões juntas.
+    Executada nos processos da avaliação, com as matrizes de _iniciar_processo().
+    """
+    X, y = _MATRIZES[chave], _RESULTADOS
+    probabilidades, observados = [], []
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for treino, teste in TimeSeriesSplit(n_splits=n_divisoes).split(y):
+            if len(np.unique(y[treino])) < len(CLASSES):
+                continue
+            modelo = ajustar_classificador(X[treino], y[treino], configuracao)
+            P = modelo.predict_proba(X[teste])
+            probabilidades.append(P[:, [list(modelo.classes_).index(classe) for classe in CLASSES]])
+            observados.append(y[teste])
+    if not probabilidades:
+        return avaliar_previsoes(np.zeros((0, len(CLASSES))), [])
+    return avaliar_previsoes(np.vstack(probabilidades), np.concatenate(observados))
+
+
+def _avaliar(candidatos, matrizes, resultados, n_divisoes, n_processos):
+    argumentos = [((configuracao['janela'], subconjunto), configuracao, n_divisoes) for subconjunto, configuracao in candidatos]
+    if n_processos == 1:
+        _iniciar_processo(matrizes, resultados)
+        return [_avaliar_candidato(*argumento) for argumento in argumentos]
+    with ProcessPoolExecutor(max_workers=n_processos, initializer=_iniciar_processo,
+                             initargs=(matrizes, resultados)) as executor:
+        return list(executor.map(_avaliar_candidato, *zip(*argumentos)))
+
+
+@instrumentar('selecao.executar', linhas=lambda resultado: len(resultado[0]))
+def selecionar_modelo(df_resultados, janelas=JANELAS, subconjuntos=SUBCONJUNTOS_FEATURES,
+                      grade_classificadores=GRADE_CLASSIFICADORES, n_divisoes=N_DIVISOES, n_processos=1, calibrar=True):
+    """
+    Avalia todas as combinações de janela, subconjunto de features, classificador e parâmetros por
+    validação cruzada em ordem cronológica (em paralelo com n_processos > 1), sobre matrizes de design
+    montadas uma única vez por janela. Com calibrar=True, avalia também o vencedor calibrado por
+    temperatura e fica com a calibração se ela reduzir a log-loss.
+    Retorna o ranking dos candidatos (menor log-loss primeiro) e a configuração vencedora.
+    """
+    with medir('selecao.matrizes', linhas=len(janelas)):
+        matrizes, resultados = montar_matrizes(df_resultados, janelas, subconjuntos)
+
+    candidatos = [(subconjunto, {'janela': janela, 'features': list(subconjuntos[subconjunto]),
+                                 'classificador': classificador, 'parametros': parametros, 'calibracao': None})
+                  for janela, subconjunto in matrizes
+                  for classificador, grade in grade_classificadores.items() for parametros in grade]
+    n_processos = max(1, min(n_processos, len(candidatos)))
+    with medir('selecao.candidatos', linhas=len(candidatos), processos=n_processos):
+        metricas = _avaliar(candidatos, matrizes, resultados, n_divisoes, n_processos)
+
+    linhas = [{'Janela': configuracao['janela'], 'Features': subconjunto, 'Classificador': configuracao['classificador'],
+               'Parâmetros': json.dumps(configuracao['parametros']), 'Calibração': '-', **metrica}
+              for (subconjunto, configuracao), metrica in zip(candidatos, metricas)]
+    ordem = np.argsort([linha['Log-loss'] for linha in linhas], kind='stable')
+    subconjunto, vencedora = candidatos[ordem[0]]
+    melhor = metricas[ordem[0]]
+
+    if calibrar:
+        calibrada = {**vencedora, 'calibracao': 'temperatura'}
+        with medir('selecao.calibracao', linhas=1):
+            metrica = _avaliar([(subconjunto, calibrada)], matrizes, resultados, n_divisoes, 1)[0]
+        linhas.append({**linhas[ordem[0]], 'Calibração': 'temperatura', **metrica})
+        if metrica['Log-loss'] < melhor['Log-loss']:
+            vencedora, melhor = calibrada, metrica
+
+    df_ranking = pd.DataFrame(linhas).sort_values(by='Log-loss', kind='stable').reset_index(drop=True)
+    return df_ranking, {**vencedora, 'avaliacao': {**melhor, 'divisoes': n_divisoes}}
+
+
+def exportar_configuracao(configuracao, caminho=ARQUIVO_CONFIGURACAO):
+    """
+    Grava (de forma atômica) a configuração como a do modelo de produção. Os próximos treinos a usam, e
+    os artefatos treinados com a configuração anterior deixam de valer.
+    """
+    configuracao = {**configuracao, 'exportado_em': time.strftime('%Y-%m-%d %H:%M:%S')}
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(configuracao, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+if __name__ == "__main__":
+    # Uso: python selecao_modelo.py 2023 2024 [--processos 4] [--exportar]
+    from banco_dados import conectar, obter_temporadas
+
+    parser = argparse.ArgumentParser(description="Seleção do modelo de previsão nas temporadas do banco local.")
+    parser.add_argument('anos', nargs='+', help="Temporadas usadas na validação, em ordem cronológica.")
+    parser.add_argument('--processos', type=int, default=1, help="Candidatos avaliados em paralelo.")
+    parser.add_argument('--janelas', type=int, nargs='+', default=JANELAS, help="Janelas das features de forma.")
+    parser.add_argument('--divisoes', type=int, default=N_DIVISOES, help="Divisões da validação cruzada cronológica.")
+    parser.add_argument('--sem-calibracao', action='store_true', help="Não avalia a calibração do vencedor.")
+    parser.add_argument('--exportar', nargs='?', const=ARQUIVO_CONFIGURACAO,
+                        help=f"Grava a configuração vencedora como a de produção (padrão: {ARQUIVO_CONFIGURACAO}).")
+    args = parser.parse_args()
+
+    with conectar() as conexao:
+        temporadas = obter_temporadas(conexao, args.anos)
+    faltantes = [ano for ano, df in temporadas.items() if df is None]
+    if faltantes:
+        print(f"Não foi possível obter as temporadas: {', '.join(faltantes)}.")
+    historico = pd.concat([df for df in temporadas.values() if df is not None], ignore_index=True)
+    historico = historico[historico['FTHG'].notna() & historico['FTAG'].notna()]
+
+    df_ranking, vencedora = selecionar_modelo(historico, janelas=args.janelas, n_divisoes=args.divisoes,
+                                              n_processos=args.processos, calibrar=not args.sem_calibracao)
+    print(df_ranking.head(20).to_string(index=False, float_format=lambda valor: f"{valor:.4f}"))
+    print()
+    print("Configuração vencedora:", json.dumps(vencedora, ensure_ascii=False))
+    if args.exportar:
+        print(f"Configuração gravada em {exportar_configuracao(vencedora, args.exportar)}.")
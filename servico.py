@@ -0,0 +1,487 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from analysis import IndiceConfrontos, carregar_historico, gerar_confronto_direto
+from atualizador import AtualizadorDados
+from instrumentacao import medir
+from predictor import CODIGOS_RESULTADO, CenarioSimulacao, prever_jogos, simular_campeonato
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+# Tempo que uma previsão espera por outras para formar um lote, e o tamanho máximo do lote
+ESPERA_LOTE = 0.005
+TAMANHO_MAXIMO_LOTE = 4096
+# Intervalo entre as verificações de dados novos (a busca no FBref respeita o intervalo do atualizador)
+INTERVALO_VERIFICACAO = 60
+TAMANHO_MAXIMO_CORPO = 16 * 2 ** 20
+TEMPO_OCIOSO_CONEXAO = 30
+
+MOTIVOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ErroRequisicao(Exception):
+    """
+    Erro do cliente (pedido inválido), devolvido com o status HTTP informado.
+    """
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _para_json(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    return str(valor)
+
+
+def prever_lote(jogos, dados):
+    """
+    Probabilidades (N x 3, colunas na ordem de modelo.classes_) de uma lista de pares (mandante, visitante).
+    Os confrontos cobertos pela matriz pré-calculada são consultados nela; os demais são previstos juntos,
+    com uma única chamada a predict_proba.
+    """
+    artefato = dados.artefato
+    probabilidades = np.zeros((len(jogos), len(artefato['modelo'].classes_)))
+    matriz = artefato.get('matriz_probabilidades')
+    cobertos = np.array([matriz is not None and matriz.contem(casa, visitante) for casa, visitante in jogos], dtype=bool)
+    if cobertos.any():
+        probabilidades[cobertos] = matriz.probabilidades_jogos([jogo for jogo, coberto in zip(jogos, cobertos) if coberto])
+    if not cobertos.all():
+        restantes = [jogo for jogo, coberto in zip(jogos, cobertos) if not coberto]
+        probabilidades[~cobertos] = prever_jogos(restantes, artefato['modelo'], artefato['encoder'],
+                                                 artefato['time_stats'], artefato['colunas_modelo'])
+    return probabilidades
+
+
+def _validar_jogos(jogos, dados):
+    times_conhecidos = set(dados.lista_times) | set(dados.artefato['time_stats'])
+    for casa, visitante in jogos:
+        if casa == visitante:
+            raise ErroRequisicao(f"Jogo inválido: {casa} x {visitante}.")
+        for nome_time in (casa, visitante):
+            if nome_time not in times_conhecidos:
+                raise ErroRequisicao(f"Time desconhecido: {nome_time}.")
+
+
+def _ler_fixados(fixados):
+    """
+    Converte a lista "fixados" do pedido em (mandante, visitante, resultado, gols_casa, gols_visitante).
+    """
+    if not isinstance(fixados, list):
+        raise ErroRequisicao("'fixados' deve ser uma lista de objetos.")
+    jogos = []
+    for jogo in fixados:
+        if not isinstance(jogo, dict):
+            raise ErroRequisicao("Cada item de 'fixados' deve ser um objeto com 'mandante' e 'visitante'.")
+        casa, visitante, resultado, placar = jogo.get('mandante'), jogo.get('visitante'), jogo.get('resultado'), jogo.get('placar')
+        if placar is not None:
+            if not (isinstance(placar, list) and len(placar) == 2 and
+                    all(isinstance(gols, int) and not isinstance(gols, bool) and gols >= 0 for gols in placar)):
+                raise ErroRequisicao(f"Placar inválido para {casa} x {visitante}: use [gols_mandante, gols_visitante].")
+            jogos.append((casa, visitante, resultado, placar[0], placar[1]))
+        elif resultado in CODIGOS_RESULTADO:
+            jogos.append((casa, visitante, resultado, None, None))
+        else:
+            raise ErroRequisicao(f"Informe 'placar' ou 'resultado' ({', '.join(CODIGOS_RESULTADO)}) para {casa} x {visitante}.")
+    return jogos
+
+
+def _resposta_previsao(casa, visitante, probabilidades, classes, modelo_gols=None):
+    odds = {classe: float(prob) for classe, prob in zip(classes, probabilidades)}
+    resposta = {
+        'mandante': casa,
+        'visitante': visitante,
+        'probabilidades': odds,
+        'odds': {classe: (1 / prob if prob > 0 else None) for classe, prob in odds.items()},
+        'resultado_provavel': max(odds, key=odds.get),
+    }
+    if modelo_gols is not None:
+        resposta['gols_esperados'] = dict(zip(('mandante', 'visitante'), modelo_gols.gols_esperados(casa, visitante)))
+    return resposta
+
+
+def pontuar_jsonl(linhas, dados):
+    """
+    Pontuação em lote: cada linha JSON tem "mandante" e "visitante" (e, opcionalmente, "id"). Todas as linhas
+    válidas são previstas de uma só vez; as inválidas voltam com o campo "erro". Retorna uma lista de
+    dicionários, na ordem das linhas de entrada (linhas em branco são ignoradas).
+    """
+    pedidos, saida = [], []
+    for numero, linha in enumerate(linhas, 1):
+        if not linha.strip():
+            continue
+        try:
+            pedido = json.loads(linha)
+            jogo = (pedido['mandante'], pedido['visitante'])
+            _validar_jogos([jogo], dados)
+        except (ValueError, KeyError, TypeError, ErroRequisicao) as e:
+            saida.append({'linha': numero, 'erro': str(e) if not isinstance(e, KeyError) else f"Campo ausente: {e}"})
+            continue
+        pedidos.append((len(saida), pedido, jogo))
+        saida.append(None)
+
+    if pedidos:
+        probabilidades = prever_lote([jogo for _, _, jogo in pedidos], dados)
+        classes = dados.artefato['modelo'].classes_
+        for (posicao, pedido, jogo), probs in zip(pedidos, probabilidades):
+            resposta = _resposta_previsao(*jogo, probs, classes, dados.artefato.get('modelo_gols'))
+            if 'id' in pedido:
+                resposta = {'id': pedido['id'], **resposta}
+            saida[posicao] = resposta
+    return saida
+
+
+class LotePrevisoes:
+    """
+    Junta as previsões pedidas ao mesmo tempo por várias conexões em um único lote: o primeiro pedido
+    espera até `espera` segundos pelos seguintes (ou até o lote atingir `tamanho_maximo` jogos) e o lote
+    inteiro é previsto de uma vez, com os dados e o modelo vigentes naquele momento.
+    """
+
+    def __init__(self, obter_dados, espera=ESPERA_LOTE, tamanho_maximo=TAMANHO_MAXIMO_LOTE):
+        self.obter_dados = obter_dados
+        self.espera = espera
+        self.tamanho_maximo = tamanho_maximo
+        self.fila = asyncio.Queue()
+        self.lotes = 0
+        self.previsoes = 0
+
+    async def prever(self, jogos):
+        """
+        Enfileira os jogos e aguarda o lote em que forem previstos. Retorna (probabilidades, dados usados).
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((jogos, futuro))
+        return await futuro
+
+    async def executar(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self.fila.get()]
+            total = len(pedidos[0][0])
+            prazo = laco.time() + self.espera
+            while total < self.tamanho_maximo:
+                restante = prazo - laco.time()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = await asyncio.wait_for(self.fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                pedidos.append(pedido)
+                total += len(pedido[0])
+            self._responder(pedidos)
+
+    def _responder(self, pedidos):
+        jogos = [jogo for jogos_pedido, _ in pedidos for jogo in jogos_pedido]
+        try:
+            # Falhas ao obter os dados (ex.: 503 sem artefato) vão para os pedidos do lote, sem parar o laço
+            dados = self.obter_dados()
+            with medir('servico.lote_previsoes', linhas=len(jogos), pedidos=len(pedidos)):
+                probabilidades = prever_lote(jogos, dados)
+        except Exception as e:
+            for _, futuro in pedidos:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.previsoes += len(jogos)
+        inicio = 0
+        for jogos_pedido, futuro in pedidos:
+            if not futuro.done():
+                futuro.set_result((probabilidades[inicio:inicio + len(jogos_pedido)], dados))
+            inicio += len(jogos_pedido)
+
+
+class ServicoPrevisao:
+    """
+    Serviço HTTP/JSON local (asyncio) com previsão de jogos, simulação da tabela e confronto direto.
+    Os dados e o modelo vêm do AtualizadorDados: cada pedido usa o conjunto vigente quando começou, e um
+    conjunto novo (rodada nova ou artefato novo) substitui o anterior sem derrubar o serviço.
+    """
+
+    def __init__(self, atualizador, espera_lote=ESPERA_LOTE, intervalo_verificacao=INTERVALO_VERIFICACAO):
+        self.atualizador = atualizador
+        self.lote = LotePrevisoes(self.dados_atuais, espera=espera_lote)
+        self.intervalo_verificacao = intervalo_verificacao
+        self.iniciado_em = time.time()
+        self._confrontos = (None, None)
+        self._cenarios = {}
+        self._trava_simulacao = threading.Lock()
+        self._tarefas = []
+
+    def dados_atuais(self):
+        dados = self.atualizador.dados
+        if dados is None or dados.artefato is None:
+            raise ErroRequisicao("Dados ou modelo ainda não disponíveis.", status=503)
+        return dados
+
+    # Rotas
+
+    async def saude(self, corpo):
+        dados = self.atualizador.dados
+        return {
+            'status': 'ok' if dados is not None and dados.artefato is not None else 'sem_modelo',
+            'temporada': self.atualizador.ano,
+            'versao_dados': dados.versao if dados is not None else None,
+            'modelo': dados.artefato.get('chave') if dados is not None and dados.artefato is not None else None,
+            'carregado_em': datetime.fromtimestamp(dados.carregado_em).isoformat() if dados is not None else None,
+            'atualizando': self.atualizador.em_andamento(),
+            'ultimo_erro': self.atualizador.ultimo_erro,
+            'lotes': self.lote.lotes,
+            'previsoes': self.lote.previsoes,
+            'ativo_desde': datetime.fromtimestamp(self.iniciado_em).isoformat(),
+        }
+
+    async def prever(self, corpo):
+        """
+        {"mandante": "...", "visitante": "..."} ou {"jogos": [["mandante", "visitante"], ...]}.
+        """
+        if 'jogos' in corpo:
+            jogos = [tuple(jogo) for jogo in corpo['jogos']]
+            if any(len(jogo) != 2 for jogo in jogos):
+                raise ErroRequisicao("Cada jogo deve ser um par [mandante, visitante].")
+        elif 'mandante' in corpo and 'visitante' in corpo:
+            jogos = [(corpo['mandante'], corpo['visitante'])]
+        else:
+            raise ErroRequisicao("Informe 'mandante' e 'visitante' ou a lista 'jogos'.")
+        _validar_jogos(jogos, self.dados_atuais())
+
+        probabilidades, dados = await self.lote.prever(jogos)
+        classes, modelo_gols = list(dados.artefato['modelo'].classes_), dados.artefato.get('modelo_gols')
+        previsoes = [_resposta_previsao(casa, visitante, probs, classes, modelo_gols)
+                     for (casa, visitante), probs in zip(jogos, probabilidades)]
+        if 'jogos' in corpo:
+            return {'versao_dados': dados.versao, 'previsoes': previsoes}
+        return {'versao_dados': dados.versao, **previsoes[0]}
+
+    async def simular(self, corpo):
+        """
+        {"rodada": 38, "simulacoes": 10000, "fixados": [{"mandante", "visitante", "resultado" ou "placar": [2, 1]}]}.
+        Com "simulacoes": 0, devolve a tabela com o resultado mais provável de cada jogo. Jogos fixados com
+        placar ou resultado inválido, time desconhecido ou fora da simulação são recusados (400).
+        """
+        dados = self.dados_atuais()
+        try:
+            rodada = int(corpo.get('rodada', 38))
+            n_simulacoes = int(corpo.get('simulacoes', 10_000))
+        except (TypeError, ValueError):
+            raise ErroRequisicao("'rodada' e 'simulacoes' devem ser inteiros.")
+        if not 0 <= n_simulacoes <= 200_000:
+            raise ErroRequisicao("'simulacoes' deve estar entre 0 e 200000.")
+        fixados = _ler_fixados(corpo.get('fixados', []))
+        if fixados and n_simulacoes == 0:
+            raise ErroRequisicao("'fixados' exige 'simulacoes' maior que 0.")
+        _validar_jogos([(casa, visitante) for casa, visitante, _, _, _ in fixados], dados)
+        return await asyncio.to_thread(self._simular, dados, rodada, n_simulacoes, fixados)
+
+    def _simular(self, dados, rodada, n_simulacoes, fixados):
+        artefato = dados.artefato
+        argumentos = (rodada, dados.df_futuro, dados.df_resultados, artefato['modelo'], artefato['encoder'],
+                      artefato['time_stats'], artefato['colunas_modelo'])
+        with self._trava_simulacao:
+            if n_simulacoes == 0:
+                tabela = simular_campeonato(*argumentos, artefato['matriz_probabilidades'], artefato.get('modelo_gols'))
+                return {'versao_dados': dados.versao, 'tabela': tabela.to_dict(orient='records')}
+
+            # As temporadas sorteadas ficam guardadas: pedidos seguintes com outros jogos fixados só refazem a tabela
+            chave = (dados.versao, rodada, n_simulacoes)
+            cenario = self._cenarios.get(chave)
+            if cenario is None:
+                cenario = CenarioSimulacao.preparar(*argumentos, n_simulacoes=n_simulacoes,
+                                                    matriz=artefato['matriz_probabilidades'],
+                                                    modelo_gols=artefato.get('modelo_gols'))
+                self._cenarios = {chave: cenario}
+            fora = [f"{casa} x {visitante}" for casa, visitante, _, _, _ in fixados
+                    if (casa, visitante) not in cenario.indice_jogos]
+            if fora:
+                raise ErroRequisicao(f"Jogos fora da simulação até a rodada {rodada}: {', '.join(fora)}.")
+            cenario.definir_fixados(fixados)
+            resumo, posicoes = cenario.resultados()
+            return {
+                'versao_dados': dados.versao,
+                'simulacoes': n_simulacoes,
+                'fixados': len(cenario.fixados),
+                'resumo': resumo.to_dict(orient='records'),
+                'posicoes': {time: linha.tolist() for time, linha in zip(posicoes.index, posicoes.to_numpy())},
+            }
+
+    async def confronto(self, corpo):
+        """
+        {"time1": "...", "time2": "..."}: resumo histórico do confronto direto.
+        """
+        time1, time2 = corpo.get('time1'), corpo.get('time2')
+        if not time1 or not time2 or time1 == time2:
+            raise ErroRequisicao("Informe dois times diferentes em 'time1' e 'time2'.")
+        dados = self.dados_atuais()
+        return await asyncio.to_thread(self._confronto, dados, time1, time2)
+
+    def _confronto(self, dados, time1, time2):
+        versao, indice = self._confrontos
+        if versao != dados.versao:
+            indice = IndiceConfrontos(carregar_historico(), dados.df_total)
+            self._confrontos = (dados.versao, indice)
+        resumo, historico = gerar_confronto_direto(dados.df_total, time1, time2, indice)
+        return {'time1': time1, 'time2': time2, **resumo,
+                'por_temporada': {str(temporada): valores for temporada, valores in resumo['por_temporada'].items()},
+                'jogos': json.loads(historico.to_json(orient='records', date_format='iso'))}
+
+    async def lote_jsonl(self, corpo_bruto):
+        dados = self.dados_atuais()
+        saida = await asyncio.to_thread(pontuar_jsonl, corpo_bruto.decode('utf-8').splitlines(), dados)
+        return '\n'.join(json.dumps(linha, ensure_ascii=False, default=_para_json) for linha in saida) + '\n'
+
+    async def recarregar(self, corpo):
+        iniciada = self.atualizador.atualizar_em_segundo_plano(forcar=True)
+        return {'atualizacao_iniciada': iniciada}
+
+    # HTTP
+
+    async def _verificar_dados(self):
+        while True:
+            await asyncio.sleep(self.intervalo_verificacao)
+            self.atualizador.atualizar_em_segundo_plano()
+
+    async def _ler_requisicao(self, leitor):
+        linha = await asyncio.wait_for(leitor.readline(), TEMPO_OCIOSO_CONEXAO)
+        if not linha:
+            return None
+        try:
+            metodo, caminho, versao_http = linha.decode('latin-1').split()
+        except ValueError:
+            raise ErroRequisicao("Linha de requisição inválida.")
+        cabecalhos = {}
+        while True:
+            linha = await leitor.readline()
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        tamanho = int(cabecalhos.get('content-length', 0) or 0)
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ErroRequisicao("Corpo da requisição muito grande.", status=413)
+        corpo = await leitor.readexactly(tamanho) if tamanho else b''
+        manter = cabecalhos.get('connection', '').lower() != 'close' and versao_http == 'HTTP/1.1'
+        return metodo.upper(), caminho.split('?', 1)[0].rstrip('/') or '/', corpo, manter
+
+    async def _rotear(self, metodo, caminho, corpo_bruto):
+        rotas_get = {'/saude': self.saude}
+        rotas_post = {'/prever': self.prever, '/simular': self.simular, '/confronto': self.confronto,
+                      '/recarregar': self.recarregar}
+        if caminho == '/lote':
+            if metodo != 'POST':
+                raise ErroRequisicao("Use POST.", status=405)
+            return 'application/x-ndjson', await self.lote_jsonl(corpo_bruto)
+        if caminho in rotas_get and metodo == 'GET':
+            return 'application/json', await rotas_get[caminho]({})
+        if caminho in rotas_post:
+            if metodo != 'POST':
+                raise ErroRequisicao("Use POST.", status=405)
+            try:
+                corpo = json.loads(corpo_bruto or b'{}')
+            except ValueError:
+                raise ErroRequisicao("Corpo JSON inválido.")
+            if not isinstance(corpo, dict):
+                raise ErroRequisicao("O corpo deve ser um objeto JSON.")
+            return 'application/json', await rotas_post[caminho](corpo)
+        raise ErroRequisicao(f"Rota não encontrada: {caminho}", status=404)
+
+    async def _atender(self, leitor, escritor):
+        try:
+            while True:
+                manter = False
+                try:
+                    requisicao = await self._ler_requisicao(leitor)
+                    if requisicao is None:
+                        break
+                    metodo, caminho, corpo, manter = requisicao
+                    with medir('servico.requisicao', rota=caminho):
+                        tipo, resposta = await self._rotear(metodo, caminho, corpo)
+                    status = 200
+                except ErroRequisicao as e:
+                    status, tipo, resposta = e.status, 'application/json', {'erro': str(e)}
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    print(f"ERRO ao atender a requisição: {e}")
+                    status, tipo, resposta = 500, 'application/json', {'erro': str(e)}
+
+                if not isinstance(resposta, str):
+                    resposta = json.dumps(resposta, ensure_ascii=False, default=_para_json)
+                conteudo = resposta.encode('utf-8')
+                escritor.write((f"HTTP/1.1 {status} {MOTIVOS_HTTP.get(status, '')}\r\n"
+                                f"Content-Type: {tipo}; charset=utf-8\r\n"
+                                f"Content-Length: {len(conteudo)}\r\n"
+                                f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n").encode('latin-1') + conteudo)
+                await escritor.drain()
+                if not manter:
+                    break
+        finally:
+            escritor.close()
+
+    async def executar(self, host=HOST_PADRAO, porta=PORTA_PADRAO):
+        servidor = await asyncio.start_server(self._atender, host, porta)
+        self._tarefas = [asyncio.create_task(self.lote.executar()), asyncio.create_task(self._verificar_dados())]
+        enderecos = ', '.join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in servidor.sockets)
+        print(f"Serviço de previsão ouvindo em {enderecos}")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def preparar_atualizador(ano):
+    """
+    Carrega a temporada do banco local (ou, se ainda não estiver lá, do FBref) e o modelo correspondente.
+    Retorna None se não houver dados ou modelo.
+    """
+    atualizador = AtualizadorDados(ano)
+    if not atualizador.carregar_do_disco():
+        atualizador.atualizar()
+    if atualizador.dados is None or atualizador.dados.artefato is None:
+        print(f"Não foi possível carregar os dados e o modelo da temporada {ano}.")
+        return None
+    return atualizador
+
+
+if __name__ == "__main__":
+    # Uso: python servico.py [--porta 8765]  |  python servico.py --lote jogos.jsonl [--saida previsoes.jsonl]
+    parser = argparse.ArgumentParser(description="Serviço local de previsão do Brasileirão (HTTP/JSON).")
+    parser.add_argument('--host', default=HOST_PADRAO)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--ano', type=int, default=datetime.now().year, help="Temporada servida.")
+    parser.add_argument('--espera-lote', type=float, default=ESPERA_LOTE * 1000,
+                        help="Milissegundos que uma previsão espera por outras para formar um lote.")
+    parser.add_argument('--lote', help="Arquivo JSON Lines com jogos para pontuar de uma vez, sem subir o serviço.")
+    parser.add_argument('--saida', help="Arquivo de saída do --lote (padrão: saída padrão).")
+    args = parser.parse_args()
+
+    atualizador = preparar_atualizador(args.ano)
+    if atualizador is None:
+        sys.exit(1)
+
+    if args.lote:
+        with open(args.lote, encoding='utf-8') as entrada:
+            resultados = pontuar_jsonl(entrada, atualizador.dados)
+        saida = open(args.saida, 'w', encoding='utf-8') if args.saida else sys.stdout
+        try:
+            for resultado in resultados:
+                saida.write(json.dumps(resultado, ensure_ascii=False, default=_para_json) + '\n')
+        finally:
+            if args.saida:
+                saida.close()
+    else:
+        servico = ServicoPrevisao(atualizador, espera_lote=args.espera_lote / 1000)
+        try:
+            asyncio.run(servico.executar(args.host, args.porta))
+        except KeyboardInterrupt:
+            print("Serviço encerrado.")
@@ -1,50 +1,287 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from lxml import etree
+import numpy as np
 import pandas as pd
-import cloudscraper  
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import StringIO
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple
+from instrumentacao import instrumentar
 
-def buscar_dados_brasileirao(ano: str) -> Optional[pd.DataFrame]:
+# Permite apontar o scraper para outro servidor (ex.: um servidor local com páginas salvas do FBref)
+URL_BASE = os.environ.get("FBREF_URL_BASE", "https://fbref.com")
+DIRETORIO_CACHE = os.environ.get("FUTBOT_CACHE", ".cache_fbref")
+TTL_CACHE = 6 * 60 * 60  # segundos até uma página em cache precisar ser revalidada
+
+# Código de cada competição no FBref
+COMPETICOES = {'Serie-A': 24, 'Serie-B': 38}
+
+# Versão do formato das tabelas extraídas guardadas em cache; incrementar invalida o cache antigo
+VERSAO_EXTRATOR = 4
+
+# Placar "2–1" (en dash); em jogos decididos nos pênaltis, como "(4) 1–1 (3)", vale o placar do jogo
+_PADRAO_PLACAR = re.compile(r'(\d+)\s*[–-]\s*(\d+)')
+_PADRAO_TABELA_JOGOS = re.compile(r'<table\b[^>]*\bid="sched_')
+
+_sessao = None
+_trava_sessao = threading.Lock()
+
+
+def obter_sessao():
+    """
+    Retorna a sessão HTTP compartilhada (cloudscraper), criada uma única vez e reutilizada entre as
+    chamadas para aproveitar o pool de conexões.
+    """
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            # Importado só quando a rede é usada: páginas em cache não pagam o custo do cloudscraper
+            import cloudscraper
+            _sessao = cloudscraper.create_scraper()
+        return _sessao
+
+
+def montar_url(ano, competicao='Serie-A'):
+    return f"{URL_BASE}/en/comps/{COMPETICOES[competicao]}/schedule/{ano}-{competicao}-Scores-and-Fixtures"
+
+
+class LimitadorTaxa:
+    """
+    Limita a taxa global de requisições, compartilhada entre threads: cada requisição só começa depois
+    de um intervalo mínimo desde o início da anterior.
+    """
+
+    def __init__(self, requisicoes_por_segundo):
+        self.intervalo = 1.0 / requisicoes_por_segundo if requisicoes_por_segundo else 0.0
+        self.proximo_horario = 0.0
+        self.trava = threading.Lock()
+
+    def aguardar(self):
+        with self.trava:
+            agora = time.monotonic()
+            horario = max(agora, self.proximo_horario)
+            self.proximo_horario = horario + self.intervalo
+        time.sleep(max(0.0, horario - agora))
+
+
+def _caminhos_cache(url):
+    chave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    diretorio = os.path.join(DIRETORIO_CACHE, 'http')
+    return os.path.join(diretorio, f"{chave}.html"), os.path.join(diretorio, f"{chave}.json")
+
+
+def _gravar_atomicamente(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+@instrumentar('scraper.baixar_pagina')
+def baixar_pagina(url: str, ttl: float = TTL_CACHE, limitador: Optional[LimitadorTaxa] = None) -> str:
+    """
+    Baixa uma página usando o cache em disco. Dentro do TTL a resposta salva é usada sem acessar a rede;
+    depois dele a página é revalidada com ETag/Last-Modified e só é baixada de novo se tiver mudado.
+    O limitador, se informado, é respeitado apenas quando a rede é de fato acessada.
+    """
+    caminho_html, caminho_meta = _caminhos_cache(url)
+    metadados = None
+    if os.path.exists(caminho_html) and os.path.exists(caminho_meta):
+        with open(caminho_meta, encoding='utf-8') as arquivo:
+            metadados = json.load(arquivo)
+        if time.time() - metadados['salvo_em'] < ttl:
+            with open(caminho_html, encoding='utf-8') as arquivo:
+                return arquivo.read()
+
+    cabecalhos = {}
+    if metadados:
+        if metadados.get('etag'):
+            cabecalhos['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = metadados['last_modified']
+
+    if limitador is not None:
+        limitador.aguardar()
+    response = obter_sessao().get(url, headers=cabecalhos, timeout=15)
+    if response.status_code == 304 and metadados:
+        # Página não mudou: apenas renova a validade do cache
+        metadados['salvo_em'] = time.time()
+        _gravar_atomicamente(caminho_meta, json.dumps(metadados))
+        with open(caminho_html, encoding='utf-8') as arquivo:
+            return arquivo.read()
+    response.raise_for_status()
+
+    _gravar_atomicamente(caminho_html, response.text)
+    _gravar_atomicamente(caminho_meta, json.dumps({
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'salvo_em': time.time(),
+    }))
+    return response.text
+
+
+def _texto(celula):
+    return '' if celula is None else ''.join(celula.itertext()).strip()
+
+
+def _numero(texto):
+    texto = texto.replace(',', '')
+    try:
+        return float(texto)
+    except ValueError:
+        return math.nan
+
+
+def _dentro_de_comentario(html, posicao):
+    return html.rfind('<!--', 0, posicao) > html.rfind('-->', 0, posicao)
+
+
+def extrair_calendario(html: str) -> Optional[pd.DataFrame]:
+    """
+    Extrai a tabela de jogos (id sched_*) direto da árvore do lxml, sem passar pelas demais tabelas da
+    página (nem as comentadas). As células são identificadas pelo atributo data-stat e cada coluna já sai com o tipo final
+    em uma única passada: Rodada (int), Date (datetime), HomeTeam, AwayTeam, FTHG e FTAG (float, NaN
+    nos jogos futuros) e, quando a página tiver, HomeXG, AwayXG e Attendance.
+    Retorna None se a tabela não for encontrada.
+    """
+    # Recorta o HTML da tabela antes de montar a árvore: o resto da página (outras tabelas) nem é analisado.
+    # Tabelas dentro de comentários HTML (o FBref comenta tabelas secundárias) são ignoradas, como no read_html
+    inicio = next((encontrada for encontrada in _PADRAO_TABELA_JOGOS.finditer(html)
+                   if not _dentro_de_comentario(html, encontrada.start())), None)
+    fim = html.find('</table>', inicio.end()) if inicio else -1
+    if fim < 0:
+        return None
+    tabela = etree.fromstring(html[inicio.start():fim + len('</table>')], etree.HTMLParser())
+
+    colunas = {nome: [] for nome in ('Rodada', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG',
+                                     'HomeXG', 'AwayXG', 'Attendance')}
+    tem_xg = tem_publico = False
+    for linha in tabela.iter('tr'):
+        classe = linha.get('class', '')
+        if 'thead' in classe or 'spacer' in classe:
+            continue
+        celulas = {celula.get('data-stat'): celula for celula in linha}
+        rodada = _texto(celulas.get('gameweek'))
+        if not rodada.isdigit():
+            continue
+        colunas['Rodada'].append(int(rodada))
+        colunas['Date'].append(_texto(celulas.get('date')) or None)
+        colunas['HomeTeam'].append(_texto(celulas.get('home_team')))
+        colunas['AwayTeam'].append(_texto(celulas.get('away_team')))
+        placar = _PADRAO_PLACAR.search(_texto(celulas.get('score')))
+        colunas['FTHG'].append(float(placar.group(1)) if placar else math.nan)
+        colunas['FTAG'].append(float(placar.group(2)) if placar else math.nan)
+        if 'home_xg' in celulas:
+            tem_xg = True
+            colunas['HomeXG'].append(_numero(_texto(celulas['home_xg'])))
+            colunas['AwayXG'].append(_numero(_texto(celulas.get('away_xg'))))
+        if 'attendance' in celulas:
+            tem_publico = True
+            colunas['Attendance'].append(_numero(_texto(celulas['attendance'])))
+
+    if not tem_xg:
+        del colunas['HomeXG'], colunas['AwayXG']
+    if not tem_publico:
+        del colunas['Attendance']
+    colunas['Rodada'] = np.array(colunas['Rodada'], dtype=np.int64)
+    colunas['Date'] = pd.to_datetime(colunas['Date'], format='%Y-%m-%d', errors='coerce')
+    return pd.DataFrame(colunas)
+
+
+@instrumentar('scraper.processar_pagina', linhas=lambda df: 0 if df is None else len(df))
+def processar_pagina(html: str, ano: str) -> Optional[pd.DataFrame]:
+    """
+    Extrai a tabela "Scores & Fixtures" de uma página do FBref. Usa o extrator direto (extrair_calendario)
+    e só recorre ao pd.read_html se a tabela de jogos não for encontrada pelo id.
+    As colunas saem tipadas nos dois caminhos: Rodada (int) e Date (datetime). Até a versão 1 do extrator
+    as duas vinham como texto, como o read_html as lê; quem ainda compara com strings deve converter.
+    """
+    df = extrair_calendario(html)
+    if df is None:
+        df = processar_pagina_read_html(html, ano)
+        if df is not None:
+            df = df.assign(Rodada=pd.to_numeric(df['Rodada']).astype('int64'),
+                           Date=pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce'))
+    return df
+
+
+@instrumentar('scraper.read_html', linhas=lambda df: 0 if df is None else len(df))
+def processar_pagina_read_html(html: str, ano: str) -> Optional[pd.DataFrame]:
+    """
+    Extrai a tabela "Scores & Fixtures" com pd.read_html e padroniza as colunas.
+    """
+    tabelas = pd.read_html(StringIO(html), match="Scores & Fixtures")
+
+    if not tabelas:
+        print(f"AVISO: Nenhuma tabela com 'Scores & Fixtures' foi encontrada para o ano {ano}.")
+        return None
+
+    df = tabelas[0]
+
+    df = df[df['Wk'].notna()]
+    df = df[pd.to_numeric(df['Wk'], errors='coerce').notna()]
+
+    # Renomear colunas
+    df = df.rename(columns={
+        'Wk': 'Rodada',
+        'Home': 'HomeTeam',
+        'Away': 'AwayTeam',
+        'Score': 'Result'
+    })
+
+    # Dividir a coluna 'Result' em 'FTHG' e 'FTAG'
+    gols = df['Result'].str.split('–', expand=True)
+    df['FTHG'] = pd.to_numeric(gols[0], errors='coerce')
+    df['FTAG'] = pd.to_numeric(gols[1], errors='coerce')
+
+    colunas_finais = ['Rodada', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
+    return df[[c for c in colunas_finais if c in df.columns]]
+
+
+def processar_pagina_com_cache(html: str, ano: str) -> Optional[pd.DataFrame]:
+    """
+    Processa a página reutilizando o DataFrame já extraído de um conteúdo idêntico (chave: hash do HTML),
+    evitando processar de novo uma página que não mudou.
+    """
+    chave = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    caminho = os.path.join(DIRETORIO_CACHE, f'tabelas_v{VERSAO_EXTRATOR}', f"{chave}.pkl")
+    if os.path.exists(caminho):
+        return pd.read_pickle(caminho)
+
+    df = processar_pagina(html, ano)
+    if df is not None:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_pickle(temporario)
+        os.replace(temporario, caminho)
+    return df
+
+
+@instrumentar('scraper.buscar_temporada', linhas=lambda df: 0 if df is None else len(df))
+def buscar_dados_brasileirao(ano: str, ttl: float = TTL_CACHE) -> Optional[pd.DataFrame]:
     """
     Busca os resultados e jogos futuros de uma temporada do Brasileirão no FBref,
     utilizando cloudscraper para contornar proteções anti-bot (Cloudflare).
+    As respostas ficam em cache no disco (veja baixar_pagina). Rodada vem como int e Date como datetime
+    (veja processar_pagina).
     """
     print(f"Buscando dados da temporada {ano}...")
-    url = f"https://fbref.com/en/comps/24/schedule/{ano}-Serie-A-Scores-and-Fixtures"
-
-    # Usar cloudscraper para contornar proteções anti-bot
-    scraper = cloudscraper.create_scraper()
+    url = montar_url(ano)
 
     # Fazer a requisição para a página
     try:
-        response = scraper.get(url, timeout=15)
-        response.raise_for_status()
-        
-        tabelas = pd.read_html(StringIO(response.text), match="Scores & Fixtures")
-        
-        if not tabelas:
-            print(f"AVISO: Nenhuma tabela com 'Scores & Fixtures' foi encontrada para o ano {ano}.")
+        html = baixar_pagina(url, ttl)
+        df = processar_pagina_com_cache(html, ano)
+        if df is None:
             return None
-            
-        df = tabelas[0]
-
-        df = df[df['Wk'].notna()]
-        df = df[pd.to_numeric(df['Wk'], errors='coerce').notna()]
-        
-        # Renomear colunas 
-        df = df.rename(columns={
-            'Wk': 'Rodada',
-            'Home': 'HomeTeam',
-            'Away': 'AwayTeam',
-            'Score': 'Result'
-        })
-        
-        # Dividir a coluna 'Result' em 'FTHG' e 'FTAG'
-        gols = df['Result'].str.split('–', expand=True)
-        df['FTHG'] = pd.to_numeric(gols[0], errors='coerce')
-        df['FTAG'] = pd.to_numeric(gols[1], errors='coerce')
-
-        colunas_finais = ['Rodada', 'Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
-        df = df[[c for c in colunas_finais if c in df.columns]]
 
         print(f"Dados de {ano} carregados com sucesso. Total de {len(df)} partidas.")
         return df
@@ -54,4 +291,62 @@ def buscar_dados_brasileirao(ano: str) -> Optional[pd.DataFrame]:
         return None
 
 
+def _baixar_com_retentativas(url, ttl, limitador, tentativas, espera_inicial):
+    """
+    Baixa a página repetindo a requisição, com espera exponencial, em caso de erro de rede, HTTP 429 ou 5xx.
+    """
+    for tentativa in range(tentativas):
+        try:
+            return baixar_pagina(url, ttl, limitador)
+        except Exception as e:
+            resposta = getattr(e, 'response', None)
+            status = getattr(resposta, 'status_code', None)
+            if status is not None and status != 429 and status < 500:
+                raise
+            if tentativa == tentativas - 1:
+                raise
+            espera = espera_inicial * 2 ** tentativa * (1 + random.random() / 2)
+            retry_after = resposta.headers.get('Retry-After') if resposta is not None else None
+            if retry_after and retry_after.isdigit():
+                espera = max(espera, float(retry_after))
+            print(f"AVISO: falha ao baixar {url} ({e}). Nova tentativa em {espera:.1f}s...")
+            time.sleep(espera)
+
+
+def buscar_temporadas(anos: Iterable, competicoes: Iterable[str] = ('Serie-A',), max_concorrencia: int = 2,
+                      requisicoes_por_segundo: float = 0.5, tentativas: int = 3, espera_inicial: float = 2.0,
+                      processos: Optional[int] = None,
+                      ttl: float = TTL_CACHE) -> Iterator[Tuple[str, str, Optional[pd.DataFrame]]]:
+    """
+    Busca várias temporadas/competições em paralelo, respeitando um limite global de requisições por
+    segundo e de downloads simultâneos. O processamento do HTML é feito em um pool de processos,
+    fora das threads de download. Os resultados são entregues (ano, competicao, df) à medida que
+    cada temporada fica pronta; df é None se a temporada não puder ser obtida.
+    """
+    limitador = LimitadorTaxa(requisicoes_por_segundo)
+    tarefas = [(str(ano), competicao) for competicao in competicoes for ano in anos]
+
+    with ThreadPoolExecutor(max_workers=max_concorrencia) as downloads, \
+            ProcessPoolExecutor(max_workers=processos) as processamento:
+        pendentes = {}
+        for ano, competicao in tarefas:
+            futuro = downloads.submit(_baixar_com_retentativas, montar_url(ano, competicao), ttl, limitador,
+                                      tentativas, espera_inicial)
+            pendentes[futuro] = ('download', ano, competicao)
 
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                etapa, ano, competicao = pendentes.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    print(f"ERRO ao buscar ou processar dados de {ano} ({competicao}): {e}")
+                    yield ano, competicao, None
+                    continue
+                if etapa == 'download':
+                    pendentes[processamento.submit(processar_pagina_com_cache, resultado, ano)] = ('processamento', ano, competicao)
+                else:
+                    if resultado is not None:
+                        print(f"Dados de {ano} ({competicao}) carregados com sucesso. Total de {len(resultado)} partidas.")
+                    yield ano, competicao, resultado